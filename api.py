@@ -5,19 +5,32 @@ With built-in verification and ChatGPT comparison
 
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, FileResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 import os
 import requests
 from datetime import datetime, timedelta
 import hashlib
+import io
+import numpy as np
 import yfinance as yf
 from functools import lru_cache
+from bisect import bisect_left, bisect_right
+import calendar
 import time
 import json
+import orjson
 import random
+import re
 import asyncio
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+from collections import OrderedDict, deque
+from types import SimpleNamespace
+from dataclasses import dataclass, fields
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+# India Standard Time — fixed UTC+5:30, no DST. Naive IST clock = datetime.utcnow() + IST_OFFSET
+IST_OFFSET = timedelta(hours=5, minutes=30)
 
 # ═══════════════════════════════════════════════════════════
 # PERFORMANCE ENGINE — handles 10K+ concurrent users
@@ -37,6 +50,17 @@ _pool_adapter = HTTPAdapter(pool_connections=20, pool_maxsize=30, max_retries=1)
 _http_pool.mount('https://', _pool_adapter)
 _http_pool.mount('http://', _pool_adapter)
 
+def _resp_json(r):
+    """Response body → Python objects via orjson (several × faster than .json() on large quoteSummary payloads)."""
+    return orjson.loads(r.content)
+# Yahoo crumb fallback keeps its own session (Safari UA, separate cookie jar) so its cookies never
+# mix with _http_pool's — still pooled, so repeat fallbacks skip the TCP/TLS handshake
+_yahoo_crumb_session = requests.Session()
+_yahoo_crumb_session.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Safari/605.1.15',
+})
+_yahoo_crumb_session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=10, max_retries=1))
+
 # ═══════════════════════════════════════════════════════════
 # NSE INDIA DATA ENGINE — Primary source for Indian stocks
 # ═══════════════════════════════════════════════════════════
@@ -49,27 +73,44 @@ _nse_session.headers.update({
     'Connection': 'keep-alive',
 })
 _nse_cookie_ts = 0
+_nse_cookie_lock = threading.Lock()
+_NSE_COOKIE_TTL = 120  # Cookies valid for 2 min
+_NSE_COOKIE_REFRESH = 90  # background refresh interval — inside the validity window
 
-def _nse_init():
+def _nse_init(force=False):
     """Initialize NSE session with cookies — MUST call before any API request"""
     global _nse_cookie_ts
-    if time.time() - _nse_cookie_ts < 120:  # Cookies valid for 2 min
+    if not force and time.time() - _nse_cookie_ts < _NSE_COOKIE_TTL:
         return True
-    try:
-        r = _nse_session.get('https://www.nseindia.com', timeout=5)
-        if r.status_code == 200:
-            _nse_cookie_ts = time.time()
+    with _nse_cookie_lock:
+        # Another thread may have refreshed while we waited
+        if not force and time.time() - _nse_cookie_ts < _NSE_COOKIE_TTL:
             return True
-    except:
-        pass
+        try:
+            r = _nse_session.get('https://www.nseindia.com', timeout=5)
+            if r.status_code == 200:
+                _nse_cookie_ts = time.time()
+                return True
+        except:
+            pass
     return False
 
-def _nse_get(url, retries=2):
-    """Fetch from NSE API with cookie management and retry"""
+async def _nse_cookie_refresher():
+    """Keep NSE cookies warm in background so request paths never pay the homepage handshake."""
+    while True:
+        try:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(_thread_pool, _nse_init, True)
+        except Exception as e:
+            print(f"⚠️ NSE cookie refresh error: {e}")
+        await asyncio.sleep(_NSE_COOKIE_REFRESH)
+
+def _nse_get(url, retries=2, timeout=8, headers=None):
+    """Fetch from NSE API with cookie management and retry (jittered exponential backoff)"""
     for attempt in range(retries + 1):
         try:
             _nse_init()
-            r = _nse_session.get(url, timeout=8)
+            r = _nse_session.get(url, headers=headers, timeout=timeout)
             if r.status_code == 200:
                 return r.json()
             elif r.status_code == 401 or r.status_code == 403:
@@ -77,9 +118,10 @@ def _nse_get(url, retries=2):
                 global _nse_cookie_ts
                 _nse_cookie_ts = 0
                 _nse_init()
-        except Exception as e:
-            if attempt < retries:
-                time.sleep(0.5 * (attempt + 1))
+        except Exception:
+            pass
+        if attempt < retries:
+            time.sleep(0.5 * 2 ** attempt + random.uniform(0, 0.5))
     return None
 
 _nse_data_cache = {}  # {symbol: {ts, data}}
@@ -180,7 +222,7 @@ def fetch_nse_stock_data(symbol):
     # ═══ 4. Moneycontrol Price API — PE, Book Value, EPS, Delivery, Fundamentals ═══
     try:
         mc_url = f"https://priceapi.moneycontrol.com/pricefeed/nse/equitycash/{symbol}"
-        mc_r = requests.get(mc_url, headers={
+        mc_r = _http_pool.get(mc_url, headers={
             'User-Agent': 'Mozilla/5.0', 'Accept': 'application/json',
             'Referer': 'https://www.moneycontrol.com/'
         }, timeout=5)
@@ -367,13 +409,12 @@ def fetch_nse_stock_data(symbol):
     # ═══ 8. Google Finance fallback for price + PE ═══
     if result["price"] == 0:
         try:
-            import re as _re
             g_url = f"https://www.google.com/finance/quote/{symbol}:NSE"
-            g_r = requests.get(g_url, headers={'User-Agent': 'Mozilla/5.0', 'Accept': 'text/html'}, timeout=5)
+            g_r = _http_pool.get(g_url, headers={'User-Agent': 'Mozilla/5.0', 'Accept': 'text/html'}, timeout=5)
             if g_r.status_code == 200:
-                pm = _re.search(r'data-last-price="([0-9.]+)"', g_r.text)
+                pm = re.search(r'data-last-price="([0-9.]+)"', g_r.text)
                 if pm: result["price"] = float(pm.group(1))
-                pe_m = _re.search(r'P/E ratio.*?([0-9.]+)', g_r.text)
+                pe_m = re.search(r'P/E ratio.*?([0-9.]+)', g_r.text)
                 if pe_m and result["pe"] == 0: result["pe"] = float(pe_m.group(1))
                 print(f"  ✅ Google Finance: ₹{result['price']} PE={result['pe']}")
         except:
@@ -407,15 +448,191 @@ def _smart_cache_get(key: str):
 def _smart_cache_set(key: str, data, ttl: int = 120):
     """Set cache with TTL in seconds."""
     _smart_cache[key] = {'data': data, 'ts': time.time(), 'ttl': ttl}
-    # Evict old entries periodically (keep cache under 5000 items)
+    # Evict periodically (keep cache under 5000 items): expired entries first, then anything older than 10 min.
+    # list() snapshot — other pool threads may insert while this runs
     if len(_smart_cache) > 5000:
-        cutoff = time.time() - 600  # Remove anything older than 10 min
-        expired = [k for k, v in _smart_cache.items() if v['ts'] < cutoff]
+        now = time.time()
+        items = list(_smart_cache.items())
+        expired = [k for k, v in items if now - v['ts'] >= v['ttl']]
+        if len(_smart_cache) - len(expired) > 5000:
+            expired = [k for k, v in items if now - v['ts'] >= min(v['ttl'], 600)]
         for k in expired:
-            del _smart_cache[k]
+            _smart_cache.pop(k, None)
+
+# Per-endpoint TTLs for upstream GETs — matched to how often each source's data actually changes
+_HTTP_TTL = {
+    "chart": 60, "quote": 120, "summary": 3600,
+    "screener": 3600, "finviz": 3600, "moneycontrol": 86400,
+}
+_HTTP_HTML_KINDS = ("finviz", "moneycontrol")
+
+def _cached_get(kind: str, url: str, headers=None, timeout=8):
+    """_http_pool GET cached per URL for _HTTP_TTL[kind]. The Response itself (body already read) is kept,
+    so callers are unchanged; only 200s of the expected type are cached — never a Yahoo HTML block page."""
+    ck = "http:" + url
+    r = _smart_cache_get(ck)
+    if r is not None:
+        return r
+    return _single_flight(ck, _cached_get_miss, kind, ck, url, headers, timeout)
+
+def _cached_get_miss(kind, ck, url, headers, timeout):
+    _throttle(url)
+    r = _http_pool.get(url, headers=headers, timeout=timeout)
+    if r.status_code == 200 and (kind in _HTTP_HTML_KINDS or 'json' in r.headers.get('content-type', '')):
+        _smart_cache_set(ck, r, _HTTP_TTL[kind])
+    return r
+
+# Every v10 quoteSummary module any fetcher reads, requested together — fetch_yahoo_direct and
+# fetch_management_context share one cached response per ticker instead of three round trips
+_V10_MODULES = ('summaryProfile,assetProfile,financialData,defaultKeyStatistics,summaryDetail,price,'
+                'earnings,earningsHistory,earningsTrend,institutionOwnership,fundOwnership,majorHoldersBreakdown')
+
+def _v10_url(ticker: str) -> str:
+    return f"https://query2.finance.yahoo.com/v10/finance/quoteSummary/{ticker}?modules={_V10_MODULES}"
+
+@lru_cache(maxsize=8192)
+def classify_ticker(t: str) -> tuple:
+    """Yahoo ticker → (is_indian, clean symbol, Google Finance symbol). Suffix match, so only a
+    trailing .NS/.BO counts; US tickers get no Google exchange (callers try several)."""
+    if t.endswith('.NS'):
+        return True, t[:-3], f"{t[:-3]}:NSE"
+    if t.endswith('.BO'):
+        return True, t[:-3], f"{t[:-3]}:BOM"
+    return False, t, t
+
+_V10_OWNERSHIP_TOP = 10  # holders the management context lists
+
+def _v10_result(r):
+    """First quoteSummary result of a v10 Response (None if empty). Decoded once per cached Response and
+    shared read-only by every consumer; ownership lists are cut to the top holders actually used."""
+    res = getattr(r, "_v10_result", False)
+    if res is False:
+        data = _resp_json(r).get('quoteSummary', {}).get('result', [])
+        res = data[0] if data else None
+        if res:
+            for mod in ('institutionOwnership', 'fundOwnership'):
+                holders = res.get(mod, {}).get('ownershipList')
+                if holders and len(holders) > _V10_OWNERSHIP_TOP:
+                    res[mod]['ownershipList'] = holders[:_V10_OWNERSHIP_TOP]
+        r._v10_result = res
+    return res
+
+def _raw(d, *path):
+    """Yahoo {raw, fmt} value at d[path[0]][path[1]]... → its 'raw' (0 when any hop is missing).
+    Bare scalars pass through (falsy → 0); no throwaway {} defaults per lookup."""
+    for k in path:
+        if not isinstance(d, dict):
+            return 0
+        d = d.get(k)
+    if isinstance(d, dict):
+        return d.get('raw', 0)
+    return d or 0
+
+# orjson options shared by every orjson-rendered payload (responses + shared cache)
+_ORJSON_OPTS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# 3. SHARED CACHE — per-process L1 (smart cache) in front of Redis when REDIS_URL is set (one snapshot
+#    for all uvicorn workers, survives restarts); without Redis the smart cache is the whole cache
+REDIS_URL = os.getenv("REDIS_URL")
+_redis = None
+if REDIS_URL:
+    try:
+        import redis
+        _redis = redis.Redis.from_url(REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+        print("🗄️ Shared cache: Redis")
+    except Exception as e:
+        print(f"⚠️ Redis unavailable ({e}) — using in-process cache")
+
+def _shared_cache_default(o):
+    """numpy scalars/arrays → Python values, anything else (datetimes, …) → str, as the orjson paths do."""
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    if isinstance(o, np.generic):
+        return o.item()
+    return str(o)
+
+def _shared_cache_encode(data) -> str:
+    # stdlib json, not orjson: NaN/Infinity round-trip as floats instead of turning into null, so a
+    # Redis hit never hands None to a numeric comparison that a NaN would have passed through
+    return json.dumps(data, default=_shared_cache_default, separators=(',', ':'))
+
+# After a Redis error every caller skips Redis for this long instead of paying the socket timeout again
+_REDIS_BACKOFF = 30
+_redis_down_until = 0.0
+
+def _redis_available() -> bool:
+    return _redis is not None and time.time() >= _redis_down_until
+
+def _redis_failed(e):
+    """Start the backoff window — logged once per outage, not per request."""
+    global _redis_down_until
+    if time.time() >= _redis_down_until:
+        print(f"⚠️ Redis error ({type(e).__name__}: {e}) — in-process only for {_REDIS_BACKOFF}s")
+    _redis_down_until = time.time() + _REDIS_BACKOFF
+
+# Per-process L1 in front of Redis: hot keys skip the round trip, and 5s is the most a worker's
+# copy can lag a fresher value another worker wrote
+_SHARED_L1_TTL = 5
+
+def _shared_cache_redis_get(key: str):
+    """Redis half of a shared-cache read (blocking) — a hit refills the local L1."""
+    if not _redis_available():
+        return None
+    try:
+        raw = _redis.get(key)
+    except Exception as e:
+        _redis_failed(e)
+        return None
+    if not raw:
+        return None
+    data = json.loads(raw)
+    _smart_cache_set(key, data, _SHARED_L1_TTL)
+    return data
+
+def _shared_cache_redis_set(key: str, blob: str, ttl: int):
+    if not _redis_available():
+        return
+    try:
+        _redis.set(key, blob, ex=ttl)
+    except Exception as e:
+        _redis_failed(e)
+
+def _shared_cache_local_set(key: str, data, ttl: int) -> str:
+    """Encode once and keep the decoded copy in L1 — so a caller gets identical types (tuples → lists,
+    datetimes → str) whichever layer answers. L1 holds the full TTL only while Redis is out of play."""
+    blob = _shared_cache_encode(data)
+    _smart_cache_set(key, json.loads(blob), min(ttl, _SHARED_L1_TTL) if _redis_available() else ttl)
+    return blob
+
+def _shared_cache_get(key: str):
+    """Local L1 first, then Redis (if configured and not backing off). Blocking — async handlers
+    use _shared_cache_aget."""
+    data = _smart_cache_get(key)
+    if data is not None:
+        return data
+    return _shared_cache_redis_get(key)
+
+def _shared_cache_set(key: str, data, ttl: int = 120):
+    """Set in the local L1 and, if configured, Redis with the full TTL. Blocking — see _shared_cache_aset."""
+    _shared_cache_redis_set(key, _shared_cache_local_set(key, data, ttl), ttl)
+
+async def _shared_cache_aget(key: str):
+    """_shared_cache_get for the event loop — only the Redis round trip goes to _thread_pool."""
+    data = _smart_cache_get(key)
+    if data is not None or not _redis_available():
+        return data
+    return await asyncio.get_event_loop().run_in_executor(_thread_pool, _shared_cache_redis_get, key)
+
+async def _shared_cache_aset(key: str, data, ttl: int = 120):
+    blob = _shared_cache_local_set(key, data, ttl)
+    if _redis_available():
+        await asyncio.get_event_loop().run_in_executor(_thread_pool, _shared_cache_redis_set, key, blob, ttl)
 
 # 4. SHARED THREAD POOL — for all blocking IO (yfinance, HTTP scrapes)
 _thread_pool = ThreadPoolExecutor(max_workers=15, thread_name_prefix="celesys")
+# Long-lived pool for per-symbol yfinance/Yahoo fan-out — bounded, no per-request executor churn.
+# Separate from _thread_pool so fan-out submitted from a _thread_pool task can't starve its parent.
+_yf_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="yf")
 
 # 5. POPULAR TICKER PRE-FETCH — background refresh every 90 seconds
 _POPULAR_TICKERS_IN = [
@@ -475,6 +692,177 @@ async def _start_prefetch_loop():
             print(f"⚠️ Prefetch error: {e}")
         await asyncio.sleep(90)
 
+# 6. SINGLE-FLIGHT — identical concurrent upstream fetches share one in-flight call
+_inflight = {}  # {key: Future}
+_inflight_lock = threading.Lock()
+
+def _single_flight(key: str, fn, *args, **kwargs):
+    """Run fn once per key at a time — callers arriving mid-flight wait for the leader's result."""
+    with _inflight_lock:
+        fut = _inflight.get(key)
+        leader = fut is None
+        if leader:
+            fut = Future()
+            _inflight[key] = fut
+    if not leader:
+        return fut.result()
+    try:
+        res = fn(*args, **kwargs)
+        fut.set_result(res)
+        return res
+    except BaseException as e:
+        fut.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+# 7. YAHOO THROTTLE — smooth bursts below Yahoo's ~60 req/min 429 threshold.
+#    yfinance rejects caching sessions (requests_cache), so throttling + caching live here instead.
+class _RateLimiter:
+    """Thread-safe sliding-window limiter — acquire() blocks until a slot frees up."""
+    def __init__(self, max_calls: int, period: float):
+        self.max_calls = max_calls
+        self.period = period
+        self._calls = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= self.period:
+                    self._calls.popleft()
+                if len(self._calls) < self.max_calls:
+                    self._calls.append(now)
+                    return
+                wait = self.period - (now - self._calls[0])
+            time.sleep(wait)
+
+_yf_limiter = _RateLimiter(60, 60)
+
+# Direct HTTP calls share the limiter of the host they hit: every Yahoo host draws on _yf_limiter
+# (yfinance hits the same hosts, and Yahoo throttles per client), Finviz gets its own budget.
+# Per-minute only — acquire() blocks a pool thread, so an hourly window could park one for an hour.
+_HOST_LIMITERS = {
+    "query1.finance.yahoo.com": _yf_limiter,
+    "query2.finance.yahoo.com": _yf_limiter,
+    "finance.yahoo.com": _yf_limiter,
+    "finviz.com": _RateLimiter(30, 60),
+}
+
+def _throttle(url: str):
+    """Wait for a slot on the url's host limiter (no-op for unthrottled hosts)."""
+    host = url.split("/", 3)[2] if "://" in url else ""
+    limiter = _HOST_LIMITERS.get(host)
+    if limiter is not None:
+        limiter.acquire()
+
+def _install_yf_throttle():
+    """Give yfinance's shared session a request() that goes through _throttle first. Every yfinance
+    HTTP call — Ticker.history/info, yf.download threads, crumb fetches and each retry — then draws
+    on the same per-host limiters as the direct calls, so call sites don't acquire tokens themselves."""
+    from yfinance.data import YfData, new_session
+    session = new_session()  # keeps yfinance's backend choice and browser impersonation
+    class _ThrottledYfSession(type(session)):
+        def request(self, method, url, *args, **kwargs):
+            _throttle(url)
+            return super().request(method, url, *args, **kwargs)
+    session.__class__ = _ThrottledYfSession
+    YfData(session=session)
+
+try:
+    _install_yf_throttle()
+except Exception as e:
+    print(f"⚠️ yfinance throttle not installed ({e}) — yfinance calls are unthrottled")
+
+# 8. BATCHED YFINANCE HISTORY — one yf.download for many symbols instead of N Ticker.history calls,
+#    with a 60s per-(ticker, period) cache so repeat lookups never leave the process
+_YF_HIST_TTL = 60
+
+def _yf_batch_history(tickers, period="5d"):
+    """Multi-symbol OHLCV in one call → {ticker: DataFrame}. Symbols that come back empty are omitted."""
+    import pandas as pd
+    out = {}
+    for tk in tickers:
+        cached = _smart_cache_get(f"yfhist:{period}:{tk}")
+        if cached is not None:
+            out[tk] = cached
+    missing = [tk for tk in tickers if tk not in out]
+    if not missing:
+        return out
+    try:
+        df = yf.download(" ".join(missing), period=period, group_by="ticker", auto_adjust=True,
+                         threads=True, progress=False)
+        if df is None or df.empty:
+            return out
+        for tk in missing:
+            try:
+                sub = df[tk] if isinstance(df.columns, pd.MultiIndex) else df
+                sub = sub.dropna(subset=['Close'])
+                if not sub.empty:
+                    out[tk] = sub
+                    _smart_cache_set(f"yfhist:{period}:{tk}", sub, _YF_HIST_TTL)
+            except KeyError:
+                pass
+    except Exception as e:
+        print(f"  ⚠️ yf.download batch failed ({len(missing)} symbols): {e}")
+    return out
+
+def _hist_arrays(hist):
+    """OHLCV columns as ndarrays (opens, highs, lows, closes, vols) — skips pandas label lookups.
+    Missing Volume comes back as zeros."""
+    vols = hist['Volume'].to_numpy() if 'Volume' in hist.columns else np.zeros(len(hist))
+    return (hist['Open'].to_numpy(), hist['High'].to_numpy(), hist['Low'].to_numpy(),
+            hist['Close'].to_numpy(), vols)
+
+def _chart_col(indicators: dict, key: str):
+    """One v8 chart indicator column as a float64 ndarray with the null bars dropped (None → NaN → masked)."""
+    a = np.array(indicators.get(key) or [], dtype=np.float64)
+    return a[~np.isnan(a)]
+
+# 9. RETRY WITH BACKOFF — transient upstream failures (429, 5xx, dropped connections) get a
+#    jittered exponential backoff instead of silently turning into missing fields
+try:
+    from yfinance.exceptions import YFRateLimitError as _YFRateLimitError
+except ImportError:  # older yfinance without typed exceptions
+    class _YFRateLimitError(Exception):
+        pass
+
+def _is_transient(e) -> bool:
+    if isinstance(e, (_YFRateLimitError, requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(e, requests.HTTPError) and e.response is not None:
+        return e.response.status_code == 429 or e.response.status_code >= 500
+    return False
+
+def _with_retry(fn, *args, attempts=3, base=0.5, **kwargs):
+    """Call fn, retrying transient errors after base·2^i + jitter seconds. Other errors (and the last
+    transient one) propagate to the caller's existing fallback."""
+    for i in range(attempts):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if i == attempts - 1 or not _is_transient(e):
+                raise
+            time.sleep(base * 2 ** i + random.uniform(0, 0.5))
+
+def _get_with_retry(session, url, attempts=3, base=0.5, **kwargs):
+    """session.get under _with_retry — 429/5xx responses count as transient; every attempt waits on
+    the host limiter."""
+    def _get():
+        _throttle(url)
+        r = session.get(url, **kwargs)
+        if r.status_code == 429 or r.status_code >= 500:
+            r.raise_for_status()
+        return r
+    return _with_retry(_get, attempts=attempts, base=base)
+
+def _history_with_retry(t, attempts=3, base=0.5, **kwargs):
+    """t.history under _with_retry — rate-limit/connection errors are retried; an empty frame (bad,
+    delisted or holiday symbol) comes straight back so the caller's fallback runs without a backoff."""
+    return _with_retry(t.history, attempts=attempts, base=base, **kwargs)
+
 # ═══════════════════════════════════════════════════════════
 # DIRECT YAHOO FINANCE HTTP API (bypasses yfinance library)
 # Works when yfinance breaks due to rate limits/version bugs
@@ -489,29 +877,38 @@ YAHOO_HEADERS = {
 def fetch_yahoo_direct(ticker: str) -> dict:
     """
     Fallback: Direct HTTP to Yahoo Finance APIs.
-    Chain: v8 chart → v6 quote → v10 quoteSummary
+    Chain: v8 chart → v6 quote → v10 quoteSummary (all three requested concurrently, merged in that order)
     """
     try:
         headers = {**YAHOO_HEADERS, 'User-Agent': f'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/{random.randint(110,125)}.0.0.0'}
         
+        # None of the URLs depend on another response — fire v6 + v10 on _yf_pool while v8 runs here
+        quote_fut = _yf_pool.submit(_cached_get, "quote", f"https://query1.finance.yahoo.com/v6/finance/quote?symbols={ticker}",
+                                    headers=headers, timeout=8)
+        summary_fut = _yf_pool.submit(_cached_get, "summary", _v10_url(ticker), headers=headers, timeout=8)
+        
         # ── v8 chart (price + history) ──
         chart_url = f"https://query1.finance.yahoo.com/v8/finance/chart/{ticker}?interval=1d&range=5d"
-        chart_resp = requests.get(chart_url, headers=headers, timeout=10)
+        chart_resp = _cached_get("chart", chart_url, headers=headers, timeout=10)
         if chart_resp.status_code != 200:
+            quote_fut.cancel(); summary_fut.cancel()
             return None
         
-        chart_data = chart_resp.json()
+        chart_data = _resp_json(chart_resp)
         result = chart_data.get('chart', {}).get('result', [])
         if not result:
+            quote_fut.cancel(); summary_fut.cancel()
             return None
         
         meta = result[0].get('meta', {})
         indicators = result[0].get('indicators', {}).get('quote', [{}])[0]
-        closes = [c for c in indicators.get('close', []) if c is not None]
-        highs = [h for h in indicators.get('high', []) if h is not None]
-        lows = [l for l in indicators.get('low', []) if l is not None]
+        closes = _chart_col(indicators, 'close')
+        highs = _chart_col(indicators, 'high')
+        lows = _chart_col(indicators, 'low')
         
         current_price = meta.get('regularMarketPrice', 0)
+        chart_high = float(highs.max()) if highs.size else current_price
+        chart_low = float(lows.min()) if lows.size else current_price
         previous_close = meta.get('chartPreviousClose', meta.get('previousClose', current_price))
         
         info = {
@@ -520,11 +917,11 @@ def fetch_yahoo_direct(ticker: str) -> dict:
             'currency': meta.get('currency', 'USD'),
             'symbol': meta.get('symbol', ticker),
             'longName': meta.get('longName', ticker),
-            'chartHigh': max(highs) if highs else current_price,
-            'chartLow': min(lows) if lows else current_price,
-            'closes': closes,
-            'fiftyTwoWeekHigh': max(highs) if highs else current_price,
-            'fiftyTwoWeekLow': min(lows) if lows else current_price,
+            'chartHigh': chart_high,
+            'chartLow': chart_low,
+            'closes': closes.tolist(),  # plain list — info is merged into JSON-bound dicts
+            'fiftyTwoWeekHigh': chart_high,
+            'fiftyTwoWeekLow': chart_low,
             '_source': 'yahoo_chart_v8'
         }
         
@@ -532,10 +929,9 @@ def fetch_yahoo_direct(ticker: str) -> dict:
         
         # ── v6 quote API (best for fundamentals — no crumb needed) ──
         try:
-            quote_url = f"https://query1.finance.yahoo.com/v6/finance/quote?symbols={ticker}"
-            qr = requests.get(quote_url, headers=headers, timeout=8)
+            qr = quote_fut.result()
             if qr.status_code == 200:
-                quotes = qr.json().get('quoteResponse', {}).get('result', [])
+                quotes = _resp_json(qr).get('quoteResponse', {}).get('result', [])
                 if quotes:
                     q = quotes[0]
                     info.update({
@@ -558,17 +954,15 @@ def fetch_yahoo_direct(ticker: str) -> dict:
         
         # ── v10 quoteSummary (fuller data — margins, ROE, sector) ──
         try:
-            modules = 'summaryProfile,assetProfile,financialData,defaultKeyStatistics,summaryDetail,price'
-            sr = requests.get(f"https://query2.finance.yahoo.com/v10/finance/quoteSummary/{ticker}?modules={modules}", headers=headers, timeout=8)
+            sr = summary_fut.result()
             sr_ct = sr.headers.get('content-type', '')
             if sr.status_code == 200 and 'json' in sr_ct and '<html' not in sr.text[:200].lower():
-                qresult = sr.json().get('quoteSummary', {}).get('result', [])
-                if qresult:
-                    r = qresult[0]
+                r = _v10_result(sr)
+                if r is not None:
                     fin = r.get('financialData', {})
                     stats = r.get('defaultKeyStatistics', {})
                     detail = r.get('summaryDetail', {})
-                    profile = r.get('summaryProfile', {})
+                    profile = dict(r.get('summaryProfile', {}))  # copy — the decoded result is shared
                     asset_profile = r.get('assetProfile', {})
                     # Merge: assetProfile often has longBusinessSummary when summaryProfile doesn't
                     if asset_profile:
@@ -577,10 +971,6 @@ def fetch_yahoo_direct(ticker: str) -> dict:
                                 profile[_ak] = asset_profile[_ak]
                     price_d = r.get('price', {})
                     
-                    def raw(d, key, default=0):
-                        v = d.get(key, {})
-                        return v.get('raw', v.get('fmt', default)) if isinstance(v, dict) else (v or default)
-                    
                     # Always set margins/ROE/debt (these only come from v10)
                     updates = {
                         'sector': profile.get('sector', info.get('sector', 'N/A')),
@@ -588,23 +978,23 @@ def fetch_yahoo_direct(ticker: str) -> dict:
                         'longBusinessSummary': profile.get('longBusinessSummary', info.get('longBusinessSummary', '')),
                         'fullTimeEmployees': profile.get('fullTimeEmployees', info.get('fullTimeEmployees', 'N/A')),
                         'website': profile.get('website', info.get('website', '')),
-                        'profitMargins': raw(fin, 'profitMargins') or info.get('profitMargins', 0),
-                        'operatingMargins': raw(fin, 'operatingMargins') or info.get('operatingMargins', 0),
-                        'returnOnEquity': raw(fin, 'returnOnEquity') or info.get('returnOnEquity', 0),
-                        'debtToEquity': raw(fin, 'debtToEquity') or info.get('debtToEquity', 0),
-                        'currentRatio': raw(fin, 'currentRatio') or info.get('currentRatio', 0),
+                        'profitMargins': _raw(fin, 'profitMargins') or info.get('profitMargins', 0),
+                        'operatingMargins': _raw(fin, 'operatingMargins') or info.get('operatingMargins', 0),
+                        'returnOnEquity': _raw(fin, 'returnOnEquity') or info.get('returnOnEquity', 0),
+                        'debtToEquity': _raw(fin, 'debtToEquity') or info.get('debtToEquity', 0),
+                        'currentRatio': _raw(fin, 'currentRatio') or info.get('currentRatio', 0),
                     }
                     if not got_fundamentals:
                         updates.update({
-                            'longName': raw(price_d, 'longName') or info.get('longName', ticker),
-                            'marketCap': raw(price_d, 'marketCap') or info.get('marketCap', 0),
-                            'trailingPE': raw(detail, 'trailingPE') or info.get('trailingPE', 0),
-                            'forwardPE': raw(stats, 'forwardPE') or info.get('forwardPE', 0),
-                            'priceToBook': raw(stats, 'priceToBook') or info.get('priceToBook', 0),
-                            'dividendYield': raw(detail, 'dividendYield') or info.get('dividendYield', 0),
-                            'beta': raw(stats, 'beta') or info.get('beta', 0),
-                            'fiftyTwoWeekHigh': raw(detail, 'fiftyTwoWeekHigh') or info['fiftyTwoWeekHigh'],
-                            'fiftyTwoWeekLow': raw(detail, 'fiftyTwoWeekLow') or info['fiftyTwoWeekLow'],
+                            'longName': _raw(price_d, 'longName') or info.get('longName', ticker),
+                            'marketCap': _raw(price_d, 'marketCap') or info.get('marketCap', 0),
+                            'trailingPE': _raw(detail, 'trailingPE') or info.get('trailingPE', 0),
+                            'forwardPE': _raw(stats, 'forwardPE') or info.get('forwardPE', 0),
+                            'priceToBook': _raw(stats, 'priceToBook') or info.get('priceToBook', 0),
+                            'dividendYield': _raw(detail, 'dividendYield') or info.get('dividendYield', 0),
+                            'beta': _raw(stats, 'beta') or info.get('beta', 0),
+                            'fiftyTwoWeekHigh': _raw(detail, 'fiftyTwoWeekHigh') or info['fiftyTwoWeekHigh'],
+                            'fiftyTwoWeekLow': _raw(detail, 'fiftyTwoWeekLow') or info['fiftyTwoWeekLow'],
                         })
                     info.update(updates)
                     info['_source'] = 'yahoo_direct_full'
@@ -621,24 +1011,55 @@ def fetch_yahoo_direct(ticker: str) -> dict:
         return None
 
 
+# Scrape/sanitize patterns for fetch_management_context — compiled once, not per ticker
+_MC_MGMT_RE = re.compile(r'(?:management|board|promoter|chairman|CEO|MD)[^<]{10,300}', re.IGNORECASE)
+_MC_RESULTS_RE = re.compile(r'(?:quarterly|Q[1-4]|results?|revenue|profit|EPS|earnings)[^<]{10,200}', re.IGNORECASE)
+_FINVIZ_STAT_LABELS = (
+    'Target Price', 'Insider Own', 'Insider Trans', 'Inst Own', 'Inst Trans', 'Short Float',
+    'Earnings', 'EPS next Y', 'EPS next Q', 'Sales Q/Q', 'EPS Q/Q', 'Perf Quarter',
+    'Perf Half Y', 'Perf Year', 'Recom', 'Avg Volume', 'SMA20', 'SMA50', 'SMA200',
+)
+# One pass over the raw page bytes: label cell immediately followed by its <b>value</b> cell
+_FINVIZ_STAT_RE = re.compile(
+    rb'>(' + b'|'.join(re.escape(label.encode()) for label in _FINVIZ_STAT_LABELS) +
+    rb')</td>\s*<td[^>]*>\s*<b>([^<]+)</b>')
+_FINVIZ_INSIDER_RE = re.compile(rb'class="insider-(?:buy|sale)-cell[^"]*"[^>]*>([^<]+)')
+_HTML_STRIP_RE = re.compile(r'<[^>]+>')
+_HTML_ENTITY_RE = re.compile(r'&nbsp;|&amp;|&lt;|&gt;|&quot;|&#\d+;')
+_MULTI_NEWLINE_RE = re.compile(r'\n{3,}')
+_MULTI_SPACE_RE = re.compile(r' {3,}')
+_CODE_LINE_RE = re.compile(r'<script|<style|<div|<span|<meta|function\(|\{display:|class="|onclick=', re.IGNORECASE)
+
 def fetch_management_context(ticker: str, company_name: str) -> tuple:
     """
     Fetch real analyst/earnings/insider data from free sources.
     Returns text that gets injected into the AI prompt for real analysis.
     """
-    import re
     context_parts = []
     headers = {'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) Chrome/120.0.0.0 Safari/537.36'}
-    is_indian = '.NS' in ticker or '.BO' in ticker
-    clean_ticker = ticker.replace('.NS', '').replace('.BO', '')
+    is_indian, clean_ticker, _ = classify_ticker(ticker)
+    fv_headers = {**headers, 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/122.0.0.0'}
+    
+    # Every source below is an independent GET — issue them all up front on _yf_pool, then parse
+    # each response in the original section order so the context text is assembled identically
+    def _get(kind, url, hdrs, timeout):
+        return _yf_pool.submit(_cached_get, kind, url, headers=hdrs, timeout=timeout)
+    futs = {
+        "analyst": _get("quote", f"https://query1.finance.yahoo.com/v6/finance/quote?symbols={ticker}", YAHOO_HEADERS, 8),
+        "summary": _get("summary", _v10_url(ticker), YAHOO_HEADERS, 8),  # earnings + holdings modules
+    }
+    if is_indian:
+        futs["screener"] = _get("screener", f"https://www.screener.in/api/company/{clean_ticker}/consolidated/", headers, 8)
+        futs["moneycontrol"] = _get("moneycontrol", f"https://www.moneycontrol.com/stocks/company_info/print_financials.php?sc_did={clean_ticker}", headers, 6)
+    else:
+        futs["finviz"] = _get("finviz", f"https://finviz.com/quote.ashx?t={ticker}&ty=c&p=d&b=1", fv_headers, 8)
     
     # ── 1. Yahoo Finance analysis page (analyst targets + estimates) ──
     try:
-        url = f"https://query1.finance.yahoo.com/v6/finance/quote?symbols={ticker}"
-        r = requests.get(url, headers={**YAHOO_HEADERS}, timeout=8)
+        r = futs["analyst"].result()
         ct = r.headers.get('content-type', '')
         if r.status_code == 200 and 'json' in ct and '<html' not in r.text[:200].lower():
-            quotes = r.json().get('quoteResponse', {}).get('result', [])
+            quotes = _resp_json(r).get('quoteResponse', {}).get('result', [])
             if quotes:
                 q = quotes[0]
                 parts = []
@@ -649,7 +1070,6 @@ def fetch_management_context(ticker: str, company_name: str) -> tuple:
                 if q.get('recommendationKey'): parts.append(f"Recommendation: {q['recommendationKey'].upper()}")
                 if q.get('numberOfAnalystOpinions'): parts.append(f"Analyst Count: {q['numberOfAnalystOpinions']}")
                 if q.get('earningsTimestamp'):
-                    from datetime import datetime
                     ts = datetime.fromtimestamp(q['earningsTimestamp'])
                     parts.append(f"Last Earnings Date: {ts.strftime('%Y-%m-%d')}")
                 if q.get('epsTrailingTwelveMonths'): parts.append(f"EPS (TTM): ${q['epsTrailingTwelveMonths']:.2f}")
@@ -674,14 +1094,12 @@ def fetch_management_context(ticker: str, company_name: str) -> tuple:
     
     # ── 2. Yahoo earnings history ──
     try:
-        url = f"https://query2.finance.yahoo.com/v10/finance/quoteSummary/{ticker}?modules=earnings,earningsHistory,earningsTrend"
-        r = requests.get(url, headers={**YAHOO_HEADERS}, timeout=8)
+        r = futs["summary"].result()
         # CRITICAL: Validate we got JSON, not HTML (Yahoo rate limits return HTML pages)
         content_type = r.headers.get('content-type', '')
         if r.status_code == 200 and 'json' in content_type and '<html' not in r.text[:200].lower():
-            data = r.json().get('quoteSummary', {}).get('result', [])
-            if data:
-                d = data[0]
+            d = _v10_result(r)
+            if d is not None:
                 parts = []
                 
                 # Earnings history (actual vs estimate)
@@ -689,14 +1107,10 @@ def fetch_management_context(ticker: str, company_name: str) -> tuple:
                 if eh:
                     parts.append("\n--- EARNINGS SURPRISE HISTORY ---")
                     for e in eh[-4:]:  # last 4 quarters
-                        def rv(x): 
-                            return x.get('raw', 0) if isinstance(x, dict) else (x or 0)
-                        actual = rv(e.get('epsActual', {}))
-                        est = rv(e.get('epsEstimate', {}))
-                        surprise = rv(e.get('epsDifference', {}))
-                        surprise_pct = rv(e.get('surprisePercent', {}))
-                        qtr = e.get('quarter', {})
-                        qtr_val = rv(qtr) if isinstance(qtr, dict) else qtr
+                        actual = _raw(e, 'epsActual')
+                        est = _raw(e, 'epsEstimate')
+                        surprise_pct = _raw(e, 'surprisePercent')
+                        qtr_val = _raw(e, 'quarter')
                         parts.append(f"Q{qtr_val}: Actual EPS ${actual:.2f} vs Est ${est:.2f} | Surprise: {surprise_pct*100:.1f}%")
                 
                 # Earnings trend (forward estimates)
@@ -705,12 +1119,9 @@ def fetch_management_context(ticker: str, company_name: str) -> tuple:
                     parts.append("\n--- FORWARD EARNINGS ESTIMATES ---")
                     for t in et[:4]:
                         period = t.get('period', '')
-                        growth = t.get('growth', {})
-                        growth_val = growth.get('raw', 0) if isinstance(growth, dict) else 0
-                        eps_est = t.get('earningsEstimate', {}).get('avg', {})
-                        eps_val = eps_est.get('raw', 0) if isinstance(eps_est, dict) else 0
-                        rev_est = t.get('revenueEstimate', {}).get('avg', {})
-                        rev_val = rev_est.get('raw', 0) if isinstance(rev_est, dict) else 0
+                        growth_val = _raw(t, 'growth')
+                        eps_val = _raw(t, 'earningsEstimate', 'avg')
+                        rev_val = _raw(t, 'revenueEstimate', 'avg')
                         if eps_val:
                             parts.append(f"{period}: EPS Est ${eps_val:.2f} | Growth {growth_val*100:.1f}% | Rev Est ${rev_val:,.0f}")
                 
@@ -720,10 +1131,8 @@ def fetch_management_context(ticker: str, company_name: str) -> tuple:
                 if quarterly:
                     parts.append("\n--- QUARTERLY REVENUE & EARNINGS ---")
                     for q in quarterly[-4:]:
-                        rev = q.get('revenue', {})
-                        earn = q.get('earnings', {})
-                        rev_val = rev.get('raw', 0) if isinstance(rev, dict) else 0
-                        earn_val = earn.get('raw', 0) if isinstance(earn, dict) else 0
+                        rev_val = _raw(q, 'revenue')
+                        earn_val = _raw(q, 'earnings')
                         date = q.get('date', '')
                         parts.append(f"{date}: Revenue ${rev_val:,.0f} | Earnings ${earn_val:,.0f}")
                 
@@ -755,23 +1164,20 @@ def fetch_management_context(ticker: str, company_name: str) -> tuple:
     # ── 2b. Yahoo Fund/Institutional Holdings ──
     fund_holdings_data = {"institutions": [], "funds": [], "summary": {}}
     try:
-        url = f"https://query2.finance.yahoo.com/v10/finance/quoteSummary/{ticker}?modules=institutionOwnership,fundOwnership,majorHoldersBreakdown"
-        r = requests.get(url, headers={**YAHOO_HEADERS}, timeout=8)
+        r = futs["summary"].result()
         ct = r.headers.get('content-type', '')
         if r.status_code == 200 and 'json' in ct and '<html' not in r.text[:200].lower():
-            data = r.json().get('quoteSummary', {}).get('result', [])
-            if data:
-                d = data[0]
+            d = _v10_result(r)
+            if d is not None:
                 parts = []
                 
                 # Major holders breakdown
                 mh = d.get('majorHoldersBreakdown', {})
                 if mh:
-                    def rv(x): return x.get('raw', 0) if isinstance(x, dict) else (x or 0)
-                    insider_pct = rv(mh.get('insidersPercentHeld', {}))
-                    inst_pct = rv(mh.get('institutionsPercentHeld', {}))
-                    float_inst = rv(mh.get('institutionsFloatPercentHeld', {}))
-                    inst_count = rv(mh.get('institutionsCount', {}))
+                    insider_pct = _raw(mh, 'insidersPercentHeld')
+                    inst_pct = _raw(mh, 'institutionsPercentHeld')
+                    float_inst = _raw(mh, 'institutionsFloatPercentHeld')
+                    inst_count = _raw(mh, 'institutionsCount')
                     fund_holdings_data["summary"] = {
                         "institutional_pct": round(inst_pct * 100, 2) if inst_pct else 0,
                         "insider_pct": round(insider_pct * 100, 2) if insider_pct else 0,
@@ -789,12 +1195,9 @@ def fetch_management_context(ticker: str, company_name: str) -> tuple:
                     parts.append("\n--- TOP INSTITUTIONAL HOLDERS ---")
                     for h in inst[:10]:
                         name = h.get('organization', 'Unknown')
-                        pct = h.get('pctHeld', {})
-                        pct_val = pct.get('raw', 0) if isinstance(pct, dict) else 0
-                        shares = h.get('position', {})
-                        shares_val = shares.get('raw', 0) if isinstance(shares, dict) else 0
-                        value = h.get('value', {})
-                        value_val = value.get('raw', 0) if isinstance(value, dict) else 0
+                        pct_val = _raw(h, 'pctHeld')
+                        shares_val = _raw(h, 'position')
+                        value_val = _raw(h, 'value')
                         fund_holdings_data["institutions"].append({
                             "name": name, "pct": round(pct_val * 100, 2),
                             "shares": int(shares_val), "value": int(value_val)
@@ -807,10 +1210,8 @@ def fetch_management_context(ticker: str, company_name: str) -> tuple:
                     parts.append("\n--- TOP MUTUAL FUND HOLDERS ---")
                     for f in funds[:10]:
                         name = f.get('organization', 'Unknown')
-                        pct = f.get('pctHeld', {})
-                        pct_val = pct.get('raw', 0) if isinstance(pct, dict) else 0
-                        shares = f.get('position', {})
-                        shares_val = shares.get('raw', 0) if isinstance(shares, dict) else 0
+                        pct_val = _raw(f, 'pctHeld')
+                        shares_val = _raw(f, 'position')
                         fund_holdings_data["funds"].append({
                             "name": name, "pct": round(pct_val * 100, 2),
                             "shares": int(shares_val)
@@ -826,10 +1227,9 @@ def fetch_management_context(ticker: str, company_name: str) -> tuple:
     # ── 3. For Indian stocks: Screener.in data ──
     if is_indian:
         try:
-            screener_url = f"https://www.screener.in/api/company/{clean_ticker}/consolidated/"
-            r = requests.get(screener_url, headers=headers, timeout=8)
+            r = futs["screener"].result()
             if r.status_code == 200:
-                data = r.json() if r.headers.get('content-type', '').startswith('application/json') else {}
+                data = _resp_json(r) if r.headers.get('content-type', '').startswith('application/json') else {}
                 parts = []
                 if data.get('warehouse_set'):
                     wh = data['warehouse_set']
@@ -847,28 +1247,23 @@ def fetch_management_context(ticker: str, company_name: str) -> tuple:
         
         # ── 4. For Indian stocks: Moneycontrol data (management commentary, quarterly results) ──
         try:
-            import re as re_mc
-            # Moneycontrol search - find stock URL
-            mc_search = f"https://www.moneycontrol.com/stocks/company_info/stock_news.php?sc_id={clean_ticker}"
-            mc_resp = requests.get(f"https://www.moneycontrol.com/indian-indices/nifty-50-9", headers=headers, timeout=6)
-            # Alternative: direct company page
-            mc_url = f"https://www.moneycontrol.com/stocks/company_info/print_financials.php?sc_did={clean_ticker}"
-            mc_resp = requests.get(mc_url, headers=headers, timeout=6)
+            # Direct company page
+            mc_resp = futs["moneycontrol"].result()
             if mc_resp.status_code == 200:
                 text = mc_resp.text
                 parts = []
                 
                 # Extract management discussions/commentary from page
-                mgmt_disc = re_mc.findall(r'(?:management|board|promoter|chairman|CEO|MD)[^<]{10,300}', text, re_mc.IGNORECASE)
+                mgmt_disc = _MC_MGMT_RE.findall(text)
                 for disc in mgmt_disc[:3]:
-                    clean = re_mc.sub(r'<[^>]+>', '', disc).strip()
+                    clean = _HTML_STRIP_RE.sub('', disc).strip()
                     if len(clean) > 20:
                         parts.append(f"Management Note: {clean[:200]}")
                 
                 # Extract quarterly results mentions  
-                qr_mentions = re_mc.findall(r'(?:quarterly|Q[1-4]|results?|revenue|profit|EPS|earnings)[^<]{10,200}', text, re_mc.IGNORECASE)
+                qr_mentions = _MC_RESULTS_RE.findall(text)
                 for qr in qr_mentions[:3]:
-                    clean = re_mc.sub(r'<[^>]+>', '', qr).strip()
+                    clean = _HTML_STRIP_RE.sub('', qr).strip()
                     if len(clean) > 15:
                         parts.append(f"Quarterly Info: {clean[:200]}")
                 
@@ -881,35 +1276,21 @@ def fetch_management_context(ticker: str, company_name: str) -> tuple:
     # ── 5. For US stocks: Finviz data (analyst targets, insider trading, earnings) ──
     if not is_indian:
         try:
-            import re as re_fv
-            finviz_url = f"https://finviz.com/quote.ashx?t={ticker}&ty=c&p=d&b=1"
-            fv_headers = {**headers, 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/122.0.0.0'}
-            fv_resp = requests.get(finviz_url, headers=fv_headers, timeout=8)
+            fv_resp = futs["finviz"].result()
             if fv_resp.status_code == 200:
-                text = fv_resp.text
+                body = fv_resp.content
                 parts = []
                 
-                # Extract key Finviz stats
-                stat_map = {
-                    'Target Price': 'targetPrice', 'Insider Own': 'insiderOwn', 
-                    'Insider Trans': 'insiderTrans', 'Inst Own': 'instOwn',
-                    'Inst Trans': 'instTrans', 'Short Float': 'shortFloat',
-                    'Earnings': 'earningsDate', 'EPS next Y': 'epsNextY',
-                    'EPS next Q': 'epsNextQ', 'Sales Q/Q': 'salesQQ',
-                    'EPS Q/Q': 'epsQQ', 'Perf Quarter': 'perfQ',
-                    'Perf Half Y': 'perfHY', 'Perf Year': 'perfY',
-                    'Recom': 'recommendation', 'Avg Volume': 'avgVol',
-                    'SMA20': 'sma20', 'SMA50': 'sma50', 'SMA200': 'sma200',
-                }
-                
-                for label, key in stat_map.items():
-                    pattern = f'>{re_fv.escape(label)}</td>.*?<b>([^<]+)</b>'
-                    m = re_fv.search(pattern, text, re_fv.DOTALL)
-                    if m:
-                        parts.append(f"{label}: {m.group(1).strip()}")
+                # Extract key Finviz stats — first value per label, listed in _FINVIZ_STAT_LABELS order
+                stats = {}
+                for m in _FINVIZ_STAT_RE.finditer(body):
+                    stats.setdefault(m.group(1).decode(), m.group(2))
+                for label in _FINVIZ_STAT_LABELS:
+                    if label in stats:
+                        parts.append(f"{label}: {stats[label].decode('utf-8', 'replace').strip()}")
                 
                 # Extract recent insider transactions
-                insider_matches = re_fv.findall(r'class="insider-(?:buy|sale)-cell[^"]*"[^>]*>([^<]+)', text)
+                insider_matches = [v.decode('utf-8', 'replace') for v in _FINVIZ_INSIDER_RE.findall(body)]
                 if insider_matches:
                     parts.append(f"\nRecent Insider Activity: {', '.join(insider_matches[:5])}")
                 
@@ -923,30 +1304,124 @@ def fetch_management_context(ticker: str, company_name: str) -> tuple:
         return "", fund_holdings_data
     
     # CRITICAL: Sanitize — strip any HTML that leaked from Yahoo/Moneycontrol responses
-    import re as re_clean
+    # Each pass only runs when its trigger character is present — the usual all-JSON blob skips the regexes
     result = "\n\n".join(context_parts)
     # Remove HTML tags
-    result = re_clean.sub(r'<[^>]+>', '', result)
+    if '<' in result:
+        result = _HTML_STRIP_RE.sub('', result)
     # Remove common HTML artifacts
-    result = re_clean.sub(r'&nbsp;|&amp;|&lt;|&gt;|&quot;|&#\d+;', ' ', result)
+    if '&' in result:
+        result = _HTML_ENTITY_RE.sub(' ', result)
     # Remove excessive whitespace
-    result = re_clean.sub(r'\n{3,}', '\n\n', result)
-    result = re_clean.sub(r' {3,}', ' ', result)
-    # Remove any lines that look like HTML/JS code
-    clean_lines = []
-    for line in result.split('\n'):
-        stripped = line.strip()
-        # Skip lines that look like code/HTML
-        if any(x in stripped.lower() for x in ['<script', '<style', '<div', '<span', '<meta', 'function(', '{display:', 'class="', 'onclick=']):
-            continue
-        if stripped:
-            clean_lines.append(line)
-    result = '\n'.join(clean_lines)
+    if '\n\n\n' in result:
+        result = _MULTI_NEWLINE_RE.sub('\n\n', result)
+    if '   ' in result:
+        result = _MULTI_SPACE_RE.sub(' ', result)
+    # Remove any lines that look like HTML/JS code (one precompiled scan per line instead of 9 lower()+in checks)
+    result = '\n'.join(line for line in result.split('\n') if line.strip() and not _CODE_LINE_RE.search(line))
     
     print(f"📊 Management context: {len(result)} chars (sanitized)")
     return result, fund_holdings_data
 
 
+_HTML_TAG_RE = re.compile(r'<[a-zA-Z/]')
+
+def fetch_management_context_safe(ticker: str, company_name: str) -> tuple:
+    """fetch_management_context that never raises and discards HTML-polluted text."""
+    mgmt_context = ""
+    fund_holdings = {"institutions": [], "funds": [], "summary": {}}
+    try:
+        mgmt_context, fund_holdings = fetch_management_context(ticker, company_name)
+        if mgmt_context:
+            # Final safety: reject if it's mostly HTML — cheap '<' scan first, regex only on suspect text
+            html_tag_count = 0
+            if mgmt_context.count('<') > 5:
+                html_tag_count = sum(1 for _ in _HTML_TAG_RE.finditer(mgmt_context))
+            if html_tag_count > 5:
+                print(f"⚠️ Management context contains {html_tag_count} HTML tags — DISCARDING")
+                mgmt_context = ""
+            else:
+                print(f"📊 Got {len(mgmt_context)} chars of clean management/earnings data")
+    except Exception as e:
+        print(f"⚠️ Management context fetch failed: {e}")
+    return mgmt_context, fund_holdings
+
+# Tickers enriched at once by the batch helper — each one already fans out up to 4 GETs on _yf_pool
+_MGMT_BATCH_CONCURRENCY = 4
+
+async def fetch_management_context_batch(tickers: list) -> dict:
+    """Management context for many tickers concurrently → {ticker: {"context", "fund_holdings"} | {"error"}}.
+    Runs fetch_management_context_safe per ticker on _thread_pool; one failure never sinks the batch."""
+    loop = asyncio.get_event_loop()
+    sem = asyncio.Semaphore(_MGMT_BATCH_CONCURRENCY)
+    
+    async def _one(tk):
+        async with sem:
+            return await loop.run_in_executor(_thread_pool, fetch_management_context_safe, tk, tk)
+    
+    results = await asyncio.gather(*(_one(tk) for tk in tickers), return_exceptions=True)
+    out = {}
+    for tk, res in zip(tickers, results):
+        if isinstance(res, BaseException):
+            out[tk] = {"error": f"{type(res).__name__}: {res}"}
+        else:
+            out[tk] = {"context": res[0], "fund_holdings": res[1]}
+    return out
+
+# Yahoo quote-page scrape: one pass over the embedded JSON per value kind instead of one search per field
+_YF_SCRAPE_PRICE_RE = re.compile(r'data-testid="qsp-price"[^>]*>([0-9,.]+)')
+_YF_SCRAPE_RAW_PRICE_RE = re.compile(r'"regularMarketPrice":\{"raw":([0-9.]+)')
+_YF_FIELD_RE = re.compile(
+    r'"(regularMarketPreviousClose|previousClose|marketCap|trailingPE|forwardPE|priceToBook|dividendYield|beta|'
+    r'profitMargins|operatingMargins|returnOnEquity|debtToEquity|currentRatio|fiftyTwoWeekHigh|fiftyTwoWeekLow)'
+    r'":\{"raw":([0-9.eE+\-]+)')
+_YF_STR_FIELD_RE = re.compile(r'"(currency|longName|sector|industry)":"([^"]+)"')
+# Embedded page state — when present, every field is a dict lookup instead of a regex scan of the HTML
+_YF_APP_MAIN_RE = re.compile(rb'root\.App\.main\s*=\s*(\{.*?\});\s*\n', re.DOTALL)
+_YF_RAW_FIELDS = ('regularMarketPreviousClose', 'previousClose', 'marketCap', 'trailingPE', 'forwardPE',
+                  'priceToBook', 'dividendYield', 'beta', 'profitMargins', 'operatingMargins', 'returnOnEquity',
+                  'debtToEquity', 'currentRatio', 'fiftyTwoWeekHigh', 'fiftyTwoWeekLow', 'regularMarketPrice')
+_YF_STR_FIELDS = ('currency', 'longName', 'sector', 'industry')
+
+def _yf_scrape_store(content: bytes):
+    """(raw_vals, str_vals) from the QuoteSummaryStore in root.App.main, or None if the page has no such blob."""
+    m = _YF_APP_MAIN_RE.search(content)
+    if not m:
+        return None
+    try:
+        store = orjson.loads(m.group(1))['context']['dispatcher']['stores']['QuoteSummaryStore']
+    except:
+        return None
+    raw_vals, str_vals = {}, {}
+    for mod in store.values():
+        if not isinstance(mod, dict):
+            continue
+        for f in _YF_RAW_FIELDS:
+            v = mod.get(f)
+            if isinstance(v, dict) and isinstance(v.get('raw'), (int, float)):
+                raw_vals.setdefault(f, float(v['raw']))
+        for f in _YF_STR_FIELDS:
+            v = mod.get(f)
+            if isinstance(v, str) and v:
+                str_vals.setdefault(f, v)
+    return raw_vals, str_vals
+
+# Google Finance page patterns
+_GF_PRICE_RE = re.compile(r'data-last-price="([0-9.]+)"')
+_GF_PRICE_CLASS_RE = re.compile(r'class="YMlKec fxKbKc"[^>]*>([0-9,.]+)')
+_GF_NAME_RE = re.compile(r'<div[^>]*class="zzDege"[^>]*>([^<]+)')
+_GF_STAT_RES = [(re.compile(p, re.DOTALL | re.IGNORECASE), key) for p, key in (
+    (r'P/E ratio.*?<div[^>]*>([0-9,.]+)', 'trailingPE'),
+    (r'Market cap.*?<div[^>]*>([0-9,.]+[TBMK]?)', 'marketCap_str'),
+    (r'Dividend yield.*?<div[^>]*>([0-9,.]+)%', 'dividendYield_pct'),
+    (r'52-wk high.*?<div[^>]*>([0-9,.]+)', 'fiftyTwoWeekHigh'),
+    (r'52-wk low.*?<div[^>]*>([0-9,.]+)', 'fiftyTwoWeekLow'),
+    (r'Prev close.*?<div[^>]*>([0-9,.]+)', 'previousClose'),
+    (r'Revenue.*?<div[^>]*>\$?₹?([0-9,.]+[TBMK]?)', 'revenue_str'),
+    (r'Net income.*?<div[^>]*>\$?₹?([0-9,.]+[TBMK]?)', 'netIncome_str'),
+    (r'EPS.*?<div[^>]*>\$?₹?([0-9,.]+)', 'eps'),
+)]
+
 def fetch_yahoo_scrape(ticker: str) -> dict:
     """
     Last resort: Scrape Yahoo Finance quote page for basic data.
@@ -958,54 +1433,57 @@ def fetch_yahoo_scrape(ticker: str) -> dict:
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml',
         }
-        resp = requests.get(url, headers=headers, timeout=12)
+        _throttle(url)
+        resp = _http_pool.get(url, headers=headers, timeout=12)
         if resp.status_code != 200:
             return None
         
         text = resp.text
-        
-        # Try to find JSON data embedded in page
-        import re
+        store_vals = _yf_scrape_store(resp.content)
         
         # Look for price in page title or meta
-        price_match = re.search(r'data-testid="qsp-price"[^>]*>([0-9,.]+)', text)
-        if not price_match:
-            price_match = re.search(r'"regularMarketPrice":\{"raw":([0-9.]+)', text)
-        
-        if not price_match:
-            return None
-        
-        price = float(price_match.group(1).replace(',', ''))
-        
-        # Extract other fields from JSON blobs in page
-        def extract_raw(field):
-            m = re.search(f'"{field}":{{"raw":([0-9.eE+\\-]+)', text)
-            return float(m.group(1)) if m else 0
+        price_match = _YF_SCRAPE_PRICE_RE.search(text)
+        if price_match:
+            price = float(price_match.group(1).replace(',', ''))
+        elif store_vals and store_vals[0].get('regularMarketPrice'):
+            price = store_vals[0]['regularMarketPrice']
+        else:
+            price_match = _YF_SCRAPE_RAW_PRICE_RE.search(text)
+            if not price_match:
+                return None
+            price = float(price_match.group(1).replace(',', ''))
         
-        def extract_str(field):
-            m = re.search(f'"{field}":"([^"]+)"', text)
-            return m.group(1) if m else 'N/A'
+        # Other fields: dict lookups on the embedded store; regex scan of the HTML only if it is missing
+        if store_vals:
+            raw_vals, str_vals = store_vals
+        else:
+            raw_vals, str_vals = {}, {}
+            for m in _YF_FIELD_RE.finditer(text):
+                raw_vals.setdefault(m.group(1), float(m.group(2)))
+            for m in _YF_STR_FIELD_RE.finditer(text):
+                str_vals.setdefault(m.group(1), m.group(2))
+        raw = raw_vals.get
         
         return {
             'currentPrice': price,
-            'previousClose': extract_raw('regularMarketPreviousClose') or extract_raw('previousClose') or price,
-            'currency': extract_str('currency') or 'USD',
-            'longName': extract_str('longName') or ticker,
-            'marketCap': extract_raw('marketCap'),
-            'trailingPE': extract_raw('trailingPE'),
-            'forwardPE': extract_raw('forwardPE'),
-            'priceToBook': extract_raw('priceToBook'),
-            'dividendYield': extract_raw('dividendYield'),
-            'beta': extract_raw('beta'),
-            'sector': extract_str('sector'),
-            'industry': extract_str('industry'),
-            'profitMargins': extract_raw('profitMargins'),
-            'operatingMargins': extract_raw('operatingMargins'),
-            'returnOnEquity': extract_raw('returnOnEquity'),
-            'debtToEquity': extract_raw('debtToEquity'),
-            'currentRatio': extract_raw('currentRatio'),
-            'fiftyTwoWeekHigh': extract_raw('fiftyTwoWeekHigh') or price * 1.1,
-            'fiftyTwoWeekLow': extract_raw('fiftyTwoWeekLow') or price * 0.8,
+            'previousClose': raw('regularMarketPreviousClose') or raw('previousClose') or price,
+            'currency': str_vals.get('currency', 'USD'),
+            'longName': str_vals.get('longName', ticker),
+            'marketCap': raw('marketCap', 0),
+            'trailingPE': raw('trailingPE', 0),
+            'forwardPE': raw('forwardPE', 0),
+            'priceToBook': raw('priceToBook', 0),
+            'dividendYield': raw('dividendYield', 0),
+            'beta': raw('beta', 0),
+            'sector': str_vals.get('sector', 'N/A'),
+            'industry': str_vals.get('industry', 'N/A'),
+            'profitMargins': raw('profitMargins', 0),
+            'operatingMargins': raw('operatingMargins', 0),
+            'returnOnEquity': raw('returnOnEquity', 0),
+            'debtToEquity': raw('debtToEquity', 0),
+            'currentRatio': raw('currentRatio', 0),
+            'fiftyTwoWeekHigh': raw('fiftyTwoWeekHigh') or price * 1.1,
+            'fiftyTwoWeekLow': raw('fiftyTwoWeekLow') or price * 0.8,
             '_source': 'yahoo_scrape'
         }
     except Exception as e:
@@ -1019,13 +1497,11 @@ def fetch_google_finance(ticker: str) -> dict:
     Google Finance pages are public and rarely rate-limited.
     Extracts: P/E, Market Cap, Dividend Yield, 52W range, etc.
     """
-    import re
     try:
         # Convert ticker format for Google Finance URLs
-        if '.NS' in ticker:
-            g_tickers = [ticker.replace('.NS', '') + ':NSE']
-        elif '.BO' in ticker:
-            g_tickers = [ticker.replace('.BO', '') + ':BOM']
+        is_indian, _, g_symbol = classify_ticker(ticker)
+        if is_indian:
+            g_tickers = [g_symbol]
         else:
             # US stocks need exchange suffix — try NASDAQ first, then NYSE
             base = ticker.replace('.', '-')
@@ -1040,7 +1516,7 @@ def fetch_google_finance(ticker: str) -> dict:
         text = None
         for g_ticker in g_tickers:
             url = f"https://www.google.com/finance/quote/{g_ticker}"
-            resp = requests.get(url, headers=headers, timeout=10)
+            resp = _http_pool.get(url, headers=headers, timeout=10)
             if resp.status_code == 200 and 'data-last-price' in resp.text:
                 text = resp.text
                 print(f"  ✅ Google Finance resolved: {g_ticker}")
@@ -1050,9 +1526,9 @@ def fetch_google_finance(ticker: str) -> dict:
             return None
         
         # Extract price from Google Finance page
-        price_match = re.search(r'data-last-price="([0-9.]+)"', text)
+        price_match = _GF_PRICE_RE.search(text)
         if not price_match:
-            price_match = re.search(r'class="YMlKec fxKbKc"[^>]*>([0-9,.]+)', text)
+            price_match = _GF_PRICE_CLASS_RE.search(text)
         if not price_match:
             return None
         
@@ -1062,27 +1538,15 @@ def fetch_google_finance(ticker: str) -> dict:
         info = {
             'currentPrice': price,
             'previousClose': price,  # Will be refined below
-            'currency': 'INR' if '.NS' in ticker or '.BO' in ticker else 'USD',
+            'currency': 'INR' if is_indian else 'USD',
             'longName': ticker,
             '_source': 'google_finance'
         }
         
         # Extract key stats from Google Finance page
         # Google uses format: <div class="...">P/E ratio</div><div class="...">25.30</div>
-        stat_patterns = [
-            (r'P/E ratio.*?<div[^>]*>([0-9,.]+)', 'trailingPE'),
-            (r'Market cap.*?<div[^>]*>([0-9,.]+[TBMK]?)', 'marketCap_str'),
-            (r'Dividend yield.*?<div[^>]*>([0-9,.]+)%', 'dividendYield_pct'),
-            (r'52-wk high.*?<div[^>]*>([0-9,.]+)', 'fiftyTwoWeekHigh'),
-            (r'52-wk low.*?<div[^>]*>([0-9,.]+)', 'fiftyTwoWeekLow'),
-            (r'Prev close.*?<div[^>]*>([0-9,.]+)', 'previousClose'),
-            (r'Revenue.*?<div[^>]*>\$?₹?([0-9,.]+[TBMK]?)', 'revenue_str'),
-            (r'Net income.*?<div[^>]*>\$?₹?([0-9,.]+[TBMK]?)', 'netIncome_str'),
-            (r'EPS.*?<div[^>]*>\$?₹?([0-9,.]+)', 'eps'),
-        ]
-        
-        for pattern, key in stat_patterns:
-            m = re.search(pattern, text, re.DOTALL | re.IGNORECASE)
+        for stat_re, key in _GF_STAT_RES:
+            m = stat_re.search(text)
             if m:
                 val_str = m.group(1).replace(',', '')
                 try:
@@ -1104,7 +1568,7 @@ def fetch_google_finance(ticker: str) -> dict:
                     pass
         
         # Extract company name
-        name_match = re.search(r'<div[^>]*class="zzDege"[^>]*>([^<]+)', text)
+        name_match = _GF_NAME_RE.search(text)
         if name_match:
             info['longName'] = name_match.group(1).strip()
         
@@ -1118,48 +1582,62 @@ def fetch_google_finance(ticker: str) -> dict:
         print(f"❌ Google Finance scrape failed: {e}")
         return None
 
-import math as _math_global
+class FastJSONResponse(JSONResponse):
+    """orjson-rendered JSON — NaN/Infinity → null, numpy values serialize natively, unknown types → str"""
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=str, option=_ORJSON_OPTS)
 
-class NaNSafeEncoder(json.JSONEncoder):
-    """Custom JSON encoder that converts NaN/Infinity to null"""
-    def default(self, obj):
-        try:
-            return super().default(obj)
-        except TypeError:
-            return str(obj)
-    def encode(self, o):
-        return super().encode(self._sanitize(o))
-    def _sanitize(self, obj):
-        if isinstance(obj, float):
-            if _math_global.isnan(obj) or _math_global.isinf(obj):
-                return None
-            return obj
-        elif isinstance(obj, dict):
-            return {k: self._sanitize(v) for k, v in obj.items()}
-        elif isinstance(obj, list):
-            return [self._sanitize(i) for i in obj]
-        return obj
+def _sse(event: str, payload) -> bytes:
+    """One Server-Sent Events frame — `event: <name>` + orjson-encoded `data:` line."""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(payload, default=str, option=_ORJSON_OPTS) + b"\n\n"
 
-class SafeJSONResponse(JSONResponse):
-    def render(self, content) -> bytes:
-        return json.dumps(content, cls=NaNSafeEncoder, ensure_ascii=False).encode("utf-8")
+_SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def _etag_entry(content) -> dict:
+    """Render a JSON payload once for caching → {"etag", "body", "ts"}; cache hits then skip serialization."""
+    body = orjson.dumps(content, default=str, option=_ORJSON_OPTS)
+    return {"etag": f'"{hashlib.md5(body).hexdigest()}"', "body": body.decode("utf-8"), "ts": time.time()}
+
+def _etag_response(request: Request, entry: dict, ttl: int) -> Response:
+    """Serve a pre-rendered entry with ETag/Cache-Control — 304 when the client already has it.
+    max-age is the entry's remaining TTL, so browsers never hold it past the server-side expiry."""
+    if "body" not in entry:
+        entry = _etag_entry(entry)  # plain payload from an older writer — render it here
+    etag = entry.get("etag") or f'"{hashlib.md5(entry["body"].encode("utf-8")).hexdigest()}"'
+    age = time.time() - entry.get("ts", time.time())
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={max(0, int(ttl - age))}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry["body"], media_type="application/json", headers=headers)
 
-app = FastAPI(title="Celesys AI - Verified Live Data", default_response_class=SafeJSONResponse)
+app = FastAPI(title="Celesys AI - Verified Live Data", default_response_class=FastJSONResponse)
 
 # ═══ STARTUP: launch background pre-fetch for popular tickers ═══
 @app.on_event("startup")
 async def startup_event():
     asyncio.create_task(_start_prefetch_loop())
     print("🚀 Background price pre-fetcher started (90s interval)")
+    asyncio.create_task(_nse_cookie_refresher())
+    print(f"🍪 NSE cookie refresher started ({_NSE_COOKIE_REFRESH}s interval)")
+    asyncio.create_task(_persist_flusher())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Final write of any counter/vote changes the flusher hasn't picked up yet
+    _flush_persisted()
+    # Release pooled keep-alive connections cleanly
+    _http_pool.close()
+    _yahoo_crumb_session.close()
+    _nse_session.close()
+    _anthropic_pool.close()
 
 # ═══════════════════════════════════════════════════════════
 # SOURCE 5: FINVIZ FUNDAMENTALS (US stocks)
 # ═══════════════════════════════════════════════════════════
 def fetch_finviz_fundamentals(ticker: str) -> dict:
     """Scrape Finviz for P/E, P/B, Market Cap, margins, ROE, beta, debt/equity etc."""
-    import re as re_fv
     try:
-        clean_ticker = ticker.replace('.NS', '').replace('.BO', '')
+        clean_ticker = classify_ticker(ticker)[1]
         url = f"https://finviz.com/quote.ashx?t={clean_ticker}&ty=c&p=d&b=1"
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/122.0.0.0 Safari/537.36',
@@ -1167,7 +1645,7 @@ def fetch_finviz_fundamentals(ticker: str) -> dict:
             'Accept-Language': 'en-US,en;q=0.9',
             'Referer': 'https://finviz.com/',
         }
-        resp = requests.get(url, headers=headers, timeout=10)
+        resp = _http_pool.get(url, headers=headers, timeout=10)
         if resp.status_code != 200:
             print(f"  ⚠️ Finviz returned {resp.status_code}")
             return None
@@ -1195,13 +1673,13 @@ def fetch_finviz_fundamentals(ticker: str) -> dict:
         for label, (key, typ) in metric_map.items():
             # Try multiple patterns for Finviz HTML
             patterns = [
-                f'>{re_fv.escape(label)}</td>.*?<b>([^<]+)</b>',
-                f'>{re_fv.escape(label)}</td>\\s*<td[^>]*>([^<]+)</td>',
-                f'"{re_fv.escape(label)}"[^>]*>.*?<b>([^<]+)</b>',
+                f'>{re.escape(label)}</td>.*?<b>([^<]+)</b>',
+                f'>{re.escape(label)}</td>\\s*<td[^>]*>([^<]+)</td>',
+                f'"{re.escape(label)}"[^>]*>.*?<b>([^<]+)</b>',
             ]
             raw = None
             for pat in patterns:
-                m = re_fv.search(pat, text, re_fv.DOTALL | re_fv.I)
+                m = re.search(pat, text, re.DOTALL | re.I)
                 if m:
                     raw = m.group(1).strip()
                     if raw and raw != '-':
@@ -1228,9 +1706,9 @@ def fetch_finviz_fundamentals(ticker: str) -> dict:
                 pass
         
         # Sector/Industry
-        sec_m = re_fv.search(r'Sector[^<]*</a>.*?<a[^>]*>([^<]+)</a>', text, re_fv.DOTALL)
+        sec_m = re.search(r'Sector[^<]*</a>.*?<a[^>]*>([^<]+)</a>', text, re.DOTALL)
         if sec_m: result['sector'] = sec_m.group(1).strip()
-        ind_m = re_fv.search(r'Industry[^<]*</a>.*?<a[^>]*>([^<]+)</a>', text, re_fv.DOTALL)
+        ind_m = re.search(r'Industry[^<]*</a>.*?<a[^>]*>([^<]+)</a>', text, re.DOTALL)
         if ind_m: result['industry'] = ind_m.group(1).strip()
         
         if result:
@@ -1244,13 +1722,13 @@ def fetch_finviz_fundamentals(ticker: str) -> dict:
 def fetch_stockanalysis_fundamentals(ticker: str) -> dict:
     """Scrape stockanalysis.com for financials — another Yahoo alternative."""
     try:
-        clean = ticker.replace('.NS', '').replace('.BO', '')
+        clean = classify_ticker(ticker)[1]
         url = f"https://stockanalysis.com/stocks/{clean.lower()}/financials/quarterly/"
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/122.0.0.0 Safari/537.36',
             'Accept': 'text/html',
         }
-        resp = requests.get(url, headers=headers, timeout=10)
+        resp = _http_pool.get(url, headers=headers, timeout=10)
         if resp.status_code != 200:
             return {}
         text = resp.text
@@ -1258,7 +1736,7 @@ def fetch_stockanalysis_fundamentals(ticker: str) -> dict:
         
         # Try the overview page for ratios
         url2 = f"https://stockanalysis.com/stocks/{clean.lower()}/"
-        resp2 = requests.get(url2, headers=headers, timeout=8)
+        resp2 = _http_pool.get(url2, headers=headers, timeout=8)
         if resp2.status_code == 200:
             text2 = resp2.text
             
@@ -1310,17 +1788,17 @@ def fetch_screener_fundamentals(ticker: str) -> dict:
     """Scrape Screener.in API for Indian stock fundamentals (P/E, ROE, margins, etc.)"""
     try:
         # Convert .NS/.BO ticker to clean name for Screener
-        clean = ticker.replace('.NS', '').replace('.BO', '').upper()
+        clean = classify_ticker(ticker)[1].upper()
         url = f"https://www.screener.in/api/company/{clean}/consolidated/"
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/122.0.0.0',
             'Accept': 'application/json',
         }
-        resp = requests.get(url, headers=headers, timeout=10)
+        resp = _http_pool.get(url, headers=headers, timeout=10)
         if resp.status_code != 200:
             # Try standalone
             url = f"https://www.screener.in/api/company/{clean}/"
-            resp = requests.get(url, headers=headers, timeout=10)
+            resp = _http_pool.get(url, headers=headers, timeout=10)
         
         if resp.status_code != 200 or 'json' not in resp.headers.get('content-type', ''):
             return None
@@ -1389,7 +1867,7 @@ CACHE_STALE_OK_MINUTES = 15  # 15 min stale max — never serve 2hr old data
 # EMAIL-BASED RATE LIMITING
 # Goal: Keep usage at ~80% capacity, fair access per user
 # ═══════════════════════════════════════════════════════════
-email_rate_limiter = {}  # { email: [timestamp1, timestamp2, ...] }
+email_rate_limiter = {}  # { email: deque([timestamp1, timestamp2, ...], maxlen=RATE_LIMIT_MAX_REQUESTS) }
 RATE_LIMIT_MAX_REQUESTS = 5       # Max reports per email per window
 RATE_LIMIT_WINDOW_MINUTES = 60    # Rolling window in minutes
 GLOBAL_REQUESTS_PER_MINUTE = 10   # Global cap across all users (80% of API capacity)
@@ -1437,6 +1915,34 @@ def _set_cached_report(ticker_key, response_dict):
     if len(_ai_report_cache) > 200:
         oldest_key = min(_ai_report_cache, key=lambda k: _ai_report_cache[k][1])
         del _ai_report_cache[oldest_key]
+
+# ═══ REPORT DATA CACHE — live data, mgmt context and verdict per company ═══
+# Key: SHA256(resolved ticker|IST date|schema) in the shared cache (Redis when configured)
+# TTL: 5 minutes — repeat lookups skip every Yahoo call and the 20-factor scoring;
+# a hit labels the prompt's market data with the time the snapshot was taken
+# REPORT_DATA_CACHE: "enabled" (default), "read-only" (never writes),
+#                    "replay" (cache only — a miss is an error, zero Yahoo calls), "off"
+_REPORT_DATA_TTL = 300
+_REPORT_DATA_SCHEMA = "v25"
+REPORT_DATA_CACHE = os.getenv("REPORT_DATA_CACHE", "enabled").strip().lower()
+
+def _report_data_key(ticker):
+    """Cache key for a resolved ticker's report inputs, bucketed by IST trading day."""
+    day = (datetime.utcnow() + IST_OFFSET).date().isoformat()
+    raw = f"{ticker}|{day}|{_REPORT_DATA_SCHEMA}"
+    return "rdata:" + hashlib.sha256(raw.encode()).hexdigest()
+
+async def _get_report_data(key):
+    """Return cached report inputs, or None on a miss or when the cache is off."""
+    if REPORT_DATA_CACHE == "off":
+        return None
+    return await _shared_cache_aget(key)
+
+async def _set_report_data(key, payload):
+    """Store report inputs — only when the policy allows writes."""
+    if REPORT_DATA_CACHE == "enabled":
+        await _shared_cache_aset(key, payload, _REPORT_DATA_TTL)
+
 COUNTER_FILE = "report_count.json"
 
 def load_counter():
@@ -1468,6 +1974,22 @@ def save_counter():
 load_counter()
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 
+# ═══ ANTHROPIC CLIENT — own keep-alive pool, auth headers set once ═══
+# Separate from _http_pool so report calls never queue behind scrapers (and don't send a browser UA).
+# Calls still run on _thread_pool; connect fails fast, the read timeout is the per-model budget.
+_ANTHROPIC_URL = "https://api.anthropic.com/v1/messages"
+_ANTHROPIC_CONNECT_TIMEOUT = 5
+_anthropic_pool = requests.Session()
+_anthropic_pool.headers.update({"anthropic-version": "2023-06-01", "content-type": "application/json"})
+if ANTHROPIC_API_KEY:
+    _anthropic_pool.headers["x-api-key"] = ANTHROPIC_API_KEY
+_anthropic_pool.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=32))
+
+def _anthropic_post(payload: dict, timeout_s, stream: bool = False):
+    """POST /v1/messages on the pooled Anthropic session."""
+    return _anthropic_pool.post(_ANTHROPIC_URL, json=payload,
+                                timeout=(_ANTHROPIC_CONNECT_TIMEOUT, timeout_s), stream=stream)
+
 # ═══════════════════════════════════════════════════════════
 # FEATURE VOTING SYSTEM
 # ═══════════════════════════════════════════════════════════
@@ -1482,6 +2004,9 @@ feature_votes = {
     "theme": {"up": 0, "dn": 0},
 }
 VOTES_FILE = "feature_votes.json"
+# Running tally + pre-rendered /api/votes body, kept in step by cast_vote so polling GETs are O(1)
+_total_votes = 0
+_votes_body = None
 
 def load_votes():
     """Load feature votes from file (survives restarts/deploys)."""
@@ -1492,7 +2017,9 @@ def load_votes():
             for k in feature_votes:
                 if k in data:
                     feature_votes[k] = data[k]
-            print(f"🗳️ Loaded votes: {sum(v['up']+v['dn'] for v in feature_votes.values())} total")
+            global _total_votes
+            _total_votes = sum(v['up'] + v['dn'] for v in feature_votes.values())
+            print(f"🗳️ Loaded votes: {_total_votes} total")
     except FileNotFoundError:
         save_votes()
         print("🗳️ Initialized empty vote file")
@@ -1510,6 +2037,31 @@ def save_votes():
 
 load_votes()
 
+# Request paths only mark the counter/votes dirty; a background task writes them every few seconds
+# (and once more on shutdown), so reports and votes never wait on a file rewrite
+_PERSIST_FLUSH_INTERVAL = 5
+_persist_dirty = set()  # {"counter", "votes"}
+
+def _flush_persisted():
+    """Write whichever of the counter / votes files changed since the last flush."""
+    dirty = set()
+    while _persist_dirty:
+        dirty.add(_persist_dirty.pop())
+    if "counter" in dirty:
+        save_counter()
+    if "votes" in dirty:
+        save_votes()
+
+async def _persist_flusher():
+    while True:
+        await asyncio.sleep(_PERSIST_FLUSH_INTERVAL)
+        if _persist_dirty:
+            try:
+                loop = asyncio.get_event_loop()
+                await loop.run_in_executor(_thread_pool, _flush_persisted)
+            except Exception as e:
+                print(f"⚠️ Persist flush error: {e}")
+
 # Clean up FII/DII history file on startup (remove duplicates)
 try:
     _fii_file = "fii_dii_history.json"
@@ -1531,55 +2083,116 @@ except Exception as _e:
     print(f"FII history cleanup skipped: {_e}")
 
 
+# Request logs live in Redis sorted sets when REDIS_URL is set (shared by every uvicorn
+# worker, survives restarts); otherwise in the in-process lists above
+_RL_REDIS_PREFIX = "ratelimit:"
+_RL_GLOBAL_KEY = "_global"
+
+def _rl_redis_window(key: str, now: datetime, window: timedelta):
+    """Trim and read one request log from Redis in a single round trip. None without Redis."""
+    if not _redis_available():
+        return None
+    try:
+        rkey = _RL_REDIS_PREFIX + key
+        pipe = _redis.pipeline()
+        pipe.zremrangebyscore(rkey, "-inf", (now - window).timestamp())
+        pipe.zrange(rkey, 0, -1, withscores=True)
+        _, entries = pipe.execute()
+        return [datetime.fromtimestamp(ts) for _, ts in entries]
+    except Exception as e:
+        _redis_failed(e)
+        return None
+
+# Admission check + reservation for one report in a single atomic round trip: trim both logs, refuse
+# on the global per-minute cap or the per-email window, else log the request in both. Returns
+# {status (-1 global full, 0 email full, 1 admitted), email count incl. this one, oldest email score}.
+_RL_ACQUIRE_LUA = """
+local now = tonumber(ARGV[1])
+local win, max, gwin, gmax = tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4]), tonumber(ARGV[5])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now - gwin)
+if redis.call('ZCARD', KEYS[2]) >= gmax then return {-1, 0, '0'} end
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - win)
+local used = redis.call('ZCARD', KEYS[1])
+if used >= max then
+    local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    return {0, used, oldest[2]}
+end
+redis.call('ZADD', KEYS[1], now, ARGV[6])
+redis.call('EXPIRE', KEYS[1], win + 60)
+redis.call('ZADD', KEYS[2], now, ARGV[6])
+redis.call('EXPIRE', KEYS[2], gwin + 60)
+return {1, used + 1, '0'}
+"""
+_rl_acquire_script = _redis.register_script(_RL_ACQUIRE_LUA) if _redis is not None else None
+
+# In-process logs are read and appended by concurrent handlers — check + record under one lock
+_rl_lock = threading.Lock()
+
+def _rl_local_window(email_lower: str, cutoff: datetime) -> deque:
+    """In-process request log for one email, with expired entries popped off the left."""
+    email_log = email_rate_limiter.get(email_lower)
+    if email_log is None:
+        email_log = email_rate_limiter[email_lower] = deque(maxlen=RATE_LIMIT_MAX_REQUESTS)
+    while email_log and email_log[0] <= cutoff:
+        email_log.popleft()
+    return email_log
+
+
+def _rl_global_refusal() -> dict:
+    return {
+        "allowed": False,
+        "reason": "High demand right now. Please try again in a minute.",
+        "retry_after_minutes": 1
+    }
+
+def _rl_email_refusal(requests_used: int, oldest: datetime, now: datetime, window: timedelta) -> dict:
+    # Retry once the oldest request in the window expires
+    retry_at = oldest + window
+    retry_seconds = max(60, int((retry_at - now).total_seconds()))
+    retry_minutes = (retry_seconds + 59) // 60  # round up
+    retry_at_str = retry_at.strftime("%I:%M %p")
+    return {
+        "allowed": False,
+        "reason": f"You've used {requests_used}/{RATE_LIMIT_MAX_REQUESTS} reports this hour.",
+        "retry_after_minutes": retry_minutes,
+        "retry_after_seconds": retry_seconds,
+        "retry_at": retry_at.isoformat(),
+        "retry_at_display": retry_at_str,
+        "requests_used": requests_used,
+        "requests_limit": RATE_LIMIT_MAX_REQUESTS
+    }
+
 def check_rate_limit(email: str) -> dict:
     """
+    Read-only quota preview (the /api/check-rate-limit pre-flight) — admission itself is acquire_rate_limit.
     Check email-based + global rate limits.
     Returns {"allowed": True} or {"allowed": False, "reason": ..., "retry_after_minutes": ...}
     """
     now = datetime.now()
-    cutoff = now - timedelta(minutes=RATE_LIMIT_WINDOW_MINUTES)
+    window = timedelta(minutes=RATE_LIMIT_WINDOW_MINUTES)
+    cutoff = now - window
     email_lower = email.lower().strip()
 
     # --- Clean up old global entries ---
-    global global_request_log
-    global_request_log = [t for t in global_request_log if t > now - timedelta(minutes=1)]
+    recent_global = _rl_redis_window(_RL_GLOBAL_KEY, now, timedelta(minutes=1))
+    if recent_global is None:
+        global global_request_log
+        global_request_log = [t for t in global_request_log if t > now - timedelta(minutes=1)]
+        recent_global = global_request_log
 
     # --- Global rate limit (protect API capacity) ---
-    if len(global_request_log) >= GLOBAL_REQUESTS_PER_MINUTE:
-        return {
-            "allowed": False,
-            "reason": "High demand right now. Please try again in a minute.",
-            "retry_after_minutes": 1
-        }
+    if len(recent_global) >= GLOBAL_REQUESTS_PER_MINUTE:
+        return _rl_global_refusal()
 
     # --- Per-email rate limit ---
-    if email_lower not in email_rate_limiter:
-        email_rate_limiter[email_lower] = []
-
-    # Clean old entries for this email
-    email_rate_limiter[email_lower] = [
-        t for t in email_rate_limiter[email_lower] if t > cutoff
-    ]
+    email_log = _rl_redis_window(email_lower, now, window)
+    if email_log is None:
+        email_log = _rl_local_window(email_lower, cutoff)
 
-    requests_used = len(email_rate_limiter[email_lower])
+    requests_used = len(email_log)
 
     if requests_used >= RATE_LIMIT_MAX_REQUESTS:
-        # Find when the oldest request in the window will expire
-        oldest = min(email_rate_limiter[email_lower])
-        retry_at = oldest + timedelta(minutes=RATE_LIMIT_WINDOW_MINUTES)
-        retry_seconds = max(60, int((retry_at - now).total_seconds()))
-        retry_minutes = (retry_seconds + 59) // 60  # round up
-        retry_at_str = retry_at.strftime("%I:%M %p")
-        return {
-            "allowed": False,
-            "reason": f"You've used {requests_used}/{RATE_LIMIT_MAX_REQUESTS} reports this hour.",
-            "retry_after_minutes": retry_minutes,
-            "retry_after_seconds": retry_seconds,
-            "retry_at": retry_at.isoformat(),
-            "retry_at_display": retry_at_str,
-            "requests_used": requests_used,
-            "requests_limit": RATE_LIMIT_MAX_REQUESTS
-        }
+        return _rl_email_refusal(requests_used, email_log[0], now, window)
 
     return {
         "allowed": True,
@@ -1588,15 +2201,113 @@ def check_rate_limit(email: str) -> dict:
     }
 
 
-def record_request(email: str):
-    """Record a successful request for rate limiting."""
+def acquire_rate_limit(email: str) -> dict:
+    """
+    Check the limits and reserve this request in one atomic step — Lua EVAL when Redis is up, else the
+    in-process logs under _rl_lock — so concurrent requests can't all pass before any is recorded.
+    Same shape as check_rate_limit; when allowed, "requests_used" includes this request and
+    "reservation" is what release_rate_limit takes back if the report then fails. Blocking.
+    """
     now = datetime.now()
+    window = timedelta(minutes=RATE_LIMIT_WINDOW_MINUTES)
     email_lower = email.lower().strip()
-    if email_lower not in email_rate_limiter:
-        email_rate_limiter[email_lower] = []
-    email_rate_limiter[email_lower].append(now)
-    global_request_log.append(now)
+    member = f"{now.timestamp()}:{random.random()}"
+    if _rl_acquire_script is not None and _redis_available():
+        try:
+            status, used, oldest = _rl_acquire_script(
+                keys=[_RL_REDIS_PREFIX + email_lower, _RL_REDIS_PREFIX + _RL_GLOBAL_KEY],
+                args=[now.timestamp(), int(window.total_seconds()), RATE_LIMIT_MAX_REQUESTS,
+                      60, GLOBAL_REQUESTS_PER_MINUTE, member])
+            if status < 0:
+                return _rl_global_refusal()
+            if status == 0:
+                return _rl_email_refusal(used, datetime.fromtimestamp(float(oldest)), now, window)
+            return {"allowed": True, "requests_used": used,
+                    "requests_remaining": RATE_LIMIT_MAX_REQUESTS - used, "reservation": ("redis", email_lower, member)}
+        except Exception as e:
+            _redis_failed(e)
+
+    global global_request_log
+    with _rl_lock:
+        global_request_log = [t for t in global_request_log if t > now - timedelta(minutes=1)]
+        if len(global_request_log) >= GLOBAL_REQUESTS_PER_MINUTE:
+            return _rl_global_refusal()
+        email_log = _rl_local_window(email_lower, now - window)
+        if len(email_log) >= RATE_LIMIT_MAX_REQUESTS:
+            return _rl_email_refusal(len(email_log), email_log[0], now, window)
+        email_log.append(now)
+        global_request_log.append(now)
+        used = len(email_log)
+    return {"allowed": True, "requests_used": used,
+            "requests_remaining": RATE_LIMIT_MAX_REQUESTS - used, "reservation": ("local", email_lower, now)}
+
+
+def release_rate_limit(reservation):
+    """Give back a reservation from acquire_rate_limit — the report failed, so it doesn't count. Blocking."""
+    if not reservation:
+        return
+    where, email_lower, entry = reservation
+    try:
+        if where == "redis":
+            pipe = _redis.pipeline()
+            pipe.zrem(_RL_REDIS_PREFIX + email_lower, entry)
+            pipe.zrem(_RL_REDIS_PREFIX + _RL_GLOBAL_KEY, entry)
+            pipe.execute()
+        else:
+            with _rl_lock:
+                email_log = email_rate_limiter.get(email_lower)
+                if email_log and entry in email_log:
+                    email_log.remove(entry)
+                if entry in global_request_log:
+                    global_request_log.remove(entry)
+    except Exception as e:
+        print(f"⚠️ Rate-limit release failed: {e}")
+
+
+# Comprehensive ticker mapping — company name fragment → Yahoo symbol
+_TICKER_MAP = {
+    # US Stocks
+    'tesla': 'TSLA', 'tsla': 'TSLA',
+    'apple': 'AAPL', 'aapl': 'AAPL',
+    'microsoft': 'MSFT', 'msft': 'MSFT',
+    'amazon': 'AMZN', 'amzn': 'AMZN',
+    'google': 'GOOGL', 'googl': 'GOOGL', 'alphabet': 'GOOGL',
+    'meta': 'META', 'facebook': 'META',
+    'nvidia': 'NVDA', 'nvda': 'NVDA',
+    'netflix': 'NFLX', 'nflx': 'NFLX',
+    'jpmorgan': 'JPM', 'jpm': 'JPM',
+    
+    # Indian Stocks  
+    'hdfc bank': 'HDFCBANK.NS', 'hdfc': 'HDFCBANK.NS', 'hdfcbank': 'HDFCBANK.NS',
+    'reliance': 'RELIANCE.NS', 'reliance industries': 'RELIANCE.NS',
+    'tcs': 'TCS.NS', 'tata consultancy': 'TCS.NS',
+    'infosys': 'INFY', 'infy': 'INFY',
+    'wipro': 'WIPRO.NS',
+    'icici bank': 'ICICIBANK.NS', 'icici': 'ICICIBANK.NS',
+    'sbi': 'SBIN.NS', 'state bank': 'SBIN.NS',
+}
 
+def resolve_ticker(company_name: str) -> str:
+    """Map a company name or ticker to its Yahoo symbol — pure lookup, no network."""
+    company_lower = company_name.lower().strip()
+    ticker_symbol = None
+    
+    # Check mapping first
+    for key, value in _TICKER_MAP.items():
+        if key in company_lower:
+            ticker_symbol = value
+            break
+    
+    # If not found, try as ticker directly
+    if not ticker_symbol:
+        if len(company_name) <= 6 and '.' not in company_name:
+            ticker_symbol = company_name.upper()
+        elif '.NS' in company_name.upper() or '.BO' in company_name.upper():
+            ticker_symbol = company_name.upper()
+        else:
+            ticker_symbol = company_name.upper()
+    
+    return ticker_symbol
 
 def get_live_stock_data(company_name: str) -> dict:
     """
@@ -1620,46 +2331,7 @@ def get_live_stock_data(company_name: str) -> dict:
             else:
                 print(f"♻️ Cache expired for {cache_key}, fetching fresh data")
         
-        # Comprehensive ticker mapping
-        ticker_map = {
-            # US Stocks
-            'tesla': 'TSLA', 'tsla': 'TSLA',
-            'apple': 'AAPL', 'aapl': 'AAPL',
-            'microsoft': 'MSFT', 'msft': 'MSFT',
-            'amazon': 'AMZN', 'amzn': 'AMZN',
-            'google': 'GOOGL', 'googl': 'GOOGL', 'alphabet': 'GOOGL',
-            'meta': 'META', 'facebook': 'META',
-            'nvidia': 'NVDA', 'nvda': 'NVDA',
-            'netflix': 'NFLX', 'nflx': 'NFLX',
-            'jpmorgan': 'JPM', 'jpm': 'JPM',
-            
-            # Indian Stocks  
-            'hdfc bank': 'HDFCBANK.NS', 'hdfc': 'HDFCBANK.NS', 'hdfcbank': 'HDFCBANK.NS',
-            'reliance': 'RELIANCE.NS', 'reliance industries': 'RELIANCE.NS',
-            'tcs': 'TCS.NS', 'tata consultancy': 'TCS.NS',
-            'infosys': 'INFY', 'infy': 'INFY',
-            'wipro': 'WIPRO.NS',
-            'icici bank': 'ICICIBANK.NS', 'icici': 'ICICIBANK.NS',
-            'sbi': 'SBIN.NS', 'state bank': 'SBIN.NS',
-        }
-        
-        company_lower = company_name.lower().strip()
-        ticker_symbol = None
-        
-        # Check mapping first
-        for key, value in ticker_map.items():
-            if key in company_lower:
-                ticker_symbol = value
-                break
-        
-        # If not found, try as ticker directly
-        if not ticker_symbol:
-            if len(company_name) <= 6 and '.' not in company_name:
-                ticker_symbol = company_name.upper()
-            elif '.NS' in company_name.upper() or '.BO' in company_name.upper():
-                ticker_symbol = company_name.upper()
-            else:
-                ticker_symbol = company_name.upper()
+        ticker_symbol = resolve_ticker(company_name)
         
         # ════════════════════════════════════════════
         # 3-SOURCE FALLBACK CHAIN
@@ -1935,51 +2607,47 @@ def get_live_stock_data(company_name: str) -> dict:
             if final_missing:
                 print(f"⚠️ FINAL RESORT for {', '.join(final_missing)}: Yahoo crumb session...")
                 try:
-                    session = requests.Session()
-                    session.headers.update({
-                        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Safari/605.1.15',
-                    })
-                    # Get crumb
+                    session = _yahoo_crumb_session
+                    # Get crumb — each Yahoo request waits on the host limiter
                     cr = session.get('https://fc.yahoo.com', timeout=5)
+                    _throttle('https://query2.finance.yahoo.com/')
                     crumb_r = session.get('https://query2.finance.yahoo.com/v1/test/getcrumb', timeout=5)
                     if crumb_r.status_code == 200:
                         crumb = crumb_r.text.strip()
                         if crumb and len(crumb) < 20:
                             modules = 'defaultKeyStatistics,financialData,summaryDetail'
                             v10_url = f'https://query2.finance.yahoo.com/v10/finance/quoteSummary/{ticker_symbol}?modules={modules}&crumb={crumb}'
+                            _throttle(v10_url)
                             dr = session.get(v10_url, timeout=8)
                             ct = dr.headers.get('content-type', '')
                             if dr.status_code == 200 and 'json' in ct:
-                                d10 = dr.json().get('quoteSummary', {}).get('result', [])
+                                d10 = _resp_json(dr).get('quoteSummary', {}).get('result', [])
                                 if d10:
                                     d10 = d10[0]
-                                    def rv10(sec, key):
-                                        return d10.get(sec, {}).get(key, {}).get('raw', 0) if isinstance(d10.get(sec, {}).get(key, {}), dict) else 0
-                                    
                                     enriched = []
                                     if not info.get('trailingPE') or info['trailingPE'] == 0:
-                                        pe_val = rv10('summaryDetail', 'trailingPE')
+                                        pe_val = _raw(d10, 'summaryDetail', 'trailingPE')
                                         if pe_val: info['trailingPE'] = pe_val; enriched.append(f'PE={pe_val}')
                                     if not info.get('marketCap') or info['marketCap'] == 0:
-                                        mc = rv10('summaryDetail', 'marketCap')
+                                        mc = _raw(d10, 'summaryDetail', 'marketCap')
                                         if mc: info['marketCap'] = mc; enriched.append(f'MCap={mc}')
                                     if not info.get('profitMargins') or info['profitMargins'] == 0:
-                                        pm_val = rv10('financialData', 'profitMargins')
+                                        pm_val = _raw(d10, 'financialData', 'profitMargins')
                                         if pm_val: info['profitMargins'] = pm_val; enriched.append(f'PM={pm_val}')
                                     if not info.get('operatingMargins') or info['operatingMargins'] == 0:
-                                        om_val = rv10('financialData', 'operatingMargins')
+                                        om_val = _raw(d10, 'financialData', 'operatingMargins')
                                         if om_val: info['operatingMargins'] = om_val; enriched.append(f'OM={om_val}')
                                     if not info.get('returnOnEquity') or info['returnOnEquity'] == 0:
-                                        roe_val = rv10('financialData', 'returnOnEquity')
+                                        roe_val = _raw(d10, 'financialData', 'returnOnEquity')
                                         if roe_val: info['returnOnEquity'] = roe_val; enriched.append(f'ROE={roe_val}')
                                     if not info.get('debtToEquity'):
-                                        de_val = rv10('financialData', 'debtToEquity')
+                                        de_val = _raw(d10, 'financialData', 'debtToEquity')
                                         if de_val: info['debtToEquity'] = de_val; enriched.append(f'D/E={de_val}')
                                     if not info.get('priceToBook') or info['priceToBook'] == 0:
-                                        pb_val = rv10('defaultKeyStatistics', 'priceToBook')
+                                        pb_val = _raw(d10, 'defaultKeyStatistics', 'priceToBook')
                                         if pb_val: info['priceToBook'] = pb_val; enriched.append(f'PB={pb_val}')
                                     if not info.get('beta') or info['beta'] == 0:
-                                        beta_val = rv10('defaultKeyStatistics', 'beta')
+                                        beta_val = _raw(d10, 'defaultKeyStatistics', 'beta')
                                         if beta_val: info['beta'] = beta_val; enriched.append(f'Beta={beta_val}')
                                     if enriched:
                                         print(f"  ✅ Yahoo crumb session: {', '.join(enriched)}")
@@ -2098,10 +2766,16 @@ def get_live_stock_data(company_name: str) -> dict:
         print(f"📝 Company desc: {'YES ('+str(len(str(info.get('longBusinessSummary',''))))+'ch)' if info.get('longBusinessSummary') else 'NO'}")
         print(f"📝 Employees: {info.get('fullTimeEmployees', 'N/A')}, Website: {info.get('website', 'N/A')}")
         
+        # Fan out the three chart histories at once on the yf pool so they overlap instead of
+        # running back-to-back — each on its own Ticker, the Yahoo session/crumb is shared
+        _hist_futs = {
+            period: _yf_pool.submit(yf.Ticker(ticker_symbol).history, period=period, interval=interval)
+            for period, interval in (("6mo", "1mo"), ("5y", "1mo"), ("1y", "1d"))
+        }
+        
         # Fetch real 6-month price history for Price Trend chart
         try:
-            hist_ticker = stock or yf.Ticker(ticker_symbol)  # Reuse Source 1 Ticker (saves 2-3s)
-            hist = hist_ticker.history(period="6mo", interval="1mo")
+            hist = _hist_futs["6mo"].result(timeout=8)
             if hist is not None and len(hist) > 1:
                 price_history = [round(float(row['Close']), 2) for _, row in hist.iterrows()]
                 live_data["price_history"] = price_history
@@ -2114,11 +2788,9 @@ def get_live_stock_data(company_name: str) -> dict:
         
         # ═══ STOCK YTD + 5-YEAR YEARLY RETURNS ═══
         try:
-            _yr_tk = stock or yf.Ticker(ticker_symbol)
-            _yr_hist = _yr_tk.history(period="5y", interval="1mo")
+            _yr_hist = _hist_futs["5y"].result(timeout=8)
             if _yr_hist is not None and len(_yr_hist) > 12:
-                from datetime import datetime as _dt
-                _cur_yr = _dt.utcnow().year
+                _cur_yr = datetime.utcnow().year
                 _yearly = {}
                 # YTD
                 try:
@@ -2147,9 +2819,8 @@ def get_live_stock_data(company_name: str) -> dict:
         # ═══ TECHNICAL INDICATORS: SMA20, SMA200, EPS Growth, Sector PE ═══
         # Also compute YTD + yearly returns from daily history
         try:
-            tk = stock or yf.Ticker(ticker_symbol)  # Reuse Source 1 Ticker (saves 2-3s)
             # Daily history for moving averages
-            daily = tk.history(period="1y", interval="1d")
+            daily = _hist_futs["1y"].result(timeout=8)
             if daily is not None and len(daily) > 20:
                 closes = daily['Close'].values
                 sma20 = round(float(closes[-20:].mean()), 2) if len(closes) >= 20 else None
@@ -2293,8 +2964,7 @@ def get_live_stock_data(company_name: str) -> dict:
                         try:
                             ed_df = tk_ins.earnings_dates
                             if ed_df is not None and len(ed_df) > 0:
-                                from datetime import datetime as _dt
-                                now = _dt.utcnow()
+                                now = datetime.utcnow()
                                 for idx_r in range(len(ed_df)):
                                     date_val = ed_df.index[idx_r]
                                     if hasattr(date_val, 'to_pydatetime'):
@@ -3158,6 +3828,58 @@ def _load_trade_history():
         pass
     return {}
 
+# Read-side cache: "entry" → (file mtime, history, dates newest-first); dropped on every save
+_trade_history_cache = {}
+
+def _trade_history_by_date():
+    """(history, dates newest-first) — the file is re-read and re-sorted only after it changes."""
+    try:
+        mtime = os.path.getmtime(TRADES_HISTORY_FILE)
+    except OSError:
+        return {}, []
+    entry = _trade_history_cache.get("entry")
+    if entry is None or entry[0] != mtime:
+        history = _load_trade_history()
+        entry = (mtime, history, sorted(history, reverse=True))
+        _trade_history_cache["entry"] = entry
+    return entry[1], entry[2]
+
+# Closed-day [open, high, low, close] per "TICKER|date" — validation refetches nothing it has seen before
+TRADE_PRICES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "trade_prices.json")
+
+def _load_trade_prices():
+    try:
+        if os.path.exists(TRADE_PRICES_FILE):
+            with open(TRADE_PRICES_FILE, 'r') as f:
+                return json.load(f)
+    except:
+        pass
+    return {}
+
+# Validations run concurrently on _thread_pool — one writer at a time, and readers never see a half-written file
+_trade_prices_lock = threading.Lock()
+
+def _save_trade_prices(prices):
+    tmp = f"{TRADE_PRICES_FILE}.{os.getpid()}.tmp"
+    try:
+        with _trade_prices_lock:
+            with open(tmp, 'w') as f:
+                json.dump(prices, f)
+            os.replace(tmp, TRADE_PRICES_FILE)
+    except Exception as e:
+        print(f"⚠️ Trade price cache save failed: {e}")
+
+# Session end in UTC on the trade date, plus a margin for late bars — a day's range is only final
+# (and only cached to disk) after this. US uses the EST close, so it is conservative during EDT.
+_NSE_CLOSE_UTC = timedelta(hours=10, minutes=30)  # 15:30 IST + 30 min
+_US_CLOSE_UTC = timedelta(hours=21, minutes=30)   # 16:00 EST + 30 min
+
+def _trade_day_closed(ticker, date_str, now_utc):
+    """True once the ticker's exchange has closed for date_str (Indian stocks and INDEX_TICKERS → NSE)."""
+    is_indian = classify_ticker(ticker)[0] or ticker in INDEX_TICKERS.values()
+    close = datetime.strptime(date_str, '%Y-%m-%d') + (_NSE_CLOSE_UTC if is_indian else _US_CLOSE_UTC)
+    return now_utc >= close
+
 def _save_trades_to_history(trades_data, date_str):
     """Save generated trades for later validation"""
     try:
@@ -3202,6 +3924,7 @@ def _save_trades_to_history(trades_data, date_str):
                     del history[k]
             with open(TRADES_HISTORY_FILE, 'w') as f:
                 json.dump(history, f, indent=2)
+            _trade_history_cache.pop("entry", None)
             print(f"💾 Saved {len(saved)} trades for {date_str}")
     except Exception as e:
         print(f"⚠️ Trade history save error: {e}")
@@ -3213,7 +3936,6 @@ _nse_cache_ts = {}
 async def nse_options(symbol: str = "NIFTY"):
     """Fetch real NSE options chain, VIX, PCR, OI, Max Pain for confluence engine."""
     import requests as req
-    from datetime import datetime, timedelta
     
     symbol = symbol.upper().strip()
     cache_key = symbol
@@ -3406,7 +4128,6 @@ _fund_cache_ts = None
 async def fund_live():
     """Fetch live NAV, returns, AUM for all ETFs and funds. 30-min cache."""
     global _fund_cache, _fund_cache_ts
-    from datetime import datetime, timedelta
     import numpy as np
     
     now = datetime.utcnow()
@@ -3613,7 +4334,7 @@ async def global_ticker():
         gsr = round(gold_price / silver_price, 1)
         results.append({"name": "GSR", "flag": "⚖️", "price": gsr, "change": 0, "change_pct": 0})
     
-    IST = datetime.utcnow() + timedelta(hours=5, minutes=30)
+    IST = datetime.utcnow() + IST_OFFSET
     
     # ═══ GENERATE LIVE ECONOMIC NEWS HEADLINES from market data ═══
     news = []
@@ -3745,7 +4466,6 @@ async def stock_data_endpoint(company: str = ""):
 async def stock_quick(ticker: str = ""):
     """Lightweight stock data — returns only metrics needed for decision algorithm. No AI, instant response."""
     import yfinance as yf
-    from datetime import datetime, timedelta
     
     ticker = ticker.strip().upper()
     if not ticker:
@@ -3800,14 +4520,13 @@ async def stock_quick(ticker: str = ""):
         # Source 3: Google Finance if still no price
         if not price:
             try:
-                import re as _re
                 is_ind = '.NS' in ticker or '.BO' in ticker
                 clean = ticker.replace('.NS','').replace('.BO','')
                 g_url = f"https://www.google.com/finance/quote/{clean}:NSE" if is_ind else f"https://www.google.com/finance/quote/{clean}:NASDAQ"
                 _h = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/122.0.0.0', 'Accept': 'text/html'}
                 r = _http_pool.get(g_url, headers={'Accept':'text/html'}, timeout=3)
                 if r.status_code == 200:
-                    pm = _re.search(r'data-last-price="([0-9.]+)"', r.text)
+                    pm = re.search(r'data-last-price="([0-9.]+)"', r.text)
                     if pm:
                         price = float(pm.group(1))
                         info = {**info, 'currentPrice': price, 'longName': ticker}
@@ -3828,6 +4547,13 @@ async def stock_quick(ticker: str = ""):
             except:
                 return default
         
+        def _pct(key, digits=2):
+            """Ratio (0.12) or percent (12.0) field → percent, 'N/A' when missing."""
+            v = sn(key)
+            if not v:
+                return 'N/A'
+            return round(v * 100, digits) if abs(v) < 1 else round(v, digits)
+        
         # SMA calculations
         sma20 = sma50 = sma200 = None
         try:
@@ -3851,23 +4577,8 @@ async def stock_quick(ticker: str = ""):
         except:
             pass
         
-        # Revenue growth
-        rev_growth = sn('revenueGrowth')
-        if rev_growth and abs(rev_growth) < 1:
-            rev_growth = round(rev_growth * 100, 2)
-        elif rev_growth:
-            rev_growth = round(rev_growth, 2)
-        else:
-            rev_growth = 'N/A'
-        
-        # Earnings growth
-        eg = sn('earningsGrowth')
-        if eg and abs(eg) < 1 and eg != 0:
-            eg = round(eg * 100, 1)
-        elif eg:
-            eg = round(eg, 1)
-        else:
-            eg = 'N/A'
+        rev_growth = _pct('revenueGrowth')
+        eg = _pct('earningsGrowth', 1)
         
         # Sector PE
         sector_pe_map = {
@@ -3878,13 +4589,8 @@ async def stock_quick(ticker: str = ""):
         }
         sec = info.get('sector', '')
         
-        pm = sn('profitMargins')
-        if pm and abs(pm) < 1:
-            pm = round(pm * 100, 2)
-        
-        roe_val = sn('returnOnEquity')
-        if roe_val and abs(roe_val) < 1:
-            roe_val = round(roe_val * 100, 2)
+        pm = _pct('profitMargins')
+        roe_val = _pct('returnOnEquity')
         
         currency = info.get('currency', 'USD')
         
@@ -3897,8 +4603,8 @@ async def stock_quick(ticker: str = ""):
             "pe_ratio": round(sn('trailingPE'), 2) if sn('trailingPE') else 'N/A',
             "forward_pe": round(sn('forwardPE'), 2) if sn('forwardPE') else 'N/A',
             "pb_ratio": round(sn('priceToBook'), 2) if sn('priceToBook') else 'N/A',
-            "profit_margin": pm or 'N/A',
-            "roe": roe_val or 'N/A',
+            "profit_margin": pm,
+            "roe": roe_val,
             "beta": round(sn('beta', 1), 2),
             "dividend_yield": round(sn('dividendYield') * 100, 2) if sn('dividendYield') and sn('dividendYield') < 1 else round(sn('dividendYield'), 2) if sn('dividendYield') else 0,
             "week52_high": round(sn('fiftyTwoWeekHigh'), 2),
@@ -3962,10 +4668,9 @@ async def test_price(ticker: str):
 @app.post("/api/batch-prices")
 async def batch_prices(request: Request):
     """Fetch live prices. Always fetches fresh — no stale cache."""
-    import re as re_bp
     
     try:
-        data = await request.json()
+        data = orjson.loads(await request.body())
         tickers = data.get("tickers", [])
         if not tickers or not isinstance(tickers, list):
             return {"success": False, "error": "tickers array required"}
@@ -4031,26 +4736,203 @@ async def batch_prices(request: Request):
         return {"success": False, "error": str(e)[:100]}
 
 
-# Module-level cache for market-pulse
-_pulse_cache = None
-_pulse_cache_ts = None
+def _last_weekday_of_month(year, month, weekday):
+    """Day-of-month of the last `weekday` (Mon=0) in the month — closed form, no datetime walk."""
+    first_dow, last_day = calendar.monthrange(year, month)
+    last_dow = (first_dow + last_day - 1) % 7
+    return last_day - ((last_dow - weekday) % 7)
+
+# ═══ MARKET-PULSE STATIC CALENDAR — built once per year at import/first use, not per request ═══
+# Known RBI meeting dates (approximate — first week of Feb, Apr, Jun, Aug, Oct, Dec)
+_RBI_MONTHS = (2, 4, 6, 8, 10, 12)
+# US Fed (approx — Jan, Mar, May, Jun, Jul, Sep, Nov, Dec)
+_FED_MONTHS = (1, 3, 5, 6, 7, 9, 11, 12)
+
+# ═══ GEOPOLITICAL, TRADE, ECONOMIC & MACRO EVENTS — 2026 ═══
+_GEO_EVENTS = [
+    # ── MARCH 2026 ──
+    {"event": "US CPI Inflation Data (Feb)", "month": 3, "day": 12, "year": 2026, "impact": "HIGH"},
+    {"event": "US Supreme Court — Tariff Authority (IEEPA) Ruling", "month": 3, "day": 15, "year": 2026, "impact": "HIGH"},
+    {"event": "US PPI Data Release", "month": 3, "day": 13, "year": 2026, "impact": "MEDIUM"},
+    {"event": "RBI FX Reserves Review", "month": 3, "day": 14, "year": 2026, "impact": "MEDIUM"},
+    {"event": "US Fed FOMC Meeting + Rate Decision", "month": 3, "day": 19, "year": 2026, "impact": "HIGH"},
+    {"event": "Middle East De-escalation Talks (US-Iran)", "month": 3, "day": 20, "year": 2026, "impact": "HIGH"},
+    {"event": "India Parliament Budget Session Ends", "month": 3, "day": 21, "year": 2026, "impact": "MEDIUM"},
+    {"event": "India GST Council Meeting", "month": 3, "day": 22, "year": 2026, "impact": "MEDIUM"},
+    {"event": "US-China Rare Earth Export Restrictions Review", "month": 3, "day": 25, "year": 2026, "impact": "HIGH"},
+    {"event": "US GDP Q4 2025 (Final Revision)", "month": 3, "day": 27, "year": 2026, "impact": "MEDIUM"},
+    {"event": "Japan PM Takaichi — Corporate Reform Package", "month": 3, "day": 28, "year": 2026, "impact": "MEDIUM"},
+    {"event": "US PCE Inflation (Fed's preferred gauge)", "month": 3, "day": 28, "year": 2026, "impact": "HIGH"},
+    {"event": "India FY26 Financial Year End", "month": 3, "day": 31, "year": 2026, "impact": "MEDIUM"},
+    
+    # ── APRIL 2026 ──
+    {"event": "US Reciprocal Tariff Review Deadline", "month": 4, "day": 2, "year": 2026, "impact": "HIGH"},
+    {"event": "US Jobs Report (Mar NFP)", "month": 4, "day": 3, "year": 2026, "impact": "HIGH"},
+    {"event": "US Venezuela Sanctions Review", "month": 4, "day": 1, "year": 2026, "impact": "MEDIUM"},
+    {"event": "Gold Central Bank Purchases Report (WGC)", "month": 4, "day": 5, "year": 2026, "impact": "MEDIUM"},
+    {"event": "NATO Hybrid Warfare Summit", "month": 4, "day": 7, "year": 2026, "impact": "MEDIUM"},
+    {"event": "RBI Monetary Policy (Apr)", "month": 4, "day": 9, "year": 2026, "impact": "HIGH"},
+    {"event": "US CPI Inflation Data (Mar)", "month": 4, "day": 10, "year": 2026, "impact": "HIGH"},
+    {"event": "EU Retaliatory Tariff Decision on US Goods", "month": 4, "day": 15, "year": 2026, "impact": "MEDIUM"},
+    {"event": "India Q4 FY26 Earnings Season Begins", "month": 4, "day": 15, "year": 2026, "impact": "HIGH"},
+    {"event": "CLARITY Act — Crypto Regulation Vote", "month": 4, "day": 20, "year": 2026, "impact": "MEDIUM"},
+    {"event": "Big Tech Earnings (MSFT/GOOG/META/AMZN)", "month": 4, "day": 25, "year": 2026, "impact": "HIGH"},
+    {"event": "OBBBA Fiscal Package Vote", "month": 4, "day": 30, "year": 2026, "impact": "HIGH"},
+    
+    # ── MAY 2026 ──
+    {"event": "US Jobs Report (Apr NFP)", "month": 5, "day": 1, "year": 2026, "impact": "HIGH"},
+    {"event": "USMCA Trade Pact Review", "month": 5, "day": 1, "year": 2026, "impact": "MEDIUM"},
+    {"event": "US Fed FOMC Meeting + Rate Decision", "month": 5, "day": 6, "year": 2026, "impact": "HIGH"},
+    {"event": "US Strategic Minerals Executive Order Review", "month": 5, "day": 10, "year": 2026, "impact": "MEDIUM"},
+    {"event": "US CPI Inflation Data (Apr)", "month": 5, "day": 13, "year": 2026, "impact": "HIGH"},
+    {"event": "Fed Chair Powell Term Ends — Warsh Transition", "month": 5, "day": 15, "year": 2026, "impact": "HIGH"},
+    {"event": "India Q4 GDP Data Release", "month": 5, "day": 30, "year": 2026, "impact": "HIGH"},
+    
+    # ── JUNE-DECEMBER 2026 ──
+    {"event": "RBI Monetary Policy (Jun)", "month": 6, "day": 6, "year": 2026, "impact": "HIGH"},
+    {"event": "US Fed FOMC Meeting", "month": 6, "day": 17, "year": 2026, "impact": "HIGH"},
+    {"event": "OPEC+ Mid-Year Production Review", "month": 6, "day": 5, "year": 2026, "impact": "HIGH"},
+    {"event": "US Fed FOMC Meeting", "month": 7, "day": 29, "year": 2026, "impact": "HIGH"},
+    {"event": "RBI Monetary Policy (Aug)", "month": 8, "day": 7, "year": 2026, "impact": "HIGH"},
+    {"event": "Jackson Hole Economic Symposium", "month": 8, "day": 27, "year": 2026, "impact": "HIGH"},
+    {"event": "US Midterm Pre-Election Volatility Window Opens", "month": 9, "day": 1, "year": 2026, "impact": "HIGH"},
+    {"event": "US Fed FOMC Meeting", "month": 9, "day": 17, "year": 2026, "impact": "HIGH"},
+    {"event": "China Golden Week Holiday — Market Closure", "month": 10, "day": 1, "year": 2026, "impact": "MEDIUM"},
+    {"event": "RBI Monetary Policy (Oct)", "month": 10, "day": 8, "year": 2026, "impact": "HIGH"},
+    {"event": "US Midterm Elections", "month": 11, "day": 3, "year": 2026, "impact": "HIGH"},
+    {"event": "US Fed FOMC Meeting (Nov)", "month": 11, "day": 4, "year": 2026, "impact": "HIGH"},
+    {"event": "India Diwali — Muhurat Trading", "month": 11, "day": 8, "year": 2026, "impact": "MEDIUM"},
+    {"event": "RBI Monetary Policy (Dec)", "month": 12, "day": 5, "year": 2026, "impact": "HIGH"},
+    {"event": "US Fed FOMC Meeting (Dec) + 2027 Dot Plot", "month": 12, "day": 16, "year": 2026, "impact": "HIGH"},
+]
+
+
+@lru_cache(maxsize=2)
+def _pulse_calendar(year):
+    """Central-bank, geo and recurring CPI/Jobs events for `year` and `year + 1`, sorted by date,
+    as parallel numpy arrays (struct-of-arrays) so the per-request window is one vectorized mask."""
+    rows = []  # (date, group, seq, event, impact, kind) — group/seq keep same-day order stable
+    for y in (year, year + 1):
+        for rm in _RBI_MONTHS:
+            rows.append((datetime(y, rm, 7), 0, 0, "RBI Monetary Policy", "HIGH", "rbi"))
+        for fm in _FED_MONTHS:
+            rows.append((datetime(y, fm, 18), 1, 0, "US Fed Rate Decision", "HIGH", "fed"))
+    for i, ge in enumerate(_GEO_EVENTS):
+        try:
+            rows.append((datetime(ge["year"], ge["month"], ge["day"]), 2, i, ge["event"], ge["impact"], "geo"))
+        except ValueError:
+            pass
+    # Auto-add recurring US CPI + Jobs
+    for y in (year, year + 1):
+        for m in range(1, 13):
+            rows.append((datetime(y, m, 12), 2, 1000 + m * 2, "US CPI Inflation Data", "HIGH", "auto"))
+            rows.append((datetime(y, m, 6), 2, 1000 + m * 2 + 1, "US Jobs Report (Non-Farm Payrolls)", "HIGH", "auto"))
+    rows.sort(key=lambda r: r[:3])
+    return {
+        "dates": np.array([r[0] for r in rows], dtype="datetime64[us]"),
+        "labels": [r[0].strftime("%b %d") for r in rows],
+        "month_idx": np.array([r[0].year * 12 + r[0].month for r in rows]),
+        "events": [r[3] for r in rows],
+        "impacts": [r[4] for r in rows],
+        "kinds": np.array([r[5] for r in rows]),
+    }
+
+# ═══ MARKET-PULSE SNAPSHOT EVENTS — str.format templates keyed by (instrument, "+" / "-" / "flat") ═══
+# {instrument: (move threshold %, HIGH-severity threshold % — None = always MEDIUM)}
+_EVENT_THRESHOLDS = {
+    "Crude Oil": (0.8, 2), "Gold": (0.5, 1.5), "Silver": (0.5, 1.5),
+    "S&P 500": (0.3, 1), "US Dollar": (0.2, None), "USD/INR": (0.1, 0.3),
+}
+_EVENT_TEMPLATES = {
+    ("Crude Oil", "+"): {"headline": "Crude Oil spikes {pct:+.1f}% to ${price}", "impact": "BEARISH",
+        "detail": "Higher crude raises input costs, inflation pressure on RBI.",
+        "action": "Watch ONGC/Oil India. Negative for Nifty if sustained."},
+    ("Crude Oil", "-"): {"headline": "Crude Oil drops {pct:+.1f}% to ${price}", "impact": "BULLISH",
+        "detail": "Lower crude benefits India. Positive for CAD and inflation.",
+        "action": "Positive for Indian markets. Airlines, paint stocks benefit."},
+    ("Crude Oil", "flat"): {"headline": "Crude Oil ${price} ({pct:+.1f}%)", "impact": "VOLATILE",
+        "detail": "Oil stable at ${price}. India imports 85% of crude — stable oil = positive for current account.",
+        "action": "No immediate impact. Monitor OPEC decisions."},
+    ("Gold", "+"): {"headline": "Gold surges {pct:+.1f}% to ${price}", "impact": "VOLATILE",
+        "detail": "Gold rally = risk-off sentiment globally.",
+        "action": "Consider gold ETF hedge."},
+    ("Gold", "-"): {"headline": "Gold drops {pct:+.1f}% to ${price}", "impact": "VOLATILE",
+        "detail": "Gold decline = risk-on appetite returning.",
+        "action": "Positive for equity markets."},
+    ("Gold", "flat"): {"headline": "Gold ${price} ({pct:+.1f}%)", "impact": "VOLATILE",
+        "detail": "Gold stable near ${price}. Safe-haven demand steady amid geopolitical tensions.",
+        "action": "Watch for breakout above $3,000 or breakdown below $2,800."},
+    ("Silver", "+"): {"headline": "Silver surges {pct:+.1f}% to ${price}", "impact": "BULLISH",
+        "detail": "Silver rally = industrial demand + safe-haven buying.",
+        "action": "Metals & mining stocks benefit. Watch Hindalco, Vedanta."},
+    ("Silver", "-"): {"headline": "Silver drops {pct:+.1f}% to ${price}", "impact": "BEARISH",
+        "detail": "Silver decline = weakening industrial demand.",
+        "action": "Mining stocks under pressure."},
+    ("Silver", "flat"): {"headline": "Silver ${price} ({pct:+.1f}%)", "impact": "VOLATILE",
+        "detail": "Silver stable at ${price}. Industrial + monetary demand supporting prices. Gold/Silver ratio signals {silver_view}.",
+        "action": "Watch solar panel demand (key industrial driver) and Fed rate path."},
+    ("S&P 500", "+"): {"headline": "US Markets rally {pct:+.1f}%", "impact": "BULLISH",
+        "detail": "S&P 500 moved {abs_pct:.1f}%. Indian markets follow with 0.5-0.8x correlation.",
+        "action": "Expect gap-up for Nifty. IT stocks lead."},
+    ("S&P 500", "-"): {"headline": "US Markets sell-off {pct:+.1f}%", "impact": "BEARISH",
+        "detail": "S&P 500 moved {abs_pct:.1f}%. Indian markets follow with 0.5-0.8x correlation.",
+        "action": "Expect weak opening. Consider hedging."},
+    ("S&P 500", "flat"): {"headline": "S&P 500 flat ({pct:+.1f}%)", "impact": "VOLATILE",
+        "detail": "US markets quiet. Awaiting catalysts — Fed commentary, earnings, or macro data.",
+        "action": "Range-bound trading expected. Watch for breakout triggers."},
+    ("US Dollar", "+"): {"headline": "Dollar strengthens {pct:+.1f}%", "impact": "BEARISH",
+        "detail": "Stronger dollar pressures EM currencies, FII outflows.",
+        "action": "IT exporters benefit from weak INR."},
+    ("US Dollar", "-"): {"headline": "Dollar weakens {pct:+.1f}%", "impact": "BULLISH",
+        "detail": "Weaker dollar supports EM inflows.",
+        "action": "FII inflows likely. Banking stocks benefit."},
+    ("US Dollar", "flat"): {"headline": "Dollar Index stable ({pct:+.1f}%)", "impact": "VOLATILE",
+        "detail": "Dollar steady. No major FX pressure on emerging markets today.",
+        "action": "Watch Fed commentary for directional clues."},
+    ("USD/INR", "+"): {"headline": "Rupee weakens {pct:+.1f}%", "impact": "BEARISH",
+        "detail": "Rupee depreciation = capital outflows.",
+        "action": "IT exporters benefit."},
+    ("USD/INR", "-"): {"headline": "Rupee strengthens {pct:+.1f}%", "impact": "BULLISH",
+        "detail": "Rupee strength attracts FII flows.",
+        "action": "Domestic consumption plays benefit."},
+    ("USD/INR", "flat"): {"headline": "USD/INR ₹{price} ({pct:+.1f}%)", "impact": "VOLATILE",
+        "detail": "Rupee stable at ₹{price}. RBI intervention keeping range-bound.",
+        "action": "No major FX risk today. Watch RBI reserves data."},
+}
+
+def _snapshot_event(name, price, chg_pct):
+    """Event dict for one instrument's move, or None for instruments without templates."""
+    thresholds = _EVENT_THRESHOLDS.get(name)
+    if thresholds is None:
+        return None
+    move, high = thresholds
+    moved = abs(chg_pct) >= move
+    tpl = _EVENT_TEMPLATES[(name, ("+" if chg_pct > 0 else "-") if moved else "flat")]
+    if not moved:
+        severity = "LOW"
+    elif high is None:
+        severity = "MEDIUM"
+    else:
+        severity = "HIGH" if abs(chg_pct) >= high else "MEDIUM"
+    fmt = {"pct": chg_pct, "abs_pct": abs(chg_pct), "price": price,
+           "silver_view": "silver undervalued" if price < 28 else "fair value"}
+    return {"headline": tpl["headline"].format(**fmt), "impact": tpl["impact"], "severity": severity,
+            "detail": tpl["detail"].format(**fmt), "action": tpl["action"].format(**fmt)}
+
+# Module-level cache for market-pulse (shared across workers via _shared_cache_*)
+_PULSE_CACHE_KEY = "shared:market:pulse"
+_PULSE_CACHE_TTL = 120
 _ticker_cache = None
 _ticker_cache_ts = None
 
 @app.get("/api/market-pulse")
-async def market_pulse():
+async def market_pulse(request: Request):
     """Lightweight market events — cached 5min, parallel fetches."""
-    import yfinance as yf
-    from datetime import datetime, timedelta
-    from concurrent.futures import ThreadPoolExecutor, as_completed
+    # ═══ SHARED CACHE — prevents every worker hammering yfinance/NSE on every page load ═══
+    cached = await _shared_cache_aget(_PULSE_CACHE_KEY)
+    if cached:
+        return _etag_response(request, cached, _PULSE_CACHE_TTL)
     
-    # ═══ 5-MINUTE CACHE — prevents hammering yfinance/NSE on every page load ═══
-    global _pulse_cache, _pulse_cache_ts
-    now_ts = datetime.utcnow()
-    if _pulse_cache and _pulse_cache_ts and (now_ts - _pulse_cache_ts).total_seconds() < 120:
-        return _pulse_cache
-    
-    IST_OFFSET = timedelta(hours=5, minutes=30)
     now = datetime.utcnow() + IST_OFFSET
     day_name = now.strftime("%A")
     weekday = now.weekday()
@@ -4058,15 +4940,9 @@ async def market_pulse():
     
     # Expiry detection
     year, month = now.year, now.month
-    import calendar
-    last_day = calendar.monthrange(year, month)[1]
-    last_tuesday = last_day
-    while datetime(year, month, last_tuesday).weekday() != 1:
-        last_tuesday -= 1
+    last_tuesday = _last_weekday_of_month(year, month, 1)
     is_last_tuesday = (now.day == last_tuesday and weekday == 1)
-    last_thursday = last_day
-    while datetime(year, month, last_thursday).weekday() != 3:
-        last_thursday -= 1
+    last_thursday = _last_weekday_of_month(year, month, 3)
     is_last_thursday = (now.day == last_thursday and weekday == 3)
     
     expiry_today = []
@@ -4085,23 +4961,26 @@ async def market_pulse():
     events = []
     global_snapshot = {}
     quick_tickers = {"CL=F": "Crude Oil", "GC=F": "Gold", "SI=F": "Silver", "DX-Y.NYB": "US Dollar", "^GSPC": "S&P 500", "INR=X": "USD/INR"}
+    # Blocking yfinance/HTTP work runs in the shared pool — never on the event loop
+    loop = asyncio.get_event_loop()
+    batch_hist = await loop.run_in_executor(_thread_pool, _yf_batch_history, list(quick_tickers), "2d")
     
     def fetch_ticker(ticker, name):
-        # Source 1: yfinance
+        # Source 1: batched yf.download
         try:
-            t = yf.Ticker(ticker)
-            hist = t.history(period="2d")
-            if not hist.empty:
-                price = round(hist.iloc[-1]['Close'], 2)
-                prev = hist.iloc[-2]['Close'] if len(hist) > 1 else price
+            hist = batch_hist.get(ticker)
+            if hist is not None:
+                closes = hist['Close'].to_numpy()
+                price = round(closes[-1], 2)
+                prev = closes[-2] if closes.size > 1 else price
                 chg_pct = round(((price - prev) / prev) * 100, 2) if prev else 0
                 return name, {"price": price, "change_pct": chg_pct}
         except:
             pass
-        # Source 2: Yahoo v8 chart API
+        # Source 2: Yahoo v8 chart meta — last price + previous close only (fast_info would pull 1y + 1wk history)
         try:
             _h = {'User-Agent': f'Mozilla/5.0 Chrome/{random.randint(118,126)}.0.0.0', 'Accept': 'application/json'}
-            r = _http_pool.get(f"https://query1.finance.yahoo.com/v8/finance/chart/{ticker}?interval=1d&range=2d", timeout=4)
+            r = _get_with_retry(_http_pool, f"https://query1.finance.yahoo.com/v8/finance/chart/{ticker}?interval=1d&range=1d", attempts=2, timeout=4)
             if r.status_code == 200:
                 m = r.json().get('chart', {}).get('result', [{}])[0].get('meta', {})
                 price = m.get('regularMarketPrice', 0)
@@ -4115,75 +4994,22 @@ async def market_pulse():
             pass
         return name, None
     
-    with ThreadPoolExecutor(max_workers=6) as executor:
-        futures = {executor.submit(fetch_ticker, t, n): n for t, n in quick_tickers.items()}
-        for f in as_completed(futures, timeout=8):
-            try:
-                name, data = f.result(timeout=3)
-                if data:
-                    global_snapshot[name] = data
-            except:
-                pass
+    futures = [loop.run_in_executor(_yf_pool, _single_flight, f"pulse:{t}", fetch_ticker, t, n) for t, n in quick_tickers.items()]
+    done, _pending = await asyncio.wait(futures, timeout=8)
+    for f in done:
+        try:
+            name, data = f.result()
+            if data:
+                global_snapshot[name] = data
+        except:
+            pass
     
     # ═══ AUTO-DETECT EVENTS from parallel-fetched snapshot ═══
     # Always show key commodity/market data as context
     for name, snap in global_snapshot.items():
-        price, chg_pct = snap["price"], snap["change_pct"]
-        if name == "Crude Oil":
-            if abs(chg_pct) >= 0.8:
-                direction = "spikes" if chg_pct > 0 else "drops"
-                events.append({"headline": f"Crude Oil {direction} {chg_pct:+.1f}% to ${price}", "impact": "BEARISH" if chg_pct > 0 else "BULLISH", "severity": "HIGH" if abs(chg_pct) >= 2 else "MEDIUM",
-                    "detail": "Higher crude raises input costs, inflation pressure on RBI." if chg_pct > 0 else "Lower crude benefits India. Positive for CAD and inflation.",
-                    "action": "Watch ONGC/Oil India. Negative for Nifty if sustained." if chg_pct > 0 else "Positive for Indian markets. Airlines, paint stocks benefit."})
-            else:
-                events.append({"headline": f"Crude Oil ${price} ({chg_pct:+.1f}%)", "impact": "VOLATILE", "severity": "LOW",
-                    "detail": f"Oil stable at ${price}. India imports 85% of crude — stable oil = positive for current account.",
-                    "action": "No immediate impact. Monitor OPEC decisions."})
-        elif name == "Gold":
-            if abs(chg_pct) >= 0.5:
-                events.append({"headline": f"Gold {'surges' if chg_pct > 0 else 'drops'} {chg_pct:+.1f}% to ${price}", "impact": "VOLATILE", "severity": "HIGH" if abs(chg_pct) >= 1.5 else "MEDIUM",
-                    "detail": "Gold rally = risk-off sentiment globally." if chg_pct > 0 else "Gold decline = risk-on appetite returning.",
-                    "action": "Consider gold ETF hedge." if chg_pct > 0 else "Positive for equity markets."})
-            else:
-                events.append({"headline": f"Gold ${price} ({chg_pct:+.1f}%)", "impact": "VOLATILE", "severity": "LOW",
-                    "detail": f"Gold stable near ${price}. Safe-haven demand steady amid geopolitical tensions.",
-                    "action": "Watch for breakout above $3,000 or breakdown below $2,800."})
-        elif name == "Silver":
-            if abs(chg_pct) >= 0.5:
-                events.append({"headline": f"Silver {'surges' if chg_pct > 0 else 'drops'} {chg_pct:+.1f}% to ${price}", "impact": "BULLISH" if chg_pct > 0 else "BEARISH", "severity": "HIGH" if abs(chg_pct) >= 1.5 else "MEDIUM",
-                    "detail": "Silver rally = industrial demand + safe-haven buying." if chg_pct > 0 else "Silver decline = weakening industrial demand.",
-                    "action": "Metals & mining stocks benefit. Watch Hindalco, Vedanta." if chg_pct > 0 else "Mining stocks under pressure."})
-            else:
-                events.append({"headline": f"Silver ${price} ({chg_pct:+.1f}%)", "impact": "VOLATILE", "severity": "LOW",
-                    "detail": f"Silver stable at ${price}. Industrial + monetary demand supporting prices. Gold/Silver ratio signals {'silver undervalued' if price < 28 else 'fair value'}.",
-                    "action": "Watch solar panel demand (key industrial driver) and Fed rate path."})
-        elif name == "S&P 500":
-            if abs(chg_pct) >= 0.3:
-                events.append({"headline": f"US Markets {'rally' if chg_pct > 0 else 'sell-off'} {chg_pct:+.1f}%", "impact": "BULLISH" if chg_pct > 0 else "BEARISH", "severity": "HIGH" if abs(chg_pct) >= 1 else "MEDIUM",
-                    "detail": f"S&P 500 moved {abs(chg_pct):.1f}%. Indian markets follow with 0.5-0.8x correlation.",
-                    "action": "Expect gap-up for Nifty. IT stocks lead." if chg_pct > 0 else "Expect weak opening. Consider hedging."})
-            else:
-                events.append({"headline": f"S&P 500 flat ({chg_pct:+.1f}%)", "impact": "VOLATILE", "severity": "LOW",
-                    "detail": "US markets quiet. Awaiting catalysts — Fed commentary, earnings, or macro data.",
-                    "action": "Range-bound trading expected. Watch for breakout triggers."})
-        elif name == "US Dollar":
-            if abs(chg_pct) >= 0.2:
-                events.append({"headline": f"Dollar {'strengthens' if chg_pct > 0 else 'weakens'} {chg_pct:+.1f}%", "impact": "BEARISH" if chg_pct > 0 else "BULLISH", "severity": "MEDIUM",
-                    "detail": "Stronger dollar pressures EM currencies, FII outflows." if chg_pct > 0 else "Weaker dollar supports EM inflows.",
-                    "action": "IT exporters benefit from weak INR." if chg_pct > 0 else "FII inflows likely. Banking stocks benefit."})
-            else:
-                events.append({"headline": f"Dollar Index stable ({chg_pct:+.1f}%)", "impact": "VOLATILE", "severity": "LOW",
-                    "detail": "Dollar steady. No major FX pressure on emerging markets today.",
-                    "action": "Watch Fed commentary for directional clues."})
-        elif name == "USD/INR":
-            if abs(chg_pct) >= 0.1:
-                events.append({"headline": f"Rupee {'weakens' if chg_pct > 0 else 'strengthens'} {chg_pct:+.1f}%", "impact": "BEARISH" if chg_pct > 0 else "BULLISH", "severity": "HIGH" if abs(chg_pct) >= 0.3 else "MEDIUM",
-                    "detail": "Rupee depreciation = capital outflows." if chg_pct > 0 else "Rupee strength attracts FII flows.",
-                    "action": "IT exporters benefit." if chg_pct > 0 else "Domestic consumption plays benefit."})
-            else:
-                events.append({"headline": f"USD/INR ₹{price} ({chg_pct:+.1f}%)", "impact": "VOLATILE", "severity": "LOW",
-                    "detail": f"Rupee stable at ₹{price}. RBI intervention keeping range-bound.",
-                    "action": "No major FX risk today. Watch RBI reserves data."})
+        ev = _snapshot_event(name, snap["price"], snap["change_pct"])
+        if ev:
+            events.append(ev)
     
     # ═══ ALWAYS-ON GEOPOLITICAL CONTEXT (shows even on quiet days) ═══
     context_events = [
@@ -4206,95 +5032,21 @@ async def market_pulse():
         idx = (day_of_year + i) % len(context_events)
         events.append(context_events[idx])
     
-    # Upcoming scheduled events (static calendar)
-    upcoming = []
-    # Known RBI meeting dates 2026 (approximate — first week of Apr, Jun, Aug, Oct, Dec, Feb)
-    rbi_months = [2, 4, 6, 8, 10, 12]
-    for rm in rbi_months:
-        rbi_date = datetime(year if rm >= now.month else year + 1, rm, 7)
-        days_until = (rbi_date - now).days
-        if 0 < days_until <= 30:
-            upcoming.append({"event": f"RBI Monetary Policy", "date": rbi_date.strftime("%b %d"), "days": days_until, "impact": "HIGH"})
-    
-    # US Fed (approx — Jan, Mar, May, Jun, Jul, Sep, Nov, Dec)
-    fed_months = [1, 3, 5, 6, 7, 9, 11, 12]
-    for fm in fed_months:
-        fed_date = datetime(year if fm >= now.month else year + 1, fm, 18)
-        days_until = (fed_date - now).days
-        if 0 < days_until <= 30:
-            upcoming.append({"event": "US Fed Rate Decision", "date": fed_date.strftime("%b %d"), "days": days_until, "impact": "HIGH"})
-    
-    # ═══ GEOPOLITICAL, TRADE, ECONOMIC & MACRO EVENTS — 2026 ═══
-    geo_events = [
-        # ── MARCH 2026 ──
-        {"event": "US CPI Inflation Data (Feb)", "month": 3, "day": 12, "year": 2026, "impact": "HIGH"},
-        {"event": "US Supreme Court — Tariff Authority (IEEPA) Ruling", "month": 3, "day": 15, "year": 2026, "impact": "HIGH"},
-        {"event": "US PPI Data Release", "month": 3, "day": 13, "year": 2026, "impact": "MEDIUM"},
-        {"event": "RBI FX Reserves Review", "month": 3, "day": 14, "year": 2026, "impact": "MEDIUM"},
-        {"event": "US Fed FOMC Meeting + Rate Decision", "month": 3, "day": 19, "year": 2026, "impact": "HIGH"},
-        {"event": "Middle East De-escalation Talks (US-Iran)", "month": 3, "day": 20, "year": 2026, "impact": "HIGH"},
-        {"event": "India Parliament Budget Session Ends", "month": 3, "day": 21, "year": 2026, "impact": "MEDIUM"},
-        {"event": "India GST Council Meeting", "month": 3, "day": 22, "year": 2026, "impact": "MEDIUM"},
-        {"event": "US-China Rare Earth Export Restrictions Review", "month": 3, "day": 25, "year": 2026, "impact": "HIGH"},
-        {"event": "US GDP Q4 2025 (Final Revision)", "month": 3, "day": 27, "year": 2026, "impact": "MEDIUM"},
-        {"event": "Japan PM Takaichi — Corporate Reform Package", "month": 3, "day": 28, "year": 2026, "impact": "MEDIUM"},
-        {"event": "US PCE Inflation (Fed's preferred gauge)", "month": 3, "day": 28, "year": 2026, "impact": "HIGH"},
-        {"event": "India FY26 Financial Year End", "month": 3, "day": 31, "year": 2026, "impact": "MEDIUM"},
-        
-        # ── APRIL 2026 ──
-        {"event": "US Reciprocal Tariff Review Deadline", "month": 4, "day": 2, "year": 2026, "impact": "HIGH"},
-        {"event": "US Jobs Report (Mar NFP)", "month": 4, "day": 3, "year": 2026, "impact": "HIGH"},
-        {"event": "US Venezuela Sanctions Review", "month": 4, "day": 1, "year": 2026, "impact": "MEDIUM"},
-        {"event": "Gold Central Bank Purchases Report (WGC)", "month": 4, "day": 5, "year": 2026, "impact": "MEDIUM"},
-        {"event": "NATO Hybrid Warfare Summit", "month": 4, "day": 7, "year": 2026, "impact": "MEDIUM"},
-        {"event": "RBI Monetary Policy (Apr)", "month": 4, "day": 9, "year": 2026, "impact": "HIGH"},
-        {"event": "US CPI Inflation Data (Mar)", "month": 4, "day": 10, "year": 2026, "impact": "HIGH"},
-        {"event": "EU Retaliatory Tariff Decision on US Goods", "month": 4, "day": 15, "year": 2026, "impact": "MEDIUM"},
-        {"event": "India Q4 FY26 Earnings Season Begins", "month": 4, "day": 15, "year": 2026, "impact": "HIGH"},
-        {"event": "CLARITY Act — Crypto Regulation Vote", "month": 4, "day": 20, "year": 2026, "impact": "MEDIUM"},
-        {"event": "Big Tech Earnings (MSFT/GOOG/META/AMZN)", "month": 4, "day": 25, "year": 2026, "impact": "HIGH"},
-        {"event": "OBBBA Fiscal Package Vote", "month": 4, "day": 30, "year": 2026, "impact": "HIGH"},
-        
-        # ── MAY 2026 ──
-        {"event": "US Jobs Report (Apr NFP)", "month": 5, "day": 1, "year": 2026, "impact": "HIGH"},
-        {"event": "USMCA Trade Pact Review", "month": 5, "day": 1, "year": 2026, "impact": "MEDIUM"},
-        {"event": "US Fed FOMC Meeting + Rate Decision", "month": 5, "day": 6, "year": 2026, "impact": "HIGH"},
-        {"event": "US Strategic Minerals Executive Order Review", "month": 5, "day": 10, "year": 2026, "impact": "MEDIUM"},
-        {"event": "US CPI Inflation Data (Apr)", "month": 5, "day": 13, "year": 2026, "impact": "HIGH"},
-        {"event": "Fed Chair Powell Term Ends — Warsh Transition", "month": 5, "day": 15, "year": 2026, "impact": "HIGH"},
-        {"event": "India Q4 GDP Data Release", "month": 5, "day": 30, "year": 2026, "impact": "HIGH"},
-        
-        # ── JUNE-DECEMBER 2026 ──
-        {"event": "RBI Monetary Policy (Jun)", "month": 6, "day": 6, "year": 2026, "impact": "HIGH"},
-        {"event": "US Fed FOMC Meeting", "month": 6, "day": 17, "year": 2026, "impact": "HIGH"},
-        {"event": "OPEC+ Mid-Year Production Review", "month": 6, "day": 5, "year": 2026, "impact": "HIGH"},
-        {"event": "US Fed FOMC Meeting", "month": 7, "day": 29, "year": 2026, "impact": "HIGH"},
-        {"event": "RBI Monetary Policy (Aug)", "month": 8, "day": 7, "year": 2026, "impact": "HIGH"},
-        {"event": "Jackson Hole Economic Symposium", "month": 8, "day": 27, "year": 2026, "impact": "HIGH"},
-        {"event": "US Midterm Pre-Election Volatility Window Opens", "month": 9, "day": 1, "year": 2026, "impact": "HIGH"},
-        {"event": "US Fed FOMC Meeting", "month": 9, "day": 17, "year": 2026, "impact": "HIGH"},
-        {"event": "China Golden Week Holiday — Market Closure", "month": 10, "day": 1, "year": 2026, "impact": "MEDIUM"},
-        {"event": "RBI Monetary Policy (Oct)", "month": 10, "day": 8, "year": 2026, "impact": "HIGH"},
-        {"event": "US Midterm Elections", "month": 11, "day": 3, "year": 2026, "impact": "HIGH"},
-        {"event": "US Fed FOMC Meeting (Nov)", "month": 11, "day": 4, "year": 2026, "impact": "HIGH"},
-        {"event": "India Diwali — Muhurat Trading", "month": 11, "day": 8, "year": 2026, "impact": "MEDIUM"},
-        {"event": "RBI Monetary Policy (Dec)", "month": 12, "day": 5, "year": 2026, "impact": "HIGH"},
-        {"event": "US Fed FOMC Meeting (Dec) + 2027 Dot Plot", "month": 12, "day": 16, "year": 2026, "impact": "HIGH"},
+    # Upcoming scheduled events — static calendar prebuilt per year, windowed with one vectorized mask
+    cal = _pulse_calendar(year)
+    days = (cal["dates"] - np.datetime64(now, "us")) // np.timedelta64(1, "D")
+    kinds = cal["kinds"]
+    in_45 = (days >= 0) & (days <= 45)
+    mask = (
+        ((kinds == "rbi") | (kinds == "fed")) & (days > 0) & (days <= 30)
+        | (kinds == "geo") & in_45
+        # Recurring CPI/Jobs entries only cover the next 6 months, never the current one
+        | (kinds == "auto") & in_45 & (cal["month_idx"] != now.year * 12 + now.month)
+    )
+    upcoming = [
+        {"event": cal["events"][i], "date": cal["labels"][i], "days": int(days[i]), "impact": cal["impacts"][i]}
+        for i in np.flatnonzero(mask)
     ]
-    # Auto-add recurring US CPI + Jobs for upcoming months
-    for offset in range(1, 7):
-        m = (now.month + offset - 1) % 12 + 1
-        y_adj = year if m > now.month else year + 1
-        geo_events.append({"event": "US CPI Inflation Data", "month": m, "day": 12, "year": y_adj, "impact": "HIGH"})
-        geo_events.append({"event": "US Jobs Report (Non-Farm Payrolls)", "month": m, "day": 6, "year": y_adj, "impact": "HIGH"})
-    for ge in geo_events:
-        try:
-            ge_date = datetime(ge["year"], ge["month"], ge["day"])
-            days_until = (ge_date - now).days
-            if 0 <= days_until <= 45:
-                upcoming.append({"event": ge["event"], "date": ge_date.strftime("%b %d"), "days": days_until, "impact": ge["impact"]})
-        except:
-            pass
     
     # Sort upcoming by days
     upcoming.sort(key=lambda x: x["days"])
@@ -4331,13 +5083,10 @@ async def market_pulse():
         _r = {}
         _evts = []
         try:
-            import requests as req
-            s = req.Session()
-            hdr = {"User-Agent": "Mozilla/5.0", "Accept": "application/json", "Referer": "https://www.nseindia.com/"}
-            s.get("https://www.nseindia.com/", headers=hdr, timeout=2)
-            resp = s.get("https://www.nseindia.com/api/fiidiiTradeReact", headers=hdr, timeout=2)
-            if resp.status_code == 200:
-                for entry in resp.json():
+            # Shared NSE session — cookies persist across requests, no per-call homepage hit
+            fii_rows = _nse_get("https://www.nseindia.com/api/fiidiiTradeReact", retries=0, timeout=2)
+            if fii_rows:
+                for entry in fii_rows:
                     cat = entry.get("category", "")
                     buy, sell, net = float(entry.get("buyValue", 0)), float(entry.get("sellValue", 0)), float(entry.get("netValue", 0))
                     if "FII" in cat or "FPI" in cat:
@@ -4382,10 +5131,8 @@ async def market_pulse():
         return _r, _evts
     
     try:
-        with ThreadPoolExecutor(max_workers=1) as ex:
-            fut = ex.submit(_fetch_fii)
-            fii_dii, fii_events = fut.result(timeout=4)
-            events.extend(fii_events)
+        fii_dii, fii_events = await asyncio.wait_for(loop.run_in_executor(_thread_pool, _fetch_fii), timeout=4)
+        events.extend(fii_events)
     except:
         pass
     
@@ -4405,11 +5152,11 @@ async def market_pulse():
         "fii_dii": fii_dii
     }
     
-    # Store in cache
-    _pulse_cache = result
-    _pulse_cache_ts = datetime.utcnow()
+    # Store pre-rendered payload + ETag in cache
+    entry = _etag_entry(result)
+    await _shared_cache_aset(_PULSE_CACHE_KEY, entry, _PULSE_CACHE_TTL)
     
-    return result
+    return _etag_response(request, entry, _PULSE_CACHE_TTL)
 
 _perf_cache = None
 _perf_cache_ts = None
@@ -4418,7 +5165,6 @@ _perf_cache_ts = None
 async def performance_leaderboard():
     """YTD + 5-year yearly returns for indices, ETFs, mutual funds, and top stocks."""
     import yfinance as yf
-    from datetime import datetime, timedelta
     from concurrent.futures import ThreadPoolExecutor, as_completed
     
     global _perf_cache, _perf_cache_ts
@@ -4621,7 +5367,6 @@ _algo_cache_ts = {}
 @app.get("/api/algo-signal")
 async def algo_signal_safe(symbol: str = "NIFTY", region: str = ""):
     """Wrapper that guarantees JSON response even on crash. 3-min cache."""
-    from datetime import datetime, timedelta
     symbol = symbol.upper().strip().replace(".NS","").replace(".BO","").replace("^NSEI","NIFTY").replace("^NSEBANK","BANKNIFTY").replace("^BSESN","SENSEX")
     now = datetime.utcnow()
     cache_key = f"{symbol}_{region}"
@@ -4641,8 +5386,7 @@ async def algo_signal_safe(symbol: str = "NIFTY", region: str = ""):
 @app.get("/api/algo-batch")
 async def algo_batch(region: str = "IN"):
     """Batch: 3 top instruments by region. Uses cache."""
-    from datetime import datetime, timedelta
-    IST = datetime.utcnow() + timedelta(hours=5, minutes=30)
+    IST = datetime.utcnow() + IST_OFFSET
     day_name = IST.strftime("%A")
     
     region = region.upper()
@@ -4677,7 +5421,6 @@ async def algo_batch(region: str = "IN"):
 async def _algo_signal_impl(symbol: str = "NIFTY", region: str = ""):
     """5-Layer Confluence Algorithm — ALL real data, ZERO hallucination."""
     import yfinance as yf
-    from datetime import datetime, timedelta
     import math
     
     symbol = symbol.upper().strip().replace(".NS","").replace(".BO","").replace("^NSEI","NIFTY").replace("^NSEBANK","BANKNIFTY").replace("^BSESN","SENSEX")
@@ -5291,7 +6034,7 @@ async def _algo_signal_impl(symbol: str = "NIFTY", region: str = ""):
         add("Balance Sheet", "SUPPORTS" if de < 1 else "NEUTRAL" if de < 2 else "OPPOSES", f"D/E {de:.2f}.", "RISK", 0.5)
     
     # ─── EXPIRY CHECK — Uses REAL NSE expiry dates ───
-    IST = datetime.utcnow() + timedelta(hours=5, minutes=30)
+    IST = datetime.utcnow() + IST_OFFSET
     today_str = IST.strftime("%d-%b-%Y")  # e.g. "17-Mar-2026" — same format as NSE
     today_date = IST.strftime("%Y-%m-%d")
     day_name = IST.strftime("%A")
@@ -7377,7 +8120,6 @@ async def _algo_signal_impl(symbol: str = "NIFTY", region: str = ""):
                 coach.append({"tip": f"R:R is excellent at {trade['rrRatio']}. This is an A-grade setup — consider 1.5× normal position.", "type": "OPPORTUNITY"})
         except: pass
     # Session timing
-    import datetime as _dt
     ist_hour = IST.hour
     if 9 <= ist_hour <= 9:
         coach.append({"tip": "First 15 minutes — volatile. Wait for ORB to form before entering.", "type": "TIMING"})
@@ -7397,7 +8139,7 @@ async def _algo_signal_impl(symbol: str = "NIFTY", region: str = ""):
         coach.append({"tip": f"Volume spike ({vol_ratio:.1f}×). Smart money is active. This confirms the directional move. High-conviction entry.", "type": "OPPORTUNITY"})
     # US market hours check
     if is_us:
-        us_hour = (IST - _dt.timedelta(hours=10, minutes=30)).hour  # IST - 10:30 = ET
+        us_hour = (IST - timedelta(hours=10, minutes=30)).hour  # IST - 10:30 = ET
         if us_hour < 9 or us_hour >= 16:
             coach.append({"tip": "US market is CLOSED. Prices are from last close. Real-time signals available during US market hours (7:00 PM - 1:30 AM IST).", "type": "TIMING"})
     
@@ -7590,7 +8332,6 @@ _heatmap_ts = None
 @app.get("/api/heatmap")
 async def heatmap(region: str = "IN"):
     """Live stock heatmap data — price change, market cap, sector."""
-    from datetime import datetime, timedelta
     global _heatmap_cache, _heatmap_ts
     
     cache_key = region.upper()
@@ -7667,7 +8408,6 @@ async def screener(region: str = "IN", preset: str = "", rsi_below: float = 0, r
                    vol_above: float = 0, above_sma200: bool = False, pe_below: float = 0,
                    sort_by: str = "mcap"):
     """Scan 200+ stocks with technical/fundamental filters + YTD performance. 10-min cache on raw data."""
-    from datetime import datetime, timedelta
     
     # Cache raw scan results per region (10 min) — filters applied AFTER
     cache_key = region.upper()
@@ -7758,8 +8498,7 @@ async def screener(region: str = "IN", preset: str = "", rsi_below: float = 0, r
             
             # YTD return — from EXISTING 1Y history (no extra API call)
             ytd_ret = 0
-            from datetime import datetime as _dt
-            _now = _dt.utcnow()
+            _now = datetime.utcnow()
             try:
                 # The 1Y hist (Mar 2025→Mar 2026) already contains Jan 2026
                 # Find last close of previous year OR first close of current year
@@ -8048,7 +8787,6 @@ async def algo_backtest(symbol: str = "NIFTY", years: int = 3):
     import yfinance as yf
     import pandas as pd
     import numpy as np
-    from datetime import datetime, timedelta
     import math
     
     symbol = symbol.upper().strip()
@@ -8402,58 +9140,491 @@ async def algo_backtest(symbol: str = "NIFTY", years: int = 3):
         return {"success": False, "error": str(e)}
 
 
-@app.post("/api/index-trades")
-async def index_trades(request: Request):
-    """Generate AI-powered daily index trade ideas for Indian markets"""
-    import json as json_mod
-    
-    body = await request.json()
-    email = body.get("email", "").strip().lower()
-    force_refresh = body.get("force_refresh", False)
-    region = body.get("region", "IN").upper()
-    is_us_trades = region == "US"
-    
-    if email not in TRADES_ALLOWED_EMAILS:
-        return {"success": False, "error": "Access restricted. This feature is exclusively available to authorized users."}
-    
-    # 30-minute cache — fresh enough for live trading, stable enough to avoid flip-flopping
-    from datetime import timedelta
-    IST_NOW = datetime.utcnow() + timedelta(hours=5, minutes=30)
-    _rc = _trades_cache_us if is_us_trades else _trades_cache
-    
-    cache_valid = (
-        not force_refresh
-        and _rc["timestamp"] is not None 
-        and _rc["data"] is not None
-        and (IST_NOW - _rc["timestamp"]).total_seconds() < 1800  # 30 minutes
-    )
-    
-    if cache_valid:
-        age_min = int((IST_NOW - _rc["timestamp"]).total_seconds() / 60)
-        print(f"📋 Returning cached {region} trades ({age_min}min old)")
-        return _rc["data"]
-    
-    if force_refresh:
+# ═══ INDEX-TRADES MULTI-FACTOR SCORING ENGINE — module scope, not rebuilt on every request ═══
+# "Name: price (+0.52%)" → 0.52 — global-cue quotes as built in index_trades
+_GLOBAL_PCT_RE = re.compile(r"\(([-+]?\d+\.?\d*)%\)")
+
+# Index display name → option-chain key (oc_dict is keyed NIFTY / BANKNIFTY)
+_OC_KEY = {
+    "NIFTY 50": "NIFTY", "NIFTY BANK": "BANKNIFTY", "BANK NIFTY": "BANKNIFTY",
+    "NIFTY FIN SERVICE": "FINNIFTY", "SENSEX": "SENSEX", "BANKEX": "BANKEX",
+}
+
+# Stock factor labels indexed by tier (see the stock scoring block in index_trades)
+_STOCK_MOMENTUM_FMT = ("Strong momentum +{:.1f}%", "Positive +{:.1f}%", "Strong sell-off {:.1f}%", "Negative {:.1f}%")
+_STOCK_VOLUME_FMT = ("Vol SPIKE {:.1f}x — heavy institutional", "High volume {:.1f}x", "Above-avg vol {:.1f}x",
+                     "Low volume {:.1f}x — weak conviction")
+_STOCK_RANGE_FMT = ("Near 5D LOW ({:.0%}) — bounce zone", "Lower half ({:.0%})", "Near 5D HIGH ({:.0%}) — resistance",
+                    "Upper half ({:.0%})")
+
+# Index factor labels — compute_index_scores records (id, *args); the prompt builder renders them
+_FACTOR_FMT = {
+    1: "Price near 5D support ({:.0%} of range) [+12 BULL]",
+    2: "Price near 5D resistance ({:.0%} of range) [+12 BEAR]",
+    3: "Price mid-range ({:.0%}) [NEUTRAL]",
+    4: "Gap up +{:.2f}% [+8 BULL]",
+    5: "Gap down {:.2f}% [+8 BEAR]",
+    6: "PCR {:.2f} — strong bullish (heavy PE writing) [+10 BULL]",
+    7: "PCR {:.2f} — mildly bullish [+5 BULL]",
+    8: "PCR {:.2f} — strong bearish (heavy CE writing) [+10 BEAR]",
+    9: "PCR {:.2f} — mildly bearish [+5 BEAR]",
+    10: "PCR {:.2f} — neutral zone",
+    11: "Max Pain {} is {:+.0f} pts ABOVE spot — pull-up force [+8 BULL]",
+    12: "Max Pain {} is {:+.0f} pts BELOW spot — pull-down force [+8 BEAR]",
+    13: "Max Pain {} near spot ({:+.0f} pts) — pinning likely",
+    14: "Day range ({:.0f}) > straddle (₹{}) — MOMENTUM day",
+    15: "Day range ({:.0f}) within straddle (₹{}) — RANGE-BOUND",
+    16: "CE OI resistance: {}",
+    17: "PE OI support: {}",
+    18: "No option chain data — price action only",
+    19: "Strong upward momentum +{:.2f}% [+10 BULL]",
+    20: "Mild upward momentum +{:.2f}% [+5 BULL]",
+    21: "Strong downward momentum {:.2f}% [+10 BEAR]",
+    22: "Mild downward momentum {:.2f}% [+5 BEAR]",
+    23: "VIX {:.1f} LOW — complacency, directional bets favored [+8 BULL]",
+    24: "VIX {:.1f} HIGH — fear, mean-reversion or hedging [+8 BEAR]",
+    25: "VIX {:.1f} ELEVATED — reduce sizes, stay alert",
+    26: "VIX {:.1f} NORMAL",
+    27: "VIX moving fast ({:+.1f}%) — volatility regime shift",
+    28: "Dollar up {:+.1f}% — EM headwind [+3 BEAR]",
+    29: "Dollar down {:+.1f}% — EM tailwind [+3 BULL]",
+    30: "Crude spike {:+.1f}% — negative for India [+3 BEAR]",
+    31: "Crude drop {:+.1f}% — positive for India [+3 BULL]",
+    32: "US markets positive ({}/3 up) [+8 BULL]",
+    33: "US markets negative ({}/3 down) [+8 BEAR]",
+    34: "EXPIRY DAY — gamma acceleration, max pain magnet, theta crush after 1 PM [+5 VOLATILE]",
+    35: "Expiry max pain pull: {:+.0f} pts [+5 directional]",
+    36: "Bullish candle + positive session = volume confirming direction [+7 BULL]",
+    37: "Bearish candle + negative session = volume confirming direction [+7 BEAR]",
+    38: "⚠️ DIVERGENCE: Bullish candle but session negative — distribution pattern",
+    39: "⚠️ DIVERGENCE: Bearish candle but session positive — accumulation pattern",
+    40: "Marubozu-like candle (body {:.0%}) — strong bullish conviction [+8 BULL]",
+    41: "Marubozu-like candle (body {:.0%}) — strong bearish conviction [+8 BEAR]",
+    42: "Hammer pattern — buying from lows, reversal signal [+6 BULL]",
+    43: "Shooting star — rejection from highs [+6 BEAR]",
+    44: "Doji-like candle (body {:.0%}) — indecision, wait for breakout",
+    45: "Closing near day high ({:.0%}) — buyers in control [+3 BULL]",
+    46: "Closing near day low ({:.0%}) — sellers in control [+3 BEAR]",
+    47: "Strong intermarket alignment ({} markets same direction) [+{} directional]",
+    48: "⚠️ Intermarket divergence ({} conflicting) — lower conviction",
+    49: "Gold +{:.1f}% with equity up — risk-on rally (unusual)",
+    50: "Gold +{:.1f}% = flight to safety [+3 BEAR]",
+    51: "Monday — gap risk from weekend news, often sets weekly direction",
+    52: "Monday gap {:+.2f}% — high probability of continuation first 2 hours",
+    53: "Tuesday Nifty expiry — theta decay accelerates, max pain magnet active [+3]",
+    54: "Thursday Sensex expiry — BSE options gamma play possible",
+    55: "Friday — weekend risk, positions may get squared off. Lighter trade sizes.",
+    56: "⏰ Pre-10AM: Opening range forming — observe, don't chase gaps",
+    57: "⏰ 10AM-12PM: Prime trend development window — best for directional entries",
+    58: "⏰ 12-2PM: Lunch consolidation — range-bound strategies or wait",
+    59: "⏰ 2-3PM: Power hour — strongest moves, expiry gamma spikes HERE",
+    60: "⏰ Post-3PM: Final 30min — avoid new entries, high chop risk",
+}
+# Factors that carry BULL/BEAR points — counted into factor_count
+_DIRECTIONAL_FACTORS = frozenset(fid for fid, fmt in _FACTOR_FMT.items() if "BULL]" in fmt or "BEAR]" in fmt)
+
+# Global-cue quote name (text before ":") → _parse_globals field — one dict hit per quote, no substring scans
+_GLOBAL_CUE_FIELD = {
+    "S&P 500": "sp500_pct", "Dow Jones": "dow_pct", "NASDAQ": "nasdaq_pct",
+    "Crude Oil": "crude_pct", "US Dollar Index": "dollar_pct", "Gold": "gold_pct",
+}
+
+_US_CUE_FIELDS = frozenset(("sp500_pct", "dow_pct", "nasdaq_pct"))
+
+def _parse_globals(global_data_list):
+    """Single walk over the global-cue quotes → everything the scorer needs from them:
+    typed % changes (NaN when an instrument is missing), US breadth (us_up / us_down of S&P, Dow,
+    NASDAQ beyond ±0.5%), all_pcts in list order, and its up / down / flat / big (>0.3%) masks."""
+    fields = dict.fromkeys(_GLOBAL_CUE_FIELD.values(), float("nan"))
+    pcts = []
+    us_up = us_down = 0
+    for g in global_data_list:
+        m = _GLOBAL_PCT_RE.search(g)
+        if not m:
+            continue
+        pct = float(m.group(1))
+        pcts.append(pct)
+        field = _GLOBAL_CUE_FIELD.get(g.partition(":")[0])
+        if field:
+            fields[field] = pct
+            if field in _US_CUE_FIELDS:
+                us_up += pct > 0.5
+                us_down += pct < -0.5
+    all_pcts = np.array(pcts)
+    return SimpleNamespace(**fields, us_up=us_up, us_down=us_down, all_pcts=all_pcts,
+                           up=all_pcts > 0, down=all_pcts < 0, flat=np.zeros(all_pcts.shape, dtype=bool),
+                           big=np.abs(all_pcts) > 0.3)
+
+_INDEX_SCORE_TTL = 300  # identical market snapshots (after hours, force-refresh polling) reuse the score cards
+
+def compute_index_scores(idx_data, oc_data_dict, global_data_list, vix_data, is_expiry, weekday_num, ist_hour):
+    """Score each index on 10 independent factors. Returns structured score card —
+    factors are (id, *args) records; render with _FACTOR_FMT[id].format(*args).
+    Cached on the exact inputs, so a hit is always the same result a fresh run would give."""
+    args = (idx_data, oc_data_dict, global_data_list, vix_data, is_expiry, weekday_num, ist_hour)
+    ck = "idxscore:" + hashlib.md5(repr(args).encode()).hexdigest()
+    cached = _smart_cache_get(ck)
+    if cached is not None:
+        return cached
+    scores = _score_indices(*args)
+    _smart_cache_set(ck, scores, _INDEX_SCORE_TTL)
+    return scores
+
+def _score_indices(idx_data, oc_data_dict, global_data_list, vix_data, is_expiry, weekday_num, ist_hour):
+    """compute_index_scores without the cache."""
+    scores = {}
+
+    # Global cues are the same for every index — one walk feeds Factor 5 and Factor 9
+    gp = _parse_globals(global_data_list)
+    global_bullish, global_bearish = gp.us_up, gp.us_down
+
+    for idx in idx_data:
+        name = idx["name"]
+        if name == "INDIA VIX":
+            continue
+
+        s = {"name": name, "total": 0, "factors": [], "bias": "NEUTRAL"}
+        add_factor = s["factors"].append  # bound once — ~20 factor records per index
+        price = idx["price"]
+        day_high = idx.get("day_high", price)
+        day_low = idx.get("day_low", price)
+        open_p = idx.get("open", price)
+        high_5d = idx.get("high_5d", price)
+        low_5d = idx.get("low_5d", price)
+        change_pct = idx.get("change_pct", 0)
+        vol = idx.get("volume", 0)
+
+        bullish_points = 0
+        bearish_points = 0
+
+        # ── FACTOR 1: Price Action Structure (0-15 pts) ──
+        range_5d = high_5d - low_5d if high_5d > low_5d else 1
+        pos_in_range = (price - low_5d) / range_5d  # 0=bottom, 1=top
+        day_range = day_high - day_low
+
+        if pos_in_range < 0.3:  # Near support
+            bullish_points += 12
+            add_factor((1, pos_in_range))
+        elif pos_in_range > 0.7:  # Near resistance
+            bearish_points += 12
+            add_factor((2, pos_in_range))
+        else:
+            add_factor((3, pos_in_range))
+
+        # Gap analysis
+        gap_pct = ((open_p - price) / price * 100) if price else 0
+        if abs(change_pct) > 0.5:
+            if change_pct > 0:
+                bullish_points += 8
+                add_factor((4, change_pct))
+            else:
+                bearish_points += 8
+                add_factor((5, change_pct))
+
+        # ── FACTOR 2: Option Chain Signal (0-15 pts) ──
+        oc = oc_data_dict.get(_OC_KEY.get(name, name))
+        if oc:
+            pcr = oc.get("pcr", 1)
+            max_pain = oc.get("max_pain", price)
+            straddle = oc.get("straddle_premium", 0)
+            mp_dist = max_pain - price
+            mp_pct = (mp_dist / price * 100) if price else 0
+
+            # PCR signal
+            if pcr > 1.3:
+                bullish_points += 10
+                add_factor((6, pcr))
+            elif pcr > 1.1:
+                bullish_points += 5
+                add_factor((7, pcr))
+            elif pcr < 0.7:
+                bearish_points += 10
+                add_factor((8, pcr))
+            elif pcr < 0.9:
+                bearish_points += 5
+                add_factor((9, pcr))
+            else:
+                add_factor((10, pcr))
+
+            # Max Pain pull
+            if abs(mp_pct) > 0.3:
+                if mp_dist > 0:
+                    bullish_points += 8
+                    add_factor((11, max_pain, mp_dist))
+                else:
+                    bearish_points += 8
+                    add_factor((12, max_pain, mp_dist))
+            else:
+                add_factor((13, max_pain, mp_dist))
+
+            # Straddle vs day range (momentum gauge)
+            if straddle > 0 and day_range > straddle * 1.2:
+                add_factor((14, day_range, straddle))
+            elif straddle > 0:
+                add_factor((15, day_range, straddle))
+
+            # OI walls
+            res_walls = oc.get("resistance_walls", [])
+            sup_walls = oc.get("support_walls", [])
+            if res_walls:
+                add_factor((16, ', '.join([str(w[0]) for w in res_walls[:3]])))
+            if sup_walls:
+                add_factor((17, ', '.join([str(w[0]) for w in sup_walls[:3]])))
+        else:
+            add_factor((18,))
+
+        # ── FACTOR 3: Momentum & Trend (0-10 pts) ──
+        if change_pct > 1.0:
+            bullish_points += 10
+            add_factor((19, change_pct))
+        elif change_pct > 0.3:
+            bullish_points += 5
+            add_factor((20, change_pct))
+        elif change_pct < -1.0:
+            bearish_points += 10
+            add_factor((21, change_pct))
+        elif change_pct < -0.3:
+            bearish_points += 5
+            add_factor((22, change_pct))
+
+        # ── FACTOR 4: Volatility/VIX (0-10 pts) ──
+        if vix_data:
+            vix_level = vix_data.get("price", 14)
+            vix_chg = vix_data.get("change_pct", 0)
+            if vix_level < 13:
+                bullish_points += 8
+                add_factor((23, vix_level))
+            elif vix_level > 20:
+                bearish_points += 8
+                add_factor((24, vix_level))
+            elif vix_level > 16:
+                add_factor((25, vix_level))
+            else:
+                add_factor((26, vix_level))
+
+            if abs(vix_chg) > 5:
+                add_factor((27, vix_chg))
+
+        # ── FACTOR 5: Global Cues (0-10 pts) ──
+        if gp.dollar_pct > 0.3:
+            bearish_points += 3  # Strong dollar = EM negative
+            add_factor((28, gp.dollar_pct))
+        elif gp.dollar_pct < -0.3:
+            bullish_points += 3
+            add_factor((29, gp.dollar_pct))
+        if gp.crude_pct > 2:
+            bearish_points += 3  # Crude up = bearish for India
+            add_factor((30, gp.crude_pct))
+        elif gp.crude_pct < -2:
+            bullish_points += 3
+            add_factor((31, gp.crude_pct))
+
+        if global_bullish >= 2:
+            bullish_points += 8
+            add_factor((32, global_bullish))
+        elif global_bearish >= 2:
+            bearish_points += 8
+            add_factor((33, global_bearish))
+
+        # ── FACTOR 6: Expiry Dynamics (0-10 pts) ──
+        if is_expiry:
+            add_factor((34,))
+            # On expiry, max pain pull is stronger
+            if oc and abs(mp_pct) > 0.5:
+                if mp_dist > 0:
+                    bullish_points += 5
+                else:
+                    bearish_points += 5
+                add_factor((35, mp_dist))
+
+        # ── FACTOR 7: Volume Confirmation (0-10 pts) ──
+        # High volume in direction of move = conviction, against = divergence warning
+        if vol > 0:
+            # We don't have vol average for indices from yfinance, but we can check 
+            # if today's candle body matches volume direction
+            body = price - open_p  # positive = bullish candle
+            if body > 0 and change_pct > 0.3:
+                bullish_points += 7
+                add_factor((36,))
+            elif body < 0 and change_pct < -0.3:
+                bearish_points += 7
+                add_factor((37,))
+            elif body > 0 and change_pct < -0.3:
+                add_factor((38,))
+            elif body < 0 and change_pct > 0.3:
+                add_factor((39,))
+
+        # ── FACTOR 8: Intraday Price Pattern (0-10 pts) ──
+        if day_high > day_low:
+            upper_wick = day_high - max(open_p, price)
+            lower_wick = min(open_p, price) - day_low
+            body_size = abs(price - open_p)
+            total_range = day_high - day_low
+            body_ratio = body_size / total_range if total_range > 0 else 0
+
+            if body_ratio > 0.7:  # Strong body = conviction
+                if price > open_p:
+                    bullish_points += 8
+                    add_factor((40, body_ratio))
+                else:
+                    bearish_points += 8
+                    add_factor((41, body_ratio))
+            elif lower_wick > body_size * 2 and price > open_p:  # Hammer
+                bullish_points += 6
+                add_factor((42,))
+            elif upper_wick > body_size * 2 and price < open_p:  # Shooting star
+                bearish_points += 6
+                add_factor((43,))
+            elif body_ratio < 0.2:  # Doji
+                add_factor((44, body_ratio))
+
+            # Price position within today's range
+            day_pos = (price - day_low) / total_range if total_range > 0 else 0.5
+            if day_pos > 0.8:
+                bullish_points += 3
+                add_factor((45, day_pos))
+            elif day_pos < 0.2:
+                bearish_points += 3
+                add_factor((46, day_pos))
+
+        # ── FACTOR 9: Intermarket Correlation (0-10 pts) ──
+        # Check if global signals are aligned or divergent
+        same_dir = gp.up if change_pct > 0 else gp.down if change_pct < 0 else gp.flat
+        aligned_signals = int(same_dir.sum())
+        conflict_signals = int((gp.big & ~same_dir).sum())
+
+        if aligned_signals >= 5:
+            pts = 8
+            if change_pct > 0:
+                bullish_points += pts
+            else:
+                bearish_points += pts
+            add_factor((47, aligned_signals, pts))
+        elif conflict_signals >= 3:
+            add_factor((48, conflict_signals))
+
+        # Gold-equity inverse check
+        if gp.gold_pct > 1 and change_pct > 0:
+            add_factor((49, gp.gold_pct))
+        elif gp.gold_pct > 1.5 and change_pct < 0:
+            bearish_points += 3
+            add_factor((50, gp.gold_pct))
+
+        # ── FACTOR 10: Day-of-Week & Time Seasonality (0-8 pts) ──
+        day_names = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+        dow = day_names[weekday_num] if weekday_num < 5 else "Weekend"
+
+        if weekday_num == 0:  # Monday
+            add_factor((51,))
+            if abs(change_pct) > 0.5:
+                add_factor((52, change_pct))
+        elif weekday_num == 1:  # Tuesday (Nifty expiry)
+            if is_expiry:
+                bullish_points += 3  # Expiry day has built-in edge from gamma
+                add_factor((53,))
+        elif weekday_num == 3:  # Thursday (Sensex expiry)
+            if is_expiry:
+                add_factor((54,))
+        elif weekday_num == 4:  # Friday
+            add_factor((55,))
+
+        # Time-of-day edge
+        if 9 <= ist_hour < 10:
+            add_factor((56,))
+        elif 10 <= ist_hour < 12:
+            add_factor((57,))
+        elif 12 <= ist_hour < 14:
+            add_factor((58,))
+        elif 14 <= ist_hour < 15:
+            add_factor((59,))
+        elif ist_hour >= 15:
+            add_factor((60,))
+
+        # ── FINAL SCORING ──
+        net = bullish_points - bearish_points
+        s["bullish_score"] = bullish_points
+        s["bearish_score"] = bearish_points
+        s["net_score"] = net
+
+        if net > 15:
+            s["bias"] = "STRONG BULLISH"
+            s["suggested_bias"] = "Buy CE / Buy Futures"
+        elif net > 5:
+            s["bias"] = "MILD BULLISH"
+            s["suggested_bias"] = "Buy CE (conservative)"
+        elif net < -15:
+            s["bias"] = "STRONG BEARISH"
+            s["suggested_bias"] = "Buy PE / Sell Futures"
+        elif net < -5:
+            s["bias"] = "MILD BEARISH"
+            s["suggested_bias"] = "Buy PE (conservative)"
+        else:
+            s["bias"] = "NEUTRAL"
+            s["suggested_bias"] = "Range play / Straddle / Wait for clarity"
+
+        edge = 50 + int(abs(net) * 0.6)  # Base 50% + scaled factor edge, cap at 95%
+        s["edge_pct"] = 95 if edge > 95 else edge
+        s["factor_count"] = sum(1 for fid, *_ in s["factors"] if fid in _DIRECTIONAL_FACTORS)
+        scores[name] = s
+
+    return scores
+
+
+@app.post("/api/index-trades")
+async def index_trades(request: Request):
+    """Generate AI-powered daily index trade ideas for Indian markets"""
+    import json as json_mod
+    
+    body = orjson.loads(await request.body())
+    email = body.get("email", "").strip().lower()
+    force_refresh = body.get("force_refresh", False)
+    region = body.get("region", "IN").upper()
+    is_us_trades = region == "US"
+    
+    if email not in TRADES_ALLOWED_EMAILS:
+        return {"success": False, "error": "Access restricted. This feature is exclusively available to authorized users."}
+    
+    # 30-minute cache — fresh enough for live trading, stable enough to avoid flip-flopping
+    # IST_NOW is the request's single IST clock — scoring and expiry detection below reuse it
+    IST_NOW = datetime.utcnow() + IST_OFFSET
+    IST_WEEKDAY = IST_NOW.weekday()
+    IST_HOUR = IST_NOW.hour
+    _rc = _trades_cache_us if is_us_trades else _trades_cache
+    
+    cache_valid = (
+        not force_refresh
+        and _rc["timestamp"] is not None 
+        and _rc["data"] is not None
+        and (IST_NOW - _rc["timestamp"]).total_seconds() < 1800  # 30 minutes
+    )
+    
+    if cache_valid:
+        age_min = int((IST_NOW - _rc["timestamp"]).total_seconds() / 60)
+        print(f"📋 Returning cached {region} trades ({age_min}min old)")
+        return _rc["data"]
+    
+    if force_refresh:
         print(f"🔄 Force refresh requested by {email} — generating with latest market data")
     else:
         print(f"🔥 Index trades requested by {email} — generating fresh (cache expired or empty)")
     
     # ═══ MULTI-SOURCE HELPER — yfinance → Yahoo v8 ═══
     def _yfetch(ticker):
-        """Fetch price+history with fallback. Returns (hist_df, info_dict) or (None, None)."""
+        """Fetch price+history with fallback. Returns (hist_df, info_dict) or (None, None) — info is only
+        filled from the v8 chart meta; the yfinance path skips the heavy t.info call."""
         import yfinance as yf
         # Source 1: yfinance
         try:
             t = yf.Ticker(ticker)
-            hist = t.history(period="5d")
+            hist = _history_with_retry(t, period="5d")
             if not hist.empty:
-                return hist, t.info or {}
+                return hist, {}
         except:
             pass
         # Source 2: Yahoo v8 chart API
         try:
             _h = {'User-Agent': f'Mozilla/5.0 Chrome/{random.randint(118,126)}.0.0.0', 'Accept': 'application/json'}
-            r = _http_pool.get(f"https://query1.finance.yahoo.com/v8/finance/chart/{ticker}?interval=1d&range=5d", timeout=4)
+            r = _get_with_retry(_http_pool, f"https://query1.finance.yahoo.com/v8/finance/chart/{ticker}?interval=1d&range=5d", headers=_h, timeout=4)
             if r.status_code == 200:
                 res = r.json().get('chart', {}).get('result', [{}])[0]
                 meta = res.get('meta', {})
@@ -8479,6 +9650,23 @@ async def index_trades(request: Request):
             pass
         return None, None
     
+    def _histories(tmap):
+        """Batched yf.download for the whole map; per-ticker _yfetch only for symbols the batch missed."""
+        hists = _yf_batch_history(list(tmap), period="5d")
+        missing = [t for t in tmap if t not in hists]
+        if missing:
+            # Bounded wait — a ticker stuck in Yahoo's retry chain is treated as a miss, not a stall
+            futs = {_yf_pool.submit(_yfetch, t): t for t in missing}
+            try:
+                for f in as_completed(futs, timeout=8):
+                    try:
+                        hists[futs[f]] = f.result(timeout=3)[0]
+                    except Exception:
+                        pass
+            except Exception as e:
+                print(f"⚠️ Index history fan-out timed out: {e}")
+        return hists
+    
     # Fetch index data based on region
     indices_data = []
     if is_us_trades:
@@ -8496,24 +9684,27 @@ async def index_trades(request: Request):
             "^INDIAVIX": "INDIA VIX"
         }
     
+    # Blocking yfinance/NSE/Claude calls run in the shared pool — never on the event loop
+    loop = asyncio.get_event_loop()
+    index_hists = await loop.run_in_executor(_thread_pool, _histories, tickers)
     for ticker, name in tickers.items():
         try:
-            hist, info = _yfetch(ticker)
+            hist = index_hists.get(ticker)
             if hist is not None and not hist.empty:
-                latest = hist.iloc[-1]
-                prev = hist.iloc[-2] if len(hist) > 1 else hist.iloc[0]
-                price = round(latest['Close'], 2)
-                change = round(price - prev['Close'], 2)
-                change_pct = round((change / prev['Close']) * 100, 2) if prev['Close'] else 0
-                high_5d = round(hist['High'].max(), 2)
-                low_5d = round(hist['Low'].min(), 2)
-                vol = int(latest.get('Volume', 0))
+                opens, highs, lows, closes, vols = _hist_arrays(hist)
+                prev_close = closes[-2] if closes.size > 1 else closes[0]
+                price = round(closes[-1], 2)
+                change = round(price - prev_close, 2)
+                change_pct = round((change / prev_close) * 100, 2) if prev_close else 0
+                high_5d = round(np.nanmax(highs), 2)
+                low_5d = round(np.nanmin(lows), 2)
+                vol = int(vols[-1])
                 indices_data.append({
                     "name": name, "ticker": ticker, "price": price,
                     "change": change, "change_pct": change_pct,
                     "high_5d": high_5d, "low_5d": low_5d, "volume": vol,
-                    "day_high": round(latest['High'], 2), "day_low": round(latest['Low'], 2),
-                    "open": round(latest['Open'], 2)
+                    "day_high": round(highs[-1], 2), "day_low": round(lows[-1], 2),
+                    "open": round(opens[-1], 2)
                 })
                 print(f"  ✅ {name}: {price} ({change:+.2f})")
         except Exception as e:
@@ -8531,12 +9722,14 @@ async def index_trades(request: Request):
         "CL=F": "Crude Oil",
         "GC=F": "Gold"
     }
+    global_hists = await loop.run_in_executor(_thread_pool, _histories, global_tickers)
     for ticker, name in global_tickers.items():
         try:
-            hist, info = _yfetch(ticker)
+            hist = global_hists.get(ticker)
             if hist is not None and not hist.empty:
-                price = round(hist.iloc[-1]['Close'], 2)
-                prev = hist.iloc[-2]['Close'] if len(hist) > 1 else price
+                closes = hist['Close'].to_numpy()
+                price = round(closes[-1], 2)
+                prev = closes[-2] if closes.size > 1 else price
                 change_pct = round(((price - prev) / prev) * 100, 2) if prev else 0
                 global_data.append(f"{name}: {price} ({change_pct:+.2f}%)")
         except:
@@ -8569,24 +9762,24 @@ async def index_trades(request: Request):
             "TATASTEEL.NS": "Tata Steel",
             "ADANIENT.NS": "Adani Enterprises"
         }
+    stock_hists = await loop.run_in_executor(_thread_pool, _histories, stock_tickers)
     for ticker, name in stock_tickers.items():
         try:
-            hist, info = _yfetch(ticker)
+            hist = stock_hists.get(ticker)
             if hist is not None and not hist.empty and len(hist) >= 2:
-                latest = hist.iloc[-1]
-                prev = hist.iloc[-2]
-                price = round(latest['Close'], 2)
-                change_pct = round(((price - prev['Close']) / prev['Close']) * 100, 2)
-                vol_avg = int(hist['Volume'].mean()) if 'Volume' in hist.columns else 0
-                vol_today = int(latest.get('Volume', 0))
+                _opens, highs, lows, closes, vols = _hist_arrays(hist)
+                price = round(closes[-1], 2)
+                change_pct = round(((price - closes[-2]) / closes[-2]) * 100, 2)
+                vol_avg = int(np.nanmean(vols))
+                vol_today = int(vols[-1])
                 vol_spike = round(vol_today / vol_avg, 2) if vol_avg > 0 else 1
-                high_5d = round(hist['High'].max(), 2)
-                low_5d = round(hist['Low'].min(), 2)
+                high_5d = round(np.nanmax(highs), 2)
+                low_5d = round(np.nanmin(lows), 2)
                 stock_data.append({
                     "ticker": ticker.replace(".NS",""), "name": name,
                     "price": price, "change_pct": change_pct,
                     "vol_spike": vol_spike, "high_5d": high_5d, "low_5d": low_5d,
-                    "day_high": round(latest['High'], 2), "day_low": round(latest['Low'], 2)
+                    "day_high": round(highs[-1], 2), "day_low": round(lows[-1], 2)
                 })
         except:
             pass
@@ -8602,24 +9795,15 @@ async def index_trades(request: Request):
     ])
     
     # ═══ FETCH REAL OPTION CHAIN DATA FROM NSE ═══
-    import requests as req_lib
+    oc_headers = {
+        "Accept": "application/json, text/javascript, */*; q=0.01",
+        "Referer": "https://www.nseindia.com/option-chain",
+        "X-Requested-With": "XMLHttpRequest"
+    }
     
     def fetch_nse_option_chain(symbol):
         """Fetch live option chain from NSE for NIFTY, BANKNIFTY, or SENSEX."""
         try:
-            session = req_lib.Session()
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                "Accept": "application/json, text/javascript, */*; q=0.01",
-                "Accept-Language": "en-US,en;q=0.9",
-                "Accept-Encoding": "gzip, deflate, br",
-                "Referer": "https://www.nseindia.com/option-chain",
-                "X-Requested-With": "XMLHttpRequest"
-            }
-            session.headers.update(headers)
-            # First hit the main page to get cookies
-            session.get("https://www.nseindia.com", timeout=5)
-            
             # Map symbol to NSE API format
             nse_symbol = symbol.replace(" ", "").upper()
             if nse_symbol in ["NIFTY50", "NIFTY"]:
@@ -8631,14 +9815,20 @@ async def index_trades(request: Request):
             if nse_symbol in ["SENSEX", "BSE"]:
                 return None
             
+            # 60s per-symbol cache — force refreshes inside the trades window don't re-pull the full chain
+            oc_cache_key = f"shared:market:oc:{nse_symbol}"
+            cached_oc = _shared_cache_get(oc_cache_key)
+            if cached_oc:
+                return cached_oc
+            
+            # Shared NSE session — cookies persist across requests, refreshed by _nse_init
             url = f"https://www.nseindia.com/api/option-chain-indices?symbol={nse_symbol}"
-            resp = session.get(url, timeout=10)
+            data = _nse_get(url, retries=1, timeout=10, headers=oc_headers)
             
-            if resp.status_code != 200:
-                print(f"  ⚠️ NSE option chain {symbol}: HTTP {resp.status_code}")
+            if not data:
+                print(f"  ⚠️ NSE option chain {symbol}: no data")
                 return None
             
-            data = resp.json()
             records = data.get("records", {})
             oc_data = records.get("data", [])
             
@@ -8649,83 +9839,56 @@ async def index_trades(request: Request):
             expiry_dates = records.get("expiryDates", [])
             nearest_expiry = expiry_dates[0] if expiry_dates else ""
             
+            # Normalize nearest-expiry rows into columns once — every aggregate below is an array op
+            rows = [row for row in oc_data
+                    if row.get("CE", {}).get("expiryDate", "") == nearest_expiry
+                    or row.get("PE", {}).get("expiryDate", "") == nearest_expiry]
+            def _col(side, field):
+                return [row.get(side, {}).get(field, 0) or 0 for row in rows]
+            strike_l = [row.get("strikePrice", 0) for row in rows]
+            ce_oi_l, pe_oi_l = _col("CE", "openInterest"), _col("PE", "openInterest")
+            ce_chg_l, pe_chg_l = _col("CE", "changeinOpenInterest"), _col("PE", "changeinOpenInterest")
+            ce_ltp_l, pe_ltp_l = _col("CE", "lastPrice"), _col("PE", "lastPrice")
+            ce_iv_l, pe_iv_l = _col("CE", "impliedVolatility"), _col("PE", "impliedVolatility")
+            
+            strikes = np.array(strike_l, dtype=float)
+            ce_oi, pe_oi = np.array(ce_oi_l, dtype=float), np.array(pe_oi_l, dtype=float)
+            chg_oi = np.abs(np.array(ce_chg_l, dtype=float)) + np.abs(np.array(pe_chg_l, dtype=float))
+            
             # Calculate PCR, Max Pain, key OI levels
-            total_ce_oi = 0
-            total_pe_oi = 0
-            max_pain_data = {}
-            strike_oi = []
+            total_ce_oi = sum(ce_oi_l)
+            total_pe_oi = sum(pe_oi_l)
             atm_strike = None
-            min_diff = float('inf')
             straddle_premium = 0
+            max_pain = spot
+            top_ce_idx = top_pe_idx = top_chg_idx = []
             
-            for row in oc_data:
-                strike = row.get("strikePrice", 0)
-                ce = row.get("CE", {})
-                pe = row.get("PE", {})
+            if rows:
+                # ATM strike (closest to spot)
+                atm = int(np.abs(strikes - spot).argmin())
+                atm_strike = strike_l[atm]
+                straddle_premium = round(ce_ltp_l[atm] + pe_ltp_l[atm], 2)
                 
-                # Only consider nearest expiry
-                ce_expiry = ce.get("expiryDate", "")
-                pe_expiry = pe.get("expiryDate", "")
+                # Max pain — one entry per strike (last row wins), writer payout at every candidate expiry:
+                # diff[i, j] = strike_i - strike_j; CE at j pays (diff)+, PE at j pays (-diff)+
+                uniq, first_rev = np.unique(strikes[::-1], return_index=True)
+                last = len(rows) - 1 - first_rev
+                diff = uniq[:, None] - uniq[None, :]
+                pain = np.clip(diff, 0, None) @ ce_oi[last] + np.clip(-diff, 0, None) @ pe_oi[last]
+                max_pain = strike_l[int(last[pain.argmin()])]
                 
-                if ce_expiry == nearest_expiry or pe_expiry == nearest_expiry:
-                    ce_oi = ce.get("openInterest", 0) or 0
-                    pe_oi = pe.get("openInterest", 0) or 0
-                    ce_ltp = ce.get("lastPrice", 0) or 0
-                    pe_ltp = pe.get("lastPrice", 0) or 0
-                    ce_iv = ce.get("impliedVolatility", 0) or 0
-                    pe_iv = pe.get("impliedVolatility", 0) or 0
-                    ce_chg_oi = ce.get("changeinOpenInterest", 0) or 0
-                    pe_chg_oi = pe.get("changeinOpenInterest", 0) or 0
-                    
-                    total_ce_oi += ce_oi
-                    total_pe_oi += pe_oi
-                    
-                    # ATM strike (closest to spot)
-                    diff = abs(strike - spot)
-                    if diff < min_diff:
-                        min_diff = diff
-                        atm_strike = strike
-                        straddle_premium = round(ce_ltp + pe_ltp, 2)
-                    
-                    if ce_oi > 0 or pe_oi > 0:
-                        strike_oi.append({
-                            "strike": strike,
-                            "ce_oi": ce_oi, "pe_oi": pe_oi,
-                            "ce_chg_oi": ce_chg_oi, "pe_chg_oi": pe_chg_oi,
-                            "ce_ltp": ce_ltp, "pe_ltp": pe_ltp,
-                            "ce_iv": ce_iv, "pe_iv": pe_iv
-                        })
-                    
-                    # Max pain calculation
-                    max_pain_data[strike] = {"ce_oi": ce_oi, "pe_oi": pe_oi}
-            
-            # Calculate max pain
-            max_pain = spot
-            min_pain_value = float('inf')
-            strikes_list = sorted(max_pain_data.keys())
-            for s in strikes_list:
-                pain = 0
-                for s2 in strikes_list:
-                    if s2 < s:
-                        pain += max_pain_data[s2]["ce_oi"] * (s - s2)
-                    elif s2 > s:
-                        pain += max_pain_data[s2]["pe_oi"] * (s2 - s)
-                if pain < min_pain_value:
-                    min_pain_value = pain
-                    max_pain = s
+                # Top OI strikes (resistance = high CE OI, support = high PE OI), then top change in OI
+                # (smart money positioning) — successive stable sorts, so ties keep the previous ordering
+                order = np.flatnonzero((ce_oi > 0) | (pe_oi > 0))
+                order = order[np.argsort(-ce_oi[order], kind="stable")]
+                top_ce_idx = order[:5].tolist()  # Top resistance walls
+                order = order[np.argsort(-pe_oi[order], kind="stable")]
+                top_pe_idx = order[:5].tolist()  # Top support walls
+                order = order[np.argsort(-chg_oi[order], kind="stable")]
+                top_chg_idx = order[:5].tolist()
             
             pcr = round(total_pe_oi / total_ce_oi, 2) if total_ce_oi > 0 else 0
             
-            # Top OI strikes (resistance = high CE OI, support = high PE OI)
-            strike_oi.sort(key=lambda x: x["ce_oi"], reverse=True)
-            top_ce_oi = strike_oi[:5]  # Top resistance walls
-            strike_oi.sort(key=lambda x: x["pe_oi"], reverse=True)
-            top_pe_oi = strike_oi[:5]  # Top support walls
-            
-            # Top change in OI (smart money positioning)
-            strike_oi.sort(key=lambda x: abs(x["ce_chg_oi"]) + abs(x["pe_chg_oi"]), reverse=True)
-            top_chg_oi = strike_oi[:5]
-            
             result = {
                 "symbol": symbol,
                 "spot": spot,
@@ -8737,12 +9900,13 @@ async def index_trades(request: Request):
                 "expected_move": straddle_premium,
                 "total_ce_oi": total_ce_oi,
                 "total_pe_oi": total_pe_oi,
-                "resistance_walls": [(s["strike"], s["ce_oi"]) for s in top_ce_oi],
-                "support_walls": [(s["strike"], s["pe_oi"]) for s in top_pe_oi],
-                "top_oi_changes": [(s["strike"], s["ce_chg_oi"], s["pe_chg_oi"]) for s in top_chg_oi],
-                "atm_iv": round((top_ce_oi[0]["ce_iv"] + top_pe_oi[0]["pe_iv"]) / 2, 1) if top_ce_oi and top_pe_oi else 0
+                "resistance_walls": [(strike_l[i], ce_oi_l[i]) for i in top_ce_idx],
+                "support_walls": [(strike_l[i], pe_oi_l[i]) for i in top_pe_idx],
+                "top_oi_changes": [(strike_l[i], ce_chg_l[i], pe_chg_l[i]) for i in top_chg_idx],
+                "atm_iv": round((ce_iv_l[top_ce_idx[0]] + pe_iv_l[top_pe_idx[0]]) / 2, 1) if top_ce_idx and top_pe_idx else 0
             }
             print(f"  ✅ NSE OC {symbol}: Spot={spot}, PCR={pcr}, MaxPain={max_pain}, ATM={atm_strike}, Straddle=₹{straddle_premium}")
+            _shared_cache_set(oc_cache_key, result, 60)
             return result
             
         except Exception as e:
@@ -8752,8 +9916,11 @@ async def index_trades(request: Request):
     # Fetch option chains (India only — NSE doesn't have US data)
     oc_nifty = None; oc_banknifty = None
     if not is_us_trades:
-        oc_nifty = fetch_nse_option_chain("NIFTY")
-        oc_banknifty = fetch_nse_option_chain("BANKNIFTY")
+        # Both chains in parallel on the warmed _nse_session — wall time is one NSE round-trip, not two
+        oc_nifty, oc_banknifty = await asyncio.gather(
+            loop.run_in_executor(_thread_pool, _single_flight, "oc:NIFTY", fetch_nse_option_chain, "NIFTY"),
+            loop.run_in_executor(_thread_pool, _single_flight, "oc:BANKNIFTY", fetch_nse_option_chain, "BANKNIFTY"),
+        )
     
     # Build option chain text for prompt
     oc_text_parts = []
@@ -8784,341 +9951,7 @@ async def index_trades(request: Request):
     # AI sees hard numbers, not guesses
     # ═══════════════════════════════════════════════════════════════════
     
-    def compute_index_scores(idx_data, oc_data_dict, global_data_list, vix_data, is_expiry, weekday_num, ist_hour):
-        """Score each index on 10 independent factors. Returns structured score card."""
-        scores = {}
-        
-        for idx in idx_data:
-            name = idx["name"]
-            if name == "INDIA VIX":
-                continue
-            
-            s = {"name": name, "total": 0, "factors": [], "bias": "NEUTRAL"}
-            price = idx["price"]
-            day_high = idx.get("day_high", price)
-            day_low = idx.get("day_low", price)
-            open_p = idx.get("open", price)
-            high_5d = idx.get("high_5d", price)
-            low_5d = idx.get("low_5d", price)
-            change_pct = idx.get("change_pct", 0)
-            vol = idx.get("volume", 0)
-            
-            bullish_points = 0
-            bearish_points = 0
-            
-            # ── FACTOR 1: Price Action Structure (0-15 pts) ──
-            range_5d = high_5d - low_5d if high_5d > low_5d else 1
-            pos_in_range = (price - low_5d) / range_5d  # 0=bottom, 1=top
-            day_range = day_high - day_low
-            
-            if pos_in_range < 0.3:  # Near support
-                bullish_points += 12
-                s["factors"].append(f"Price near 5D support ({pos_in_range:.0%} of range) [+12 BULL]")
-            elif pos_in_range > 0.7:  # Near resistance
-                bearish_points += 12
-                s["factors"].append(f"Price near 5D resistance ({pos_in_range:.0%} of range) [+12 BEAR]")
-            else:
-                s["factors"].append(f"Price mid-range ({pos_in_range:.0%}) [NEUTRAL]")
-            
-            # Gap analysis
-            gap_pct = ((open_p - price) / price * 100) if price else 0
-            if abs(change_pct) > 0.5:
-                if change_pct > 0:
-                    bullish_points += 8
-                    s["factors"].append(f"Gap up +{change_pct:.2f}% [+8 BULL]")
-                else:
-                    bearish_points += 8
-                    s["factors"].append(f"Gap down {change_pct:.2f}% [+8 BEAR]")
-            
-            # ── FACTOR 2: Option Chain Signal (0-15 pts) ──
-            oc = oc_data_dict.get(name.replace(" ", "").replace("50", "").upper())
-            if oc:
-                pcr = oc.get("pcr", 1)
-                max_pain = oc.get("max_pain", price)
-                straddle = oc.get("straddle_premium", 0)
-                mp_dist = max_pain - price
-                mp_pct = (mp_dist / price * 100) if price else 0
-                
-                # PCR signal
-                if pcr > 1.3:
-                    bullish_points += 10
-                    s["factors"].append(f"PCR {pcr:.2f} — strong bullish (heavy PE writing) [+10 BULL]")
-                elif pcr > 1.1:
-                    bullish_points += 5
-                    s["factors"].append(f"PCR {pcr:.2f} — mildly bullish [+5 BULL]")
-                elif pcr < 0.7:
-                    bearish_points += 10
-                    s["factors"].append(f"PCR {pcr:.2f} — strong bearish (heavy CE writing) [+10 BEAR]")
-                elif pcr < 0.9:
-                    bearish_points += 5
-                    s["factors"].append(f"PCR {pcr:.2f} — mildly bearish [+5 BEAR]")
-                else:
-                    s["factors"].append(f"PCR {pcr:.2f} — neutral zone")
-                
-                # Max Pain pull
-                if abs(mp_pct) > 0.3:
-                    if mp_dist > 0:
-                        bullish_points += 8
-                        s["factors"].append(f"Max Pain {max_pain} is {mp_dist:+.0f} pts ABOVE spot — pull-up force [+8 BULL]")
-                    else:
-                        bearish_points += 8
-                        s["factors"].append(f"Max Pain {max_pain} is {mp_dist:+.0f} pts BELOW spot — pull-down force [+8 BEAR]")
-                else:
-                    s["factors"].append(f"Max Pain {max_pain} near spot ({mp_dist:+.0f} pts) — pinning likely")
-                
-                # Straddle vs day range (momentum gauge)
-                if straddle > 0 and day_range > straddle * 1.2:
-                    s["factors"].append(f"Day range ({day_range:.0f}) > straddle (₹{straddle}) — MOMENTUM day")
-                elif straddle > 0:
-                    s["factors"].append(f"Day range ({day_range:.0f}) within straddle (₹{straddle}) — RANGE-BOUND")
-                
-                # OI walls
-                res_walls = oc.get("resistance_walls", [])
-                sup_walls = oc.get("support_walls", [])
-                if res_walls:
-                    s["factors"].append(f"CE OI resistance: {', '.join([str(w[0]) for w in res_walls[:3]])}")
-                if sup_walls:
-                    s["factors"].append(f"PE OI support: {', '.join([str(w[0]) for w in sup_walls[:3]])}")
-            else:
-                s["factors"].append("No option chain data — price action only")
-            
-            # ── FACTOR 3: Momentum & Trend (0-10 pts) ──
-            if change_pct > 1.0:
-                bullish_points += 10
-                s["factors"].append(f"Strong upward momentum +{change_pct:.2f}% [+10 BULL]")
-            elif change_pct > 0.3:
-                bullish_points += 5
-                s["factors"].append(f"Mild upward momentum +{change_pct:.2f}% [+5 BULL]")
-            elif change_pct < -1.0:
-                bearish_points += 10
-                s["factors"].append(f"Strong downward momentum {change_pct:.2f}% [+10 BEAR]")
-            elif change_pct < -0.3:
-                bearish_points += 5
-                s["factors"].append(f"Mild downward momentum {change_pct:.2f}% [+5 BEAR]")
-            
-            # ── FACTOR 4: Volatility/VIX (0-10 pts) ──
-            if vix_data:
-                vix_level = vix_data.get("price", 14)
-                vix_chg = vix_data.get("change_pct", 0)
-                if vix_level < 13:
-                    bullish_points += 8
-                    s["factors"].append(f"VIX {vix_level:.1f} LOW — complacency, directional bets favored [+8 BULL]")
-                elif vix_level > 20:
-                    bearish_points += 8
-                    s["factors"].append(f"VIX {vix_level:.1f} HIGH — fear, mean-reversion or hedging [+8 BEAR]")
-                elif vix_level > 16:
-                    s["factors"].append(f"VIX {vix_level:.1f} ELEVATED — reduce sizes, stay alert")
-                else:
-                    s["factors"].append(f"VIX {vix_level:.1f} NORMAL")
-                    
-                if abs(vix_chg) > 5:
-                    s["factors"].append(f"VIX moving fast ({vix_chg:+.1f}%) — volatility regime shift")
-            
-            # ── FACTOR 5: Global Cues (0-10 pts) ──
-            global_bullish = 0
-            global_bearish = 0
-            for g in global_data_list:
-                if "S&P 500" in g or "Dow" in g or "NASDAQ" in g:
-                    try:
-                        pct = float(g.split("(")[1].split("%")[0])
-                        if pct > 0.5:
-                            global_bullish += 1
-                        elif pct < -0.5:
-                            global_bearish += 1
-                    except:
-                        pass
-                if "Crude" in g:
-                    try:
-                        pct = float(g.split("(")[1].split("%")[0])
-                        if pct > 2:
-                            bearish_points += 3  # Crude up = bearish for India
-                            s["factors"].append(f"Crude spike {pct:+.1f}% — negative for India [+3 BEAR]")
-                        elif pct < -2:
-                            bullish_points += 3
-                            s["factors"].append(f"Crude drop {pct:+.1f}% — positive for India [+3 BULL]")
-                    except:
-                        pass
-                if "Dollar" in g:
-                    try:
-                        pct = float(g.split("(")[1].split("%")[0])
-                        if pct > 0.3:
-                            bearish_points += 3  # Strong dollar = EM negative
-                            s["factors"].append(f"Dollar up {pct:+.1f}% — EM headwind [+3 BEAR]")
-                        elif pct < -0.3:
-                            bullish_points += 3
-                            s["factors"].append(f"Dollar down {pct:+.1f}% — EM tailwind [+3 BULL]")
-                    except:
-                        pass
-            
-            if global_bullish >= 2:
-                bullish_points += 8
-                s["factors"].append(f"US markets positive ({global_bullish}/3 up) [+8 BULL]")
-            elif global_bearish >= 2:
-                bearish_points += 8
-                s["factors"].append(f"US markets negative ({global_bearish}/3 down) [+8 BEAR]")
-            
-            # ── FACTOR 6: Expiry Dynamics (0-10 pts) ──
-            if is_expiry:
-                s["factors"].append("EXPIRY DAY — gamma acceleration, max pain magnet, theta crush after 1 PM [+5 VOLATILE]")
-                # On expiry, max pain pull is stronger
-                if oc and abs(mp_pct) > 0.5:
-                    if mp_dist > 0:
-                        bullish_points += 5
-                    else:
-                        bearish_points += 5
-                    s["factors"].append(f"Expiry max pain pull: {mp_dist:+.0f} pts [+5 directional]")
-            
-            # ── FACTOR 7: Volume Confirmation (0-10 pts) ──
-            # High volume in direction of move = conviction, against = divergence warning
-            if vol > 0:
-                # We don't have vol average for indices from yfinance, but we can check 
-                # if today's candle body matches volume direction
-                body = price - open_p  # positive = bullish candle
-                if body > 0 and change_pct > 0.3:
-                    bullish_points += 7
-                    s["factors"].append(f"Bullish candle + positive session = volume confirming direction [+7 BULL]")
-                elif body < 0 and change_pct < -0.3:
-                    bearish_points += 7
-                    s["factors"].append(f"Bearish candle + negative session = volume confirming direction [+7 BEAR]")
-                elif body > 0 and change_pct < -0.3:
-                    s["factors"].append(f"⚠️ DIVERGENCE: Bullish candle but session negative — distribution pattern")
-                elif body < 0 and change_pct > 0.3:
-                    s["factors"].append(f"⚠️ DIVERGENCE: Bearish candle but session positive — accumulation pattern")
-            
-            # ── FACTOR 8: Intraday Price Pattern (0-10 pts) ──
-            if day_high > day_low:
-                upper_wick = day_high - max(open_p, price)
-                lower_wick = min(open_p, price) - day_low
-                body_size = abs(price - open_p)
-                total_range = day_high - day_low
-                body_ratio = body_size / total_range if total_range > 0 else 0
-                
-                if body_ratio > 0.7:  # Strong body = conviction
-                    if price > open_p:
-                        bullish_points += 8
-                        s["factors"].append(f"Marubozu-like candle (body {body_ratio:.0%}) — strong bullish conviction [+8 BULL]")
-                    else:
-                        bearish_points += 8
-                        s["factors"].append(f"Marubozu-like candle (body {body_ratio:.0%}) — strong bearish conviction [+8 BEAR]")
-                elif lower_wick > body_size * 2 and price > open_p:  # Hammer
-                    bullish_points += 6
-                    s["factors"].append(f"Hammer pattern — buying from lows, reversal signal [+6 BULL]")
-                elif upper_wick > body_size * 2 and price < open_p:  # Shooting star
-                    bearish_points += 6
-                    s["factors"].append(f"Shooting star — rejection from highs [+6 BEAR]")
-                elif body_ratio < 0.2:  # Doji
-                    s["factors"].append(f"Doji-like candle (body {body_ratio:.0%}) — indecision, wait for breakout")
-                
-                # Price position within today's range
-                day_pos = (price - day_low) / total_range if total_range > 0 else 0.5
-                if day_pos > 0.8:
-                    bullish_points += 3
-                    s["factors"].append(f"Closing near day high ({day_pos:.0%}) — buyers in control [+3 BULL]")
-                elif day_pos < 0.2:
-                    bearish_points += 3
-                    s["factors"].append(f"Closing near day low ({day_pos:.0%}) — sellers in control [+3 BEAR]")
-            
-            # ── FACTOR 9: Intermarket Correlation (0-10 pts) ──
-            # Check if global signals are aligned or divergent
-            aligned_signals = 0
-            conflict_signals = 0
-            for g in global_data_list:
-                try:
-                    pct = float(g.split("(")[1].split("%")[0])
-                    if (change_pct > 0 and pct > 0) or (change_pct < 0 and pct < 0):
-                        aligned_signals += 1
-                    elif abs(pct) > 0.3:
-                        conflict_signals += 1
-                except:
-                    pass
-            
-            if aligned_signals >= 5:
-                pts = 8
-                if change_pct > 0:
-                    bullish_points += pts
-                else:
-                    bearish_points += pts
-                s["factors"].append(f"Strong intermarket alignment ({aligned_signals} markets same direction) [+{pts} directional]")
-            elif conflict_signals >= 3:
-                s["factors"].append(f"⚠️ Intermarket divergence ({conflict_signals} conflicting) — lower conviction")
-            
-            # Gold-equity inverse check
-            for g in global_data_list:
-                if "Gold" in g:
-                    try:
-                        gold_pct = float(g.split("(")[1].split("%")[0])
-                        if gold_pct > 1 and change_pct > 0:
-                            s["factors"].append(f"Gold +{gold_pct:.1f}% with equity up — risk-on rally (unusual)")
-                        elif gold_pct > 1.5 and change_pct < 0:
-                            bearish_points += 3
-                            s["factors"].append(f"Gold +{gold_pct:.1f}% = flight to safety [+3 BEAR]")
-                    except:
-                        pass
-            
-            # ── FACTOR 10: Day-of-Week & Time Seasonality (0-8 pts) ──
-            day_names = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
-            dow = day_names[weekday_num] if weekday_num < 5 else "Weekend"
-            
-            if weekday_num == 0:  # Monday
-                s["factors"].append("Monday — gap risk from weekend news, often sets weekly direction")
-                if abs(change_pct) > 0.5:
-                    s["factors"].append(f"Monday gap {change_pct:+.2f}% — high probability of continuation first 2 hours")
-            elif weekday_num == 1:  # Tuesday (Nifty expiry)
-                if is_expiry:
-                    bullish_points += 3  # Expiry day has built-in edge from gamma
-                    s["factors"].append("Tuesday Nifty expiry — theta decay accelerates, max pain magnet active [+3]")
-            elif weekday_num == 3:  # Thursday (Sensex expiry)
-                if is_expiry:
-                    s["factors"].append("Thursday Sensex expiry — BSE options gamma play possible")
-            elif weekday_num == 4:  # Friday
-                s["factors"].append("Friday — weekend risk, positions may get squared off. Lighter trade sizes.")
-            
-            # Time-of-day edge
-            if 9 <= ist_hour < 10:
-                s["factors"].append("⏰ Pre-10AM: Opening range forming — observe, don't chase gaps")
-            elif 10 <= ist_hour < 12:
-                s["factors"].append("⏰ 10AM-12PM: Prime trend development window — best for directional entries")
-            elif 12 <= ist_hour < 14:
-                s["factors"].append("⏰ 12-2PM: Lunch consolidation — range-bound strategies or wait")
-            elif 14 <= ist_hour < 15:
-                s["factors"].append("⏰ 2-3PM: Power hour — strongest moves, expiry gamma spikes HERE")
-            elif ist_hour >= 15:
-                s["factors"].append("⏰ Post-3PM: Final 30min — avoid new entries, high chop risk")
-            
-            # ── FINAL SCORING ──
-            net = bullish_points - bearish_points
-            s["bullish_score"] = bullish_points
-            s["bearish_score"] = bearish_points
-            s["net_score"] = net
-            
-            if net > 15:
-                s["bias"] = "STRONG BULLISH"
-                s["suggested_bias"] = "Buy CE / Buy Futures"
-            elif net > 5:
-                s["bias"] = "MILD BULLISH"
-                s["suggested_bias"] = "Buy CE (conservative)"
-            elif net < -15:
-                s["bias"] = "STRONG BEARISH"
-                s["suggested_bias"] = "Buy PE / Sell Futures"
-            elif net < -5:
-                s["bias"] = "MILD BEARISH"
-                s["suggested_bias"] = "Buy PE (conservative)"
-            else:
-                s["bias"] = "NEUTRAL"
-                s["suggested_bias"] = "Range play / Straddle / Wait for clarity"
-            
-            s["edge_pct"] = min(50 + int(abs(net) * 0.6), 95)  # Base 50% + scaled factor edge, cap at 95%
-            s["factor_count"] = len([f for f in s["factors"] if "BULL]" in f or "BEAR]" in f])
-            scores[name] = s
-        
-        return scores
-    
-    # Run scoring engine
-    # Need IST time for day-of-week and time scoring
-    from datetime import timedelta as td_alias
-    IST_NOW = datetime.utcnow() + td_alias(hours=5, minutes=30)
-    IST_WEEKDAY = IST_NOW.weekday()
-    IST_HOUR = IST_NOW.hour
+    # Run scoring engine (day-of-week and time scoring use the request's IST_WEEKDAY / IST_HOUR)
     # Quick expiry check for scoring (detailed check happens later for prompt)
     _is_tue = IST_WEEKDAY == 1
     _is_thu = IST_WEEKDAY == 3
@@ -9133,128 +9966,122 @@ async def index_trades(request: Request):
     
     index_scores = compute_index_scores(indices_data, oc_dict, global_data, vix_entry, _quick_expiry, IST_WEEKDAY, IST_HOUR)
     
-    # Build score cards text for the prompt
-    score_text_parts = []
-    for name, sc in index_scores.items():
-        factors_str = "\n    ".join(sc["factors"])
-        score_text_parts.append(f"""
+    # Build score cards text for the prompt — written straight into one buffer, no per-card strings
+    score_buf = io.StringIO()
+    for n_card, (name, sc) in enumerate(index_scores.items()):
+        if n_card:
+            score_buf.write("\n")
+        score_buf.write(f"""
 {name} SCORE CARD:
   BULLISH points: {sc['bullish_score']} | BEARISH points: {sc['bearish_score']} | NET: {sc['net_score']:+d}
   COMPUTED BIAS: {sc['bias']} → Suggested: {sc['suggested_bias']}
   Computed edge: {sc['edge_pct']}% | Active factors: {sc.get('factor_count', 0)}/10
   Factor breakdown:
-    {factors_str}""")
-    
-    score_text = "\n".join(score_text_parts) if score_text_parts else "Scoring unavailable"
-    
-    # Also score stocks — comprehensive multi-factor
-    stock_scores = []
-    for st in stock_data[:10]:
-        bull = 0
-        bear = 0
+    """)
+        for n_factor, (fid, *args) in enumerate(sc["factors"]):
+            if n_factor:
+                score_buf.write("\n    ")
+            score_buf.write(_FACTOR_FMT[fid].format(*args))
+    
+    score_text = score_buf.getvalue() or "Scoring unavailable"
+    
+    # Also score stocks — comprehensive multi-factor, points computed column-wise over all movers at once
+    movers = stock_data[:10]
+    n_movers = len(movers)
+    chg = np.fromiter((st["change_pct"] for st in movers), float, n_movers)
+    vs = np.fromiter((st.get("vol_spike", 1) for st in movers), float, n_movers)
+    px = np.fromiter((st["price"] for st in movers), float, n_movers)
+    high5 = np.fromiter((st["high_5d"] for st in movers), float, n_movers)
+    low5 = np.fromiter((st["low_5d"] for st in movers), float, n_movers)
+    dh = np.fromiter((st.get("day_high", st["price"]) for st in movers), float, n_movers)
+    dl = np.fromiter((st.get("day_low", st["price"]) for st in movers), float, n_movers)
+    up = chg > 0
+    
+    # F1: Momentum (0-15)
+    # Points come from per-tier tables (tier -1 = no signal → trailing 0) and 0/1 masks — no per-stock branching
+    mom_tier = np.select([chg > 2, chg > 0.5, chg < -2, chg < -0.5], [0, 1, 2, 3], -1)
+    bull = np.array([15, 8, 0, 0, 0])[mom_tier]
+    bear = np.array([0, 0, 15, 8, 0])[mom_tier]
+    
+    # F2: Volume spike (0-12) — points go to the side of the move
+    vol_tier = np.select([vs > 2.5, vs > 1.8, vs > 1.3, vs < 0.6], [0, 1, 2, 3], -1)
+    vol_pts = np.array([12, 8, 4, 0, 0])[vol_tier]
+    bull += vol_pts * up
+    bear += vol_pts * ~up
+    
+    # F3: 5D range position (0-10)
+    rng5 = high5 - low5
+    has_rng = rng5 > 0
+    pos = np.divide(px - low5, rng5, out=np.zeros(n_movers), where=has_rng)
+    pos_tier = np.select([has_rng & (pos < 0.2), has_rng & (pos < 0.35), has_rng & (pos > 0.85), has_rng & (pos > 0.7)],
+                         [0, 1, 2, 3], -1)
+    bull += np.array([10, 5, 0, 0, 0])[pos_tier]
+    bear += np.array([0, 0, 8, 3, 0])[pos_tier]
+    
+    # F4: Day candle pattern (0-8)
+    has_day = dh > dl
+    day_pos = np.divide(px - dl, dh - dl, out=np.zeros(n_movers), where=has_day)
+    near_high = has_day & (day_pos > 0.8) & up
+    near_low = has_day & (day_pos < 0.2) & (chg < 0)
+    bull += 6 * near_high
+    bear += 6 * near_low
+    
+    # F5: Alignment with parent index
+    nifty_chg = next((d["change_pct"] for d in indices_data if d["name"] == "NIFTY 50"), 0)
+    aligned = (up & (nifty_chg > 0)) | ((chg < 0) & (nifty_chg < 0))
+    diverging = ~aligned & (np.abs(chg) > 1) & (abs(nifty_chg) > 0.5) & (chg * nifty_chg < 0)
+    bull += 3 * (aligned & up)
+    bear += 3 * (aligned & ~up)
+    
+    net = bull - bear
+    edge = np.minimum(50 + (np.abs(net) * 0.6).astype(int), 95)
+    
+    stock_buf = io.StringIO()
+    for i, st in enumerate(movers):
         factors = []
-        
-        # F1: Momentum (0-15)
-        chg = st["change_pct"]
-        if chg > 2:
-            bull += 15
-            factors.append(f"Strong momentum +{chg:.1f}%")
-        elif chg > 0.5:
-            bull += 8
-            factors.append(f"Positive +{chg:.1f}%")
-        elif chg < -2:
-            bear += 15
-            factors.append(f"Strong sell-off {chg:.1f}%")
-        elif chg < -0.5:
-            bear += 8
-            factors.append(f"Negative {chg:.1f}%")
-        
-        # F2: Volume spike (0-12)
-        vs = st.get("vol_spike", 1)
-        if vs > 2.5:
-            pts = 12
-            if chg > 0: bull += pts
-            else: bear += pts
-            factors.append(f"Vol SPIKE {vs:.1f}x — heavy institutional")
-        elif vs > 1.8:
-            pts = 8
-            if chg > 0: bull += pts
-            else: bear += pts
-            factors.append(f"High volume {vs:.1f}x")
-        elif vs > 1.3:
-            pts = 4
-            if chg > 0: bull += pts
-            else: bear += pts
-            factors.append(f"Above-avg vol {vs:.1f}x")
-        elif vs < 0.6:
-            factors.append(f"Low volume {vs:.1f}x — weak conviction")
-        
-        # F3: 5D range position (0-10)
-        r = st["high_5d"] - st["low_5d"]
-        if r > 0:
-            pos = (st["price"] - st["low_5d"]) / r
-            if pos < 0.2:
-                bull += 10
-                factors.append(f"Near 5D LOW ({pos:.0%}) — bounce zone")
-            elif pos < 0.35:
-                bull += 5
-                factors.append(f"Lower half ({pos:.0%})")
-            elif pos > 0.85:
-                bear += 8
-                factors.append(f"Near 5D HIGH ({pos:.0%}) — resistance")
-            elif pos > 0.7:
-                bear += 3
-                factors.append(f"Upper half ({pos:.0%})")
-        
-        # F4: Day candle pattern (0-8)
-        dh = st.get("day_high", st["price"])
-        dl = st.get("day_low", st["price"])
-        if dh > dl:
-            day_range = dh - dl
-            body = abs(st["price"] - (dh + dl) / 2 * 2 - st["price"])  # simplified
-            day_pos = (st["price"] - dl) / day_range
-            if day_pos > 0.8 and chg > 0:
-                bull += 6
-                factors.append("Closing near high — buyers dominating")
-            elif day_pos < 0.2 and chg < 0:
-                bear += 6
-                factors.append("Closing near low — sellers dominating")
-        
-        # F5: Alignment with parent index
-        nifty_chg = next((d["change_pct"] for d in indices_data if d["name"] == "NIFTY 50"), 0)
-        if (chg > 0 and nifty_chg > 0) or (chg < 0 and nifty_chg < 0):
-            pts = 3
-            if chg > 0: bull += pts
-            else: bear += pts
+        if mom_tier[i] >= 0:
+            factors.append(_STOCK_MOMENTUM_FMT[mom_tier[i]].format(chg[i]))
+        if vol_tier[i] >= 0:
+            factors.append(_STOCK_VOLUME_FMT[vol_tier[i]].format(vs[i]))
+        if pos_tier[i] >= 0:
+            factors.append(_STOCK_RANGE_FMT[pos_tier[i]].format(pos[i]))
+        if near_high[i]:
+            factors.append("Closing near high — buyers dominating")
+        elif near_low[i]:
+            factors.append("Closing near low — sellers dominating")
+        if aligned[i]:
             factors.append(f"Aligned with Nifty ({nifty_chg:+.1f}%)")
-        elif abs(chg) > 1 and abs(nifty_chg) > 0.5 and (chg * nifty_chg < 0):
+        elif diverging[i]:
             factors.append(f"DIVERGING from Nifty — relative strength/weakness")
         
-        net = bull - bear
-        bias = "BULLISH" if net > 12 else "BEARISH" if net < -12 else "MILD BULL" if net > 5 else "MILD BEAR" if net < -5 else "NEUTRAL"
-        edge = min(50 + int(abs(net) * 0.6), 95)
-        stock_scores.append(f"  {st['ticker']}: Bull={bull} Bear={bear} Net={net:+d} Edge={edge}% → {bias} | {', '.join(factors)}")
+        net_i = int(net[i])
+        bias = "BULLISH" if net_i > 12 else "BEARISH" if net_i < -12 else "MILD BULL" if net_i > 5 else "MILD BEAR" if net_i < -5 else "NEUTRAL"
+        if i:
+            stock_buf.write("\n")
+        stock_buf.write(f"  {st['ticker']}: Bull={bull[i]} Bear={bear[i]} Net={net_i:+d} Edge={edge[i]}% → {bias} | {', '.join(factors)}")
     
-    stock_score_text = "\n".join(stock_scores) if stock_scores else "No stock scores"
+    stock_score_text = stock_buf.getvalue() or "No stock scores"
     
-    print(f"📊 Scoring complete: {len(index_scores)} indices, {len(stock_scores)} stocks scored")
+    print(f"📊 Scoring complete: {len(index_scores)} indices, {n_movers} stocks scored")
     
     # Build AI prompt
     _csym = "$" if is_us_trades else "₹"
-    indices_text = "\n".join([
-        f"- {d['name']}: {_csym}{d['price']:,.2f} (Change: {d['change']:+.2f}, {d['change_pct']:+.2f}%) | "
-        f"Day Range: {_csym}{d['day_low']}-{_csym}{d['day_high']} | 5D Range: {_csym}{d['low_5d']}-{_csym}{d['high_5d']} | "
-        f"Open: {_csym}{d['open']} | Volume: {d['volume']:,}"
-        for d in indices_data
-    ])
-    
-    global_text = "\n".join([f"- {g}" for g in global_data]) if global_data else "Global data unavailable"
+    idx_buf = io.StringIO()
+    for i, d in enumerate(indices_data):
+        if i:
+            idx_buf.write("\n")
+        idx_buf.write(
+            f"- {d['name']}: {_csym}{d['price']:,.2f} (Change: {d['change']:+.2f}, {d['change_pct']:+.2f}%) | "
+            f"Day Range: {_csym}{d['day_low']}-{_csym}{d['day_high']} | 5D Range: {_csym}{d['low_5d']}-{_csym}{d['high_5d']} | "
+            f"Open: {_csym}{d['open']} | Volume: {d['volume']:,}")
+    indices_text = idx_buf.getvalue()
+    
+    global_text = "- " + "\n- ".join(global_data) if global_data else "Global data unavailable"
     
     # Use IST (UTC+5:30) for Indian market — CRITICAL for correct expiry day detection
-    IST_OFFSET = timedelta(hours=5, minutes=30)
-    now = datetime.utcnow() + IST_OFFSET
+    now = IST_NOW
     today = now.strftime("%A, %B %d, %Y")
-    weekday = now.weekday()  # 0=Monday, 1=Tuesday, 2=Wednesday, 3=Thursday, 4=Friday
+    weekday = IST_WEEKDAY  # 0=Monday, 1=Tuesday, 2=Wednesday, 3=Thursday, 4=Friday
     day_name = now.strftime("%A")
     print(f"🕐 IST Time: {now.strftime('%Y-%m-%d %H:%M:%S')} ({day_name})")
     
@@ -9270,21 +10097,11 @@ async def index_trades(request: Request):
     #   - Bankex: monthly expiry last Thursday (NO weekly)
     # ═══════════════════════════════════════════════════
     
-    # Check if today is last Tuesday or last Thursday of month
-    import calendar
+    # Check if today is last Tuesday or last Thursday of month (closed form — no day-by-day walk)
     year, month = now.year, now.month
-    last_day = calendar.monthrange(year, month)[1]
-    
-    # Find last Tuesday (weekday=1) of this month
-    last_tuesday = last_day
-    while datetime(year, month, last_tuesday).weekday() != 1:
-        last_tuesday -= 1
+    last_tuesday = _last_weekday_of_month(year, month, 1)
     is_last_tuesday = (now.day == last_tuesday and weekday == 1)
-    
-    # Find last Thursday (weekday=3) of this month
-    last_thursday = last_day
-    while datetime(year, month, last_thursday).weekday() != 3:
-        last_thursday -= 1
+    last_thursday = _last_weekday_of_month(year, month, 3)
     is_last_thursday = (now.day == last_thursday and weekday == 3)
     
     is_tuesday = (weekday == 1)
@@ -9755,21 +10572,12 @@ RULES FOR STOCK OPTIONS (up to 2 trades — 0 if no clear setup):
         if not ANTHROPIC_API_KEY:
             return {"success": False, "error": "AI analysis service is not configured. Please contact support at contact@celesys.ai."}
         
-        response = _http_pool.post(
-            "https://api.anthropic.com/v1/messages",
-            headers={
-                "x-api-key": ANTHROPIC_API_KEY,
-                "anthropic-version": "2023-06-01",
-                "content-type": "application/json"
-            },
-            json={
+        response = await loop.run_in_executor(_thread_pool, lambda: _anthropic_post({
                 "model": "claude-sonnet-4-20250514",
                 "max_tokens": 6000,
                 "temperature": 0.2,
                 "messages": [{"role": "user", "content": prompt}]
-            },
-            timeout=120
-        )
+            }, 120))
         
         if response.status_code != 200:
             error_detail = ""
@@ -9800,7 +10608,7 @@ RULES FOR STOCK OPTIONS (up to 2 trades — 0 if no clear setup):
             "event_alert": result.get("event_alert", {}),
             "gamma_blast": result.get("gamma_blast", {}),
             "vix": next((d for d in indices_data if d['name'] == 'INDIA VIX'), None),
-            "generated_at": (datetime.utcnow() + timedelta(hours=5, minutes=30)).isoformat(),
+            "generated_at": (datetime.utcnow() + IST_OFFSET).isoformat(),
             "expiry_today": expiry_list,
             "is_expiry_day": is_expiry_day,
             "day_name": day_name
@@ -9808,13 +10616,13 @@ RULES FOR STOCK OPTIONS (up to 2 trades — 0 if no clear setup):
         
         # Cache for 30 minutes — next click within window returns same trades
         _rc2 = _trades_cache_us if is_us_trades else _trades_cache
-        _rc2["timestamp"] = datetime.utcnow() + timedelta(hours=5, minutes=30)
+        _rc2["timestamp"] = datetime.utcnow() + IST_OFFSET
         _rc2["data"] = response_data
         print(f"💾 Trades cached at {_trades_cache['timestamp'].strftime('%H:%M IST')} — valid until {(_trades_cache['timestamp'] + timedelta(minutes=30)).strftime('%H:%M IST')}")
         
         # Auto-save to history for validation/backtesting
         try:
-            ist_now = datetime.utcnow() + timedelta(hours=5, minutes=30)
+            ist_now = datetime.utcnow() + IST_OFFSET
             _save_trades_to_history(response_data, ist_now.strftime('%Y-%m-%d'))
         except Exception as he:
             print(f"⚠️ History save skipped: {he}")
@@ -9841,7 +10649,7 @@ RULES FOR STOCK OPTIONS (up to 2 trades — 0 if no clear setup):
             "event_alert": result.get("event_alert", {}),
             "gamma_blast": result.get("gamma_blast", {}),
                 "vix": next((d for d in indices_data if d['name'] == 'INDIA VIX'), None),
-                "generated_at": (datetime.utcnow() + timedelta(hours=5, minutes=30)).isoformat(),
+                "generated_at": (datetime.utcnow() + IST_OFFSET).isoformat(),
                 "expiry_today": expiry_list,
                 "is_expiry_day": is_expiry_day,
                 "day_name": day_name
@@ -9881,594 +10689,701 @@ async def verify_price(company: str):
 async def check_rate_limit_endpoint(request: Request):
     """Check if an email has remaining report quota before submitting."""
     try:
-        data = await request.json()
+        data = orjson.loads(await request.body())
         email = data.get("email", "").strip()
         if not email:
             raise HTTPException(400, "Email required")
-        result = check_rate_limit(email)
-        return result
+        return await asyncio.get_event_loop().run_in_executor(_thread_pool, check_rate_limit, email)
     except HTTPException:
         raise
     except Exception as e:
         return {"allowed": True}  # Fail open - don't block on errors
 
 
-# ═══ FULL REPORT WITH AI ═══
-@app.post("/api/generate-report")
-async def generate_report(request: Request):
-    import time as _time
-    _t0 = _time.time()
+# ═══ SAFE FORMATTER — prevents 'N/A' from crashing float formats ═══
+def _fv(val, fmt=",.2f", prefix="", suffix=""):
+    """Format a value safely. Returns formatted string or 'N/A'."""
+    if val is None or val == 'N/A' or val == '':
+        return 'N/A'
     try:
-        data = await request.json()
-        company = data.get("company_name", "").strip()
-        email = data.get("email", "").strip()
-        
-        if not company or not email:
-            raise HTTPException(400, "company_name and email required")
-        
-        # CHECK RATE LIMIT (inline — no separate API call needed)
-        rate_check = check_rate_limit(email)
-        if not rate_check["allowed"]:
-            return JSONResponse(
-                status_code=429,
-                content=rate_check
-            )
-        
-        # GET LIVE DATA — run in thread pool so other users aren't blocked
-        _t1 = _time.time()
-        loop = asyncio.get_event_loop()
-        live_data = await loop.run_in_executor(_thread_pool, get_live_stock_data, company)
-        _t2 = _time.time()
-        print(f"⏱️ get_live_stock_data: {_t2-_t1:.1f}s")
-        
-        # Check if there was an error
-        if "error" in live_data or not live_data.get("success"):
-            error_msg = live_data.get("error", "Could not fetch market data for this ticker")
-            raise HTTPException(400, error_msg)
-        
-        # ═══ CHECK AI REPORT CACHE — instant for 10K users hitting same stock ═══
-        _cache_key = live_data.get('ticker', company).upper()
-        cached = _get_cached_report(_cache_key)
-        if cached:
-            _elapsed = round(_time.time() - _t0, 1)
-            print(f"⚡ CACHE HIT: {_cache_key} → {_elapsed}s (saved ~30s AI call)")
-            # Still count the rate limit
-            record_request(email)
-            remaining = RATE_LIMIT_MAX_REQUESTS - len([
-                t for t in email_rate_limiter.get(email.lower().strip(), [])
-                if t > datetime.now() - timedelta(minutes=RATE_LIMIT_WINDOW_MINUTES)
-            ])
-            # Return cached report with fresh rate limit info
-            cached_resp = dict(cached)  # copy
-            cached_resp["rate_limit"] = {"remaining": max(0, remaining)}
-            cached_resp["cached"] = True
-            cached_resp["elapsed"] = _elapsed
-            report_counter["count"] += 1
-            save_counter()
-            cached_resp["report_number"] = report_counter["count"]
-            return cached_resp
-        
-        # Format live data section
-        currency_symbol = '₹' if live_data['currency'] == 'INR' else '$'
-        price_arrow = '🔴 ↓' if isinstance(live_data.get('price_change'), (int, float)) and live_data['price_change'] < 0 else '🟢 ↑'
-        
-        # ═══ SAFE FORMATTER — prevents 'N/A' from crashing float formats ═══
-        def _fv(val, fmt=",.2f", prefix="", suffix=""):
-            """Format a value safely. Returns formatted string or 'N/A'."""
-            if val is None or val == 'N/A' or val == '':
-                return 'N/A'
-            try:
-                v = float(str(val).replace(',', ''))
-                return f"{prefix}{format(v, fmt)}{suffix}"
-            except (ValueError, TypeError):
-                return str(val)
-        
-        def _safe_div(a, b):
-            """Safe division — handles N/A, None, zero."""
-            try:
-                a, b = float(a if a and a != 'N/A' else 0), float(b if b and b != 'N/A' else 1)
-                return a / b if b != 0 else 0
-            except:
-                return 0
-        
-        # Pre-format all values that use :,.2f or :, formatting
-        _f_price = _fv(live_data.get('current_price', 0), ",.2f", currency_symbol)
-        _f_chg = _fv(abs(live_data.get('price_change', 0)) if isinstance(live_data.get('price_change'), (int, float)) else 0, ".2f", currency_symbol)
-        _f_chg_pct = _fv(live_data.get('price_change_pct', 0), "+.2f", "", "%")
-        _f_w52h = _fv(live_data.get('week52_high'), ",.2f", currency_symbol)
-        _f_w52l = _fv(live_data.get('week52_low'), ",.2f", currency_symbol)
-        _f_mcap = _fv(live_data.get('market_cap'), ",.0f", currency_symbol)
-        
-        live_data_section = f"""
-╔═══════════════════════════════════════════════════════════════╗
-║  🔴 REAL-TIME MARKET DATA                                     ║
-║  Data as of: {live_data['data_timestamp']}       ║
-╚═══════════════════════════════════════════════════════════════╝
+        v = float(str(val).replace(',', ''))
+        return f"{prefix}{format(v, fmt)}{suffix}"
+    except (ValueError, TypeError):
+        return str(val)
+
+def _num(v):
+    """Metric → float, 0 for 'N/A'/None/garbage. Numeric values (the common case) skip the try."""
+    if isinstance(v, (int, float)):
+        return float(v)
+    try:
+        f = float(v)
+        return f if v != 'N/A' else 0
+    except:
+        return 0
 
-CURRENT MARKET SNAPSHOT:
-• Ticker: {live_data['ticker']}
-• Company: {live_data['company_name']}
-• Current Price: {_f_price}
-• Change Today: {price_arrow} {_f_chg} ({_f_chg_pct})
+def _safe_div(a, b):
+    """Safe division — handles N/A, None, zero."""
+    try:
+        a, b = float(a if a and a != 'N/A' else 0), float(b if b and b != 'N/A' else 1)
+        return a / b if b != 0 else 0
+    except:
+        return 0
+
+
+def _report_format_ctx(live_data: dict) -> tuple:
+    """Fields shared by the live-data section, computed context and prompt — formatted once.
+    Returns (currency_symbol, price_arrow, price, change, change_pct, w52_high, w52_low, mcap, ema_signals)."""
+    currency_symbol = '₹' if live_data['currency'] == 'INR' else '$'
+    chg = live_data.get('price_change')
+    chg_is_num = isinstance(chg, (int, float))
+    price_arrow = '🔴 ↓' if chg_is_num and chg < 0 else '🟢 ↑'
+    # Pre-format all values that use :,.2f or :, formatting
+    return (
+        currency_symbol,
+        price_arrow,
+        _fv(live_data.get('current_price', 0), ",.2f", currency_symbol),
+        _fv(abs(chg) if chg_is_num else 0, ".2f", currency_symbol),
+        _fv(live_data.get('price_change_pct', 0), "+.2f", "", "%"),
+        _fv(live_data.get('week52_high'), ",.2f", currency_symbol),
+        _fv(live_data.get('week52_low'), ",.2f", currency_symbol),
+        _fv(live_data.get('market_cap'), ",.0f", currency_symbol),
+        ', '.join(live_data['ema_signals']) if live_data.get('ema_signals') else 'N/A',
+    )
 
-VALUATION METRICS (CURRENT):
-• P/E Ratio (Trailing): {live_data['pe_ratio']}
-• P/E Ratio (Forward): {live_data.get('forward_pe', 'N/A')}
-• P/B Ratio: {live_data['pb_ratio']}
-• PEG Ratio: {live_data.get('peg_ratio', 'N/A')}
-• EV/EBITDA: {live_data.get('enterprise_to_ebitda', 'N/A')}
-• Dividend Yield: {live_data['dividend_yield']}%
-• Payout Ratio: {live_data.get('payout_ratio', 'N/A')}%
-• Sector Avg P/E: {live_data.get('sector_avg_pe', 'N/A')}x
-• Peer Avg P/E: {live_data.get('peer_avg_pe', 'N/A')}x
-• Peers Analyzed: {', '.join([p['ticker']+' (PE:'+str(p['pe'])+'x)' for p in live_data.get('peers',[])][:5]) or 'N/A'}
-• 52-Week High: {_f_w52h}
-• 52-Week Low: {_f_w52l}
-• Market Cap: {_f_mcap}
 
-PROFITABILITY & EFFICIENCY:
-• Gross Margins: {live_data.get('gross_margins', 'N/A')}%
-• Operating Margin: {live_data['operating_margin']}%
-• Profit Margin: {live_data['profit_margin']}%
-• EBITDA Margins: {live_data.get('ebitda_margins', 'N/A')}%
-• ROE: {live_data['roe']}%
-• Revenue Per Share: {live_data.get('revenue_per_share', 'N/A')}
+# ═══ STOCK VERDICT REASONS — _stock_verdict records (id, *args), rendered after scoring ═══
+_VERDICT_FMT = {
+    1: "Deep value P/E {:.1f}x [+18]",
+    2: "Value P/E {:.1f}x [+12]",
+    3: "Fair P/E {:.1f}x [+4]",
+    4: "Expensive P/E {:.1f}x [-6]",
+    5: "Very expensive P/E {:.1f}x [-14]",
+    6: "Forward P/E discount — earnings growth [+5]",
+    7: "Forward P/E premium — earnings may decline [-3]",
+    8: "Excellent margins {:.1f}% [+12]",
+    9: "Solid margins {:.1f}% [+6]",
+    10: "Thin margins {:.1f}% [+2]",
+    11: "Unprofitable {:.1f}% [-10]",
+    12: "Strong ROE {:.1f}% [+8]",
+    13: "Decent ROE {:.1f}% [+4]",
+    14: "Weak ROE {:.1f}% [-3]",
+    15: "Low debt D/E {:.0f} [+10]",
+    16: "Moderate debt D/E {:.0f} [+5]",
+    17: "Elevated debt D/E {:.0f} [-3]",
+    18: "High leverage D/E {:.0f} [-10]",
+    19: "Strong liquidity CR {:.1f} [+4]",
+    20: "Liquidity risk CR {:.1f} [-6]",
+    21: "Near 52W low ({:.0%} of range) [+8]",
+    22: "Lower half of 52W range [+4]",
+    23: "Near 52W high ({:.0%}) [-4]",
+    24: "Upper range, momentum intact [+2]",
+    25: "Below book P/B {:.1f} [+8]",
+    26: "Reasonable P/B {:.1f} [+3]",
+    27: "Extreme P/B {:.1f} [-5]",
+    28: "High yield {:.1f}% [+5]",
+    29: "Decent yield {:.1f}% [+3]",
+    30: "High volatility Beta {:.2f} [-5]",
+    31: "Above-avg vol Beta {:.2f} [-2]",
+    32: "Defensive Beta {:.2f} [+3]",
+    33: "High operating efficiency [+5]",
+    34: "Weak operating margins [-3]",
+    35: "Hypergrowth earnings velocity {:.0f}% CAGR [+12]",
+    36: "Strong growth trajectory {:.0f}% [+7]",
+    37: "Moderate growth {:.0f}% [+3]",
+    38: "Severe earnings decline {:.0f}% [-8]",
+    39: "Earnings contracting {:.0f}% [-4]",
+    40: "Revenue + EPS both growing — quality momentum [+3]",
+    41: "Revenue + EPS both declining — deterioration [-3]",
+    42: "P/E {:.0f}% below sector avg ({:.0f}x) [+8]",
+    43: "P/E {:.0f}% below sector — undervalued [+4]",
+    44: "P/E {:.0f}% above sector — expensive vs peers [-6]",
+    45: "P/E premium over sector [-2]",
+    46: "Technical: {} [+{}]",
+    47: "Technical: {} [-{}]",
+    48: "PEG bargain ({:.1f}) — growth underpriced [+7]",
+    49: "PEG fair ({:.1f}) [+3]",
+    50: "PEG stretched ({:.1f}) — overpaying for growth [-5]",
+    51: "PEG slightly high ({:.1f}) [-2]",
+    52: "Excellent FCF margin {:.1f}% — cash machine [+7]",
+    53: "Healthy FCF {:.1f}% of revenue [+4]",
+    54: "Negative FCF despite positive OCF — heavy capex [-2]",
+    55: "Negative cash flows — burning cash [-7]",
+    56: "OCF covers {:.0f}% of debt [+2]",
+    57: "Cash barely covers debt [-2]",
+    58: "Net cash — cash exceeds debt by {:.0f}% [+6]",
+    59: "Adequate cash — {:.0f}% of debt covered [+3]",
+    60: "Cash crunch — only {:.0f}% of debt covered [-5]",
+    61: "Debt-free with cash on books [+4]",
+    62: "Strong quick ratio {:.1f} — meets short-term obligations [+2]",
+    63: "Weak quick ratio {:.1f} — solvency risk [-3]",
+    64: "Cheap EV/EBITDA {:.1f}x — potential takeover value [+7]",
+    65: "Reasonable EV/EBITDA {:.1f}x [+4]",
+    66: "Fair EV/EBITDA {:.1f}x [+1]",
+    67: "Very expensive EV/EBITDA {:.1f}x [-5]",
+    68: "Elevated EV/EBITDA {:.1f}x [-2]",
+    69: "Elite gross margins {:.0f}% — strong moat [+6]",
+    70: "Healthy gross margins {:.0f}% [+3]",
+    71: "Low gross margins {:.0f}% — weak pricing power [-4]",
+    72: "Quarterly earnings surging +{:.0f}% YoY [+7]",
+    73: "Strong quarterly growth +{:.0f}% [+4]",
+    74: "Moderate quarterly growth +{:.0f}% [+2]",
+    75: "Quarterly earnings plunging {:.0f}% [-6]",
+    76: "Quarterly decline {:.0f}% [-3]",
+    77: "Strong EBITDA margins {:.0f}% — operational excellence [+4]",
+    78: "Healthy EBITDA margins {:.0f}% [+2]",
+    79: "Thin EBITDA margins {:.0f}% [-3]",
+    80: "Very high short interest ({:.1f} days) — bearish sentiment [-4]",
+    81: "Elevated short interest ({:.1f} days) [-2]",
+    82: "Low short interest ({:.1f} days) — bullish sentiment [+2]",
+    83: "Sustainable dividend — low payout {:.0f}% with {:.1f}% yield [+4]",
+    84: "Unsustainable payout ratio {:.0f}% — dividend at risk [-3]",
+    85: "High payout ratio {:.0f}% — limited dividend growth [-1]",
+    86: "Growth + profitability combo — rare quality [+3]",
+    87: "Declining growth + weak margins — avoid [-3]",
+    88: "VALUE TRAP: cheap P/E but shrinking earnings + thin margins [-6]",
+    89: "GROWTH TRAP: premium valuation but growth stalling [-5]",
+    90: "Triple Strength: fair value + profitable + strong ROE [+4]",
+    91: "Triple Weakness: overvalued + weak margins [-4]",
+}
+_VERDICT_BULLISH = frozenset(rid for rid, fmt in _VERDICT_FMT.items() if "[+" in fmt)
+_VERDICT_BEARISH = frozenset(rid for rid, fmt in _VERDICT_FMT.items() if "[-" in fmt)
+
+# Prompt factor list — (group, ((label, description), ...)). Only factors with a fired reason are sent.
+# Labels follow the prompt's own F-numbering, which predates (and differs from) the code comments.
+_VERDICT_FACTOR_DOC = (
+    ("VALUATION FACTORS:", (
+        ("F1", "P/E Ratio Valuation (±20) — cheap vs expensive vs sector avg"),
+        ("F2", "P/B Ratio (±8) — book value premium/discount"),
+        ("F5", "Forward PE vs Trailing PE (±5) — earnings trajectory signal"),
+        ("F10", "Relative Valuation vs Sector P/E (±10) — peer comparison"),
+        ("F12", "PEG Ratio (±8) — growth at reasonable price"),
+        ("F15", "EV/EBITDA (±8) — enterprise value vs cash generation"),
+    )),
+    ("PROFITABILITY FACTORS:", (
+        ("F3", "Profit Margin Quality (±15) — net margin strength"),
+        ("F8", "Operating Efficiency (±5) — ROE & operating margin"),
+        ("F16", "Gross Margin Power (±7) — pricing power & moat"),
+        ("F18", "EBITDA Margin Quality (±5) — operational cash generation"),
+    )),
+    ("FINANCIAL HEALTH FACTORS:", (
+        ("F4", "Financial Health/Debt (±12) — debt-to-equity & current ratio"),
+        ("F13", "Free Cash Flow Quality (±10) — FCF yield & health"),
+        ("F14", "Balance Sheet Verification (±10) — cash vs debt coverage"),
+        ("F20", "Dividend Sustainability (±5) — payout ratio safety"),
+    )),
+    ("MOMENTUM & POSITION FACTORS:", (
+        ("F6", "52-Week Position (±10) — price range positioning"),
+        ("F7", "Beta/Risk (±5) — volatility assessment"),
+        ("F9", "Earnings Velocity (±15) — EPS & revenue CAGR"),
+        ("F11", "Technical Momentum (±12) — SMA/EMA crossovers"),
+        ("F17", "Quarterly Earnings Momentum (±8) — surprise & beat trends"),
+        ("F19", "Short Interest Signal (±5) — bearish bet indicator"),
+    )),
+)
+# Reason id → prompt factor label (combo bonuses 86-91 have none)
+_VERDICT_REASON_FACTOR = {rid: label for label, first, last in (
+    ("F1", 1, 5), ("F5", 6, 7), ("F3", 8, 11), ("F8", 12, 14), ("F4", 15, 20), ("F6", 21, 24),
+    ("F2", 25, 27), ("F20", 28, 29), ("F7", 30, 32), ("F8", 33, 34), ("F9", 35, 41), ("F10", 42, 45),
+    ("F11", 46, 47), ("F12", 48, 51), ("F13", 52, 57), ("F14", 58, 63), ("F15", 64, 68), ("F16", 69, 71),
+    ("F17", 72, 76), ("F18", 77, 79), ("F19", 80, 82), ("F20", 83, 85),
+) for rid in range(first, last + 1)}
+
+def _verdict_factor_block(fired) -> str:
+    """Prompt factor list limited to the fired labels — the full list when nothing fired."""
+    lines = []
+    for group, rows in _VERDICT_FACTOR_DOC:
+        picked = [f"  {label}: {desc}" for label, desc in rows if not fired or label in fired]
+        if picked:
+            lines.append(group)
+            lines.extend(picked)
+            lines.append("")
+    return "\n".join(lines)
+
+# ═══ SINGLE-METRIC FACTOR BANDS — one row per band, scored by one loop in _stock_verdict ═══
+# (metric, guard, bisect, bins, tiers): tier = tiers[bisect(bins, value)] → (points, reason id) or None.
+# bisect_right for "value < bound" bands, bisect_left for "value > bound" bands — factors with
+# both get one row per side, at most one fires. guard "pos" = value > 0, "nz" = nonzero; NaN never scores.
+# Tune thresholds here; multi-metric factors (forward P/E, sector P/E, SMAs, cash flow, combos) stay in code.
+_VERDICT_BANDS = (
+    # F1: VALUATION
+    ("pe_ratio", "pos", bisect_right, (10, 15, 22, 35), ((18, 1), (12, 2), (4, 3), (-6, 4), (-14, 5))),
+    # F2: PROFITABILITY
+    ("profit_margin", "nz", bisect_left, (0, 10, 20), ((-10, 11), (2, 10), (6, 9), (12, 8))),
+    ("roe", "pos", bisect_left, (12, 20), (None, (4, 13), (8, 12))),
+    ("roe", "pos", bisect_right, (5,), ((-3, 14), None)),
+    # F3: FINANCIAL HEALTH
+    ("debt_to_equity", "pos", bisect_right, (30, 80, 150), ((10, 15), (5, 16), (-3, 17), (-10, 18))),
+    ("current_ratio", "pos", bisect_left, (2,), (None, (4, 19))),
+    ("current_ratio", "pos", bisect_right, (1,), ((-6, 20), None)),
+    # F5: P/B
+    ("pb_ratio", "pos", bisect_right, (1, 2.5), ((8, 25), (3, 26), None)),
+    ("pb_ratio", "pos", bisect_left, (8,), (None, (-5, 27))),
+    # F6: DIVIDEND
+    ("dividend_yield", "", bisect_left, (2, 4), (None, (3, 29), (5, 28))),
+    # F7: BETA/RISK
+    ("beta", "pos", bisect_left, (1.5, 2), (None, (-2, 31), (-5, 30))),
+    ("beta", "pos", bisect_right, (0.7,), ((3, 32), None)),
+    # F8: OPERATING EFFICIENCY
+    ("operating_margin", "pos", bisect_left, (20,), (None, (5, 33))),
+    ("operating_margin", "pos", bisect_right, (5,), ((-3, 34), None)),
+    # F9: EARNINGS VELOCITY (blended EPS + revenue growth)
+    ("combined_growth", "nz", bisect_left, (-15, -5, 5, 15, 30), ((-8, 38), (-4, 39), None, (3, 37), (7, 36), (12, 35))),
+    # F12: PEG RATIO
+    ("peg_ratio", "pos", bisect_right, (0.8, 1.2), ((7, 48), (3, 49), None)),
+    ("peg_ratio", "pos", bisect_left, (1.8, 2.5), (None, (-2, 51), (-5, 50))),
+    # F14: QUICK RATIO
+    ("quick_ratio", "pos", bisect_left, (1.5,), (None, (2, 62))),
+    ("quick_ratio", "pos", bisect_right, (0.5,), ((-3, 63), None)),
+    # F15: EV/EBITDA
+    ("enterprise_to_ebitda", "pos", bisect_right, (6, 10, 16), ((7, 64), (4, 65), (1, 66), None)),
+    ("enterprise_to_ebitda", "pos", bisect_left, (18, 25), (None, (-2, 68), (-5, 67))),
+    # F16: GROSS MARGIN POWER
+    ("gross_margins", "pos", bisect_left, (40, 60), (None, (3, 70), (6, 69))),
+    ("gross_margins", "pos", bisect_right, (20,), ((-4, 71), None)),
+    # F17: QUARTERLY EARNINGS MOMENTUM
+    ("earnings_quarterly_growth", "nz", bisect_left, (5, 15, 30), (None, (2, 74), (4, 73), (7, 72))),
+    ("earnings_quarterly_growth", "nz", bisect_right, (-20, -5), ((-6, 75), (-3, 76), None)),
+    # F18: EBITDA MARGIN QUALITY
+    ("ebitda_margins", "pos", bisect_left, (15, 30), (None, (2, 78), (4, 77))),
+    ("ebitda_margins", "pos", bisect_right, (5,), ((-3, 79), None)),
+    # F19: SHORT INTEREST SIGNAL
+    ("short_ratio", "pos", bisect_left, (5, 10), (None, (-2, 81), (-4, 80))),
+    ("short_ratio", "pos", bisect_right, (1.5,), ((2, 82), None)),
+)
+# F4: 52-WEEK POSITION (0-1 of range) — moves with every tick, never cached
+_VERDICT_PRICE_BANDS = (
+    ("week52_position", "", bisect_right, (0.2, 0.35), ((8, 21), (4, 22), None)),
+    ("week52_position", "", bisect_left, (0.75, 0.9), (None, (2, 24), (-4, 23))),
+)
 
-BALANCE SHEET & CASH POSITION:
-• Total Cash: {live_data.get('total_cash', 'N/A')}
-• Total Debt: {live_data.get('total_debt', 'N/A')}
-• Debt/Equity: {live_data['debt_to_equity']}
-• Current Ratio: {live_data['current_ratio']}
-• Quick Ratio: {live_data.get('quick_ratio', 'N/A')}
-• Book Value/Share: {live_data['book_value']}
-• Free Cash Flow: {live_data.get('free_cash_flow', 'N/A')}
-• Operating Cash Flow: {live_data.get('operating_cash_flow', 'N/A')}
-• EBITDA: {live_data.get('ebitda', 'N/A')}
+# ═══ STATIC VERDICT CACHE — fundamentals-driven factors, per ticker per IST trading day ═══
+# Key: "TICKER:date" → (fingerprint of _VERDICT_STATIC_FIELDS, score, records).
+# Intraday only price/SMA/EMA move, so repeat calls rescore just F4 + F11 on top of the cached part;
+# a changed fundamental (different fingerprint) recomputes everything.
+_VERDICT_STATIC_FIELDS = (
+    'pe_ratio', 'forward_pe', 'pb_ratio', 'dividend_yield', 'profit_margin', 'operating_margin',
+    'roe', 'debt_to_equity', 'current_ratio', 'beta', 'revenue_growth', 'eps_growth_pct',
+    'earnings_growth', 'sector_avg_pe', 'peg_ratio', 'enterprise_to_ebitda', 'free_cash_flow',
+    'operating_cash_flow', 'total_cash', 'total_debt', 'total_revenue', 'quick_ratio',
+    'gross_margins', 'ebitda_margins', 'earnings_quarterly_growth', 'short_ratio', 'payout_ratio',
+)
+# Per-ticker LRU of fundamentals scoring — report handlers run on _thread_pool, so every access holds the lock
+_verdict_static_cache = OrderedDict()
+_verdict_static_lock = threading.Lock()
+_VERDICT_STATIC_MAX = 500
+
+@dataclass(slots=True, frozen=True)
+class VerdictInputs:
+    """Every live_data metric the verdict reads, coerced to float once ('N/A'/None/missing → 0).
+    Slots keep it a packed record of plain floats; live_data itself stays the JSON payload dict."""
+    pe_ratio: float
+    forward_pe: float
+    pb_ratio: float
+    dividend_yield: float
+    profit_margin: float
+    operating_margin: float
+    roe: float
+    debt_to_equity: float
+    current_ratio: float
+    beta: float
+    revenue_growth: float
+    eps_growth_pct: float
+    earnings_growth: float
+    sector_avg_pe: float
+    peg_ratio: float
+    enterprise_to_ebitda: float
+    free_cash_flow: float
+    operating_cash_flow: float
+    total_cash: float
+    total_debt: float
+    total_revenue: float
+    quick_ratio: float
+    gross_margins: float
+    ebitda_margins: float
+    earnings_quarterly_growth: float
+    short_ratio: float
+    payout_ratio: float
+    current_price: float
+    week52_high: float
+    week52_low: float
+    sma_20: float
+    sma_50: float
+    sma_200: float
+    ema_9: float
+    ema_21: float
+    ema_50: float
+
+    @classmethod
+    def from_live_data(cls, live_data: dict) -> "VerdictInputs":
+        get = live_data.get
+        return cls(*[_num(get(name)) for name in _VERDICT_INPUT_FIELDS])
+
+_VERDICT_INPUT_FIELDS = tuple(f.name for f in fields(VerdictInputs))
+
+def _verdict_cache_key(ticker):
+    """Static verdict cache key — ticker bucketed by IST trading day."""
+    return f"{ticker.upper()}:{(datetime.utcnow() + IST_OFFSET).date().isoformat()}"
+
+def _score_bands(bands, metrics, add_reason) -> int:
+    """Score (metric, guard, bisect, bins, tiers) rows against metrics; returns points added."""
+    score = 0
+    for key, guard, bisect_fn, bins, tiers in bands:
+        v = metrics[key]
+        if v != v or (guard == "pos" and v <= 0) or (guard == "nz" and not v):
+            continue
+        tier = tiers[bisect_fn(bins, v)]
+        if tier: score += tier[0]; add_reason((tier[1], v))
+    return score
+
+def _verdict_static(vi: VerdictInputs) -> tuple:
+    """Price-independent part of the verdict (everything but F4 + F11). Returns (score, records).
+
+    Single-metric factors are scored from _VERDICT_BANDS, the rest inline; both only record (id, *args)."""
+    v_score = 0
+    v_records = []
+    add_reason = v_records.append
+    v_pe = vi.pe_ratio
+    v_fpe = vi.forward_pe
+    v_pb = vi.pb_ratio
+    v_dy = vi.dividend_yield
+    v_pm = vi.profit_margin
+    v_om = vi.operating_margin
+    v_roe = vi.roe
+    v_de = vi.debt_to_equity
+    v_cr = vi.current_ratio
+    v_beta = vi.beta
+
+    # F1: FORWARD P/E (±5)
+    if v_fpe > 0 and v_pe > 0 and v_fpe < v_pe * 0.85:
+        v_score += 5; add_reason((6,))
+    elif v_fpe > 0 and v_pe > 0 and v_fpe > v_pe * 1.1:
+        v_score -= 3; add_reason((7,))
+
+    # ═══ NEW FACTORS F9-F20 — Deep multi-factor analysis ═══
+    v_revG = vi.revenue_growth
+    v_epsG = vi.eps_growth_pct
+    v_earnG = vi.earnings_growth
+    v_sectorPE = vi.sector_avg_pe or 20
+    v_peg = vi.peg_ratio
+    v_evEbitda = vi.enterprise_to_ebitda
+    v_fcf = vi.free_cash_flow
+    v_ocf = vi.operating_cash_flow
+    v_totalCash = vi.total_cash
+    v_totalDebt = vi.total_debt
+    v_totalRev = vi.total_revenue
+    v_qr = vi.quick_ratio
+    v_gm = vi.gross_margins
+    v_ebitdaM = vi.ebitda_margins
+    v_eqg = vi.earnings_quarterly_growth
+    v_shortR = vi.short_ratio
+    v_payout = vi.payout_ratio
+
+    # F9 input: EPS + revenue growth blend (banded below)
+    v_bestEG = v_epsG or v_earnG
+    v_combG = (v_bestEG * 0.6 + v_revG * 0.4) if (v_bestEG and v_revG) else (v_bestEG or v_revG)
+
+    # F1-F3, F5-F9, F12, F14-F19: banded single-metric factors
+    v_metrics = {
+        "pe_ratio": v_pe, "profit_margin": v_pm, "roe": v_roe, "debt_to_equity": v_de,
+        "current_ratio": v_cr, "pb_ratio": v_pb, "dividend_yield": v_dy,
+        "beta": v_beta, "operating_margin": v_om, "combined_growth": v_combG, "peg_ratio": v_peg,
+        "quick_ratio": v_qr, "enterprise_to_ebitda": v_evEbitda, "gross_margins": v_gm,
+        "earnings_quarterly_growth": v_eqg, "ebitda_margins": v_ebitdaM, "short_ratio": v_shortR,
+    }
+    v_score += _score_bands(_VERDICT_BANDS, v_metrics, add_reason)
+
+    # F9: growth agreement bonus
+    if v_bestEG > 10 and v_revG > 10:
+        v_score += 3; add_reason((40,))
+    elif v_bestEG < -5 and v_revG < -5:
+        v_score -= 3; add_reason((41,))
+
+    # F10: RELATIVE VALUATION — P/E vs Sector (±10)
+    if v_pe > 0 and v_sectorPE > 0:
+        peR = v_pe / v_sectorPE
+        disc = abs((v_sectorPE - v_pe) / v_sectorPE * 100)
+        if peR < 0.6: v_score += 8; add_reason((42, disc, v_sectorPE))
+        elif peR < 0.85: v_score += 4; add_reason((43, disc))
+        elif peR > 1.5: v_score -= 6; add_reason((44, disc))
+        elif peR > 1.2: v_score -= 2; add_reason((45,))
+
+    # F13: CASH FLOW QUALITY — FCF health (±10)
+    if v_fcf > 0 and v_totalRev > 0:
+        fcfM = (v_fcf / v_totalRev) * 100
+        if fcfM > 15: v_score += 7; add_reason((52, fcfM))
+        elif fcfM > 5: v_score += 4; add_reason((53, fcfM))
+    elif v_fcf < 0 and v_ocf > 0:
+        v_score -= 2; add_reason((54,))
+    elif v_fcf < 0 and v_ocf <= 0:
+        v_score -= 7; add_reason((55,))
+    if v_ocf > 0 and v_totalDebt > 0:
+        dc = v_ocf / v_totalDebt
+        if dc > 0.5: v_score += 2; add_reason((56, dc*100))
+        elif dc < 0.1: v_score -= 2; add_reason((57,))
+
+    # F14: BALANCE SHEET VERIFICATION — Cash vs Debt (±10)
+    if v_totalCash > 0 and v_totalDebt > 0:
+        cdr = v_totalCash / v_totalDebt
+        if cdr > 1.5: v_score += 6; add_reason((58, (cdr-1)*100))
+        elif cdr > 0.7: v_score += 3; add_reason((59, cdr*100))
+        elif cdr < 0.15: v_score -= 5; add_reason((60, cdr*100))
+    elif v_totalCash > 0 and v_totalDebt == 0:
+        v_score += 4; add_reason((61,))
+
+    # F20: DIVIDEND SUSTAINABILITY (±5)
+    if v_dy > 0 and v_payout > 0:
+        if v_payout < 40 and v_dy > 2: v_score += 4; add_reason((83, v_payout, v_dy))
+        elif v_payout > 90: v_score -= 3; add_reason((84, v_payout))
+        elif v_payout > 70: v_score -= 1; add_reason((85, v_payout))
+
+    # QUALITY COMBO BONUSES (±8)
+    if v_combG and v_combG > 15 and v_pm > 15:
+        v_score += 3; add_reason((86,))
+    if v_combG and v_combG < 0 and v_pm < 5:
+        v_score -= 3; add_reason((87,))
+    # VALUE TRAP: cheap but deteriorating
+    if v_pe > 0 and v_pe < 15 and v_combG and v_combG < -5 and v_pm < 8:
+        v_score -= 6; add_reason((88,))
+    # GROWTH TRAP: expensive + growth stalling
+    if v_pe > 30 and v_combG and v_combG < 5 and v_fpe > 0 and v_fpe > v_pe * 0.9:
+        v_score -= 5; add_reason((89,))
+    # TRIPLE STRENGTH
+    if v_pe > 0 and v_pe < 20 and v_pm > 15 and v_roe > 15:
+        v_score += 4; add_reason((90,))
+    # TRIPLE WEAKNESS
+    if v_pe > 35 and v_pm < 5:
+        v_score -= 4; add_reason((91,))
+
+    return v_score, v_records
+
+def _stock_verdict(live_data: dict, cache_key: str = None) -> tuple:
+    """Deterministic 20-factor stock verdict. Returns (score, reasons, verdict, emoji, conviction, factors),
+    factors being the prompt labels (_VERDICT_FACTOR_DOC) that produced at least one reason.
+
+    The fundamentals part comes from _verdict_static — reused from _verdict_static_cache while
+    cache_key's fingerprint matches — and F4 + F11 are rescored from the current price.
+    Records are put back in reason-id order and rendered from _VERDICT_FMT once."""
+    get = live_data.get
+    vi = VerdictInputs.from_live_data(live_data)
+    fingerprint = tuple(map(get, _VERDICT_STATIC_FIELDS))
+    hit = None
+    if cache_key:
+        with _verdict_static_lock:
+            hit = _verdict_static_cache.get(cache_key)
+            if hit:
+                _verdict_static_cache.move_to_end(cache_key)
+    if hit and hit[0] == fingerprint:
+        v_score, v_records = hit[1], list(hit[2])
+    else:
+        v_score, v_records = _verdict_static(vi)
+        if cache_key:
+            with _verdict_static_lock:
+                _verdict_static_cache[cache_key] = (fingerprint, v_score, tuple(v_records))
+                _verdict_static_cache.move_to_end(cache_key)
+                while len(_verdict_static_cache) > _VERDICT_STATIC_MAX:
+                    _verdict_static_cache.popitem(last=False)
+    add_reason = v_records.append
+    v_price = vi.current_price
+    v_hi = vi.week52_high
+    v_lo = vi.week52_low
+    v_w52 = (v_price - v_lo) / (v_hi - v_lo) if v_hi > v_lo else 0.5
+    v_sma20 = vi.sma_20
+    v_sma50 = vi.sma_50
+    v_sma200 = vi.sma_200
+
+    # F4: 52-WEEK POSITION (±10)
+    v_score += _score_bands(_VERDICT_PRICE_BANDS, {"week52_position": v_w52}, add_reason)
+
+    # F11: TECHNICAL MOMENTUM — SMA crossovers (±12)
+    tS = 0; tD = []
+    if v_sma20 > 0:
+        if v_price > v_sma20: tS += 2; tD.append("Above SMA20")
+        else: tS -= 2; tD.append("Below SMA20")
+    if v_sma200 > 0:
+        if v_price > v_sma200: tS += 3; tD.append("Above SMA200 uptrend")
+        else: tS -= 3; tD.append("Below SMA200 downtrend")
+    if v_sma20 > 0 and v_sma200 > 0:
+        if v_sma20 > v_sma200: tS += 2; tD.append("Golden Cross")
+        elif v_sma20 < v_sma200 * 0.95: tS -= 2; tD.append("Death Cross")
+    if v_sma50 > 0 and v_sma200 > 0 and v_price > v_sma50 and v_price > v_sma200:
+        tS += 2; tD.append("All MAs bullish")
+    # EMA crossover analysis
+    v_ema9 = vi.ema_9
+    v_ema21 = vi.ema_21
+    v_ema50 = vi.ema_50
+    if v_ema9 > 0 and v_ema21 > 0:
+        if v_ema9 > v_ema21: tS += 1; tD.append("EMA9>21 bullish")
+        else: tS -= 1; tD.append("EMA9<21 bearish")
+    if v_ema21 > 0 and v_ema50 > 0:
+        if v_ema21 > v_ema50: tS += 1; tD.append("EMA21>50 uptrend")
+        else: tS -= 1; tD.append("EMA21<50 downtrend")
+    tS = max(-8, min(8, tS))
+    if tD:
+        v_score += tS
+        if tS >= 0: add_reason((46, ', '.join(tD[:3]), tS))
+        else: add_reason((47, ', '.join(tD[:3]), -tS))
+
+    # Render reasons and tally bullish/bearish in the same single pass
+    v_records.sort()  # ids follow factor order, so this restores the F1 → F20 reading order
+    v_reasons = []
+    v_factors = set()
+    v_bullish = v_bearish = 0
+    for rid, *args in v_records:
+        # Signals that cancel out still count as a (bullish) factor for the tiers below, but the
+        # neutral "Technical: ... [+0]" line says nothing — keep it out of the rendered reasons
+        if not (rid == 46 and args[-1] == 0):
+            v_reasons.append(_VERDICT_FMT[rid].format(*args))
+        if rid in _VERDICT_REASON_FACTOR: v_factors.add(_VERDICT_REASON_FACTOR[rid])
+        if rid in _VERDICT_BULLISH: v_bullish += 1
+        elif rid in _VERDICT_BEARISH: v_bearish += 1
+
+    # COMPUTE VERDICT — Tightened thresholds with quality gates
+    v_total = len(v_records) if v_records else 1
+    v_net_ratio = (v_bullish - v_bearish) / v_total
+
+    if v_score >= 55 and v_bullish >= 8 and v_net_ratio > 0.4: v_verdict = "STRONG BUY"; v_emoji = "🟢"
+    elif v_score >= 35 and v_bullish >= 6 and v_net_ratio > 0.25: v_verdict = "BUY"; v_emoji = "🟢"
+    elif v_score >= 18 and v_bullish >= 4: v_verdict = "ACCUMULATE"; v_emoji = "🟢"
+    elif v_score >= -18: v_verdict = "HOLD"; v_emoji = "🟡"
+    elif v_score >= -35: v_verdict = "SELL"; v_emoji = "🔴"
+    elif v_bearish >= 5: v_verdict = "STRONG SELL"; v_emoji = "🔴"
+    else: v_verdict = "SELL"; v_emoji = "🔴"
+
+    v_conviction = "Very High" if abs(v_score) > 50 else "High" if abs(v_score) > 30 else "Medium" if abs(v_score) > 15 else "Low"
+    
+    return v_score, v_reasons, v_verdict, v_emoji, v_conviction, sorted(v_factors)
+
+
+# ═══ REPORT PROMPT — built once at import, filled per request with str.format_map ═══
+# Required fields are read with live_data[k] (a missing one is a bug upstream), optional ones default to 'N/A'.
+_REPORT_PROMPT_FIELDS = (
+    'currency', 'current_price', 'pe_ratio', 'pb_ratio', 'profit_margin', 'operating_margin',
+    'debt_to_equity', 'roe', 'beta', 'dividend_yield', 'book_value', 'data_timestamp',
+)
+_REPORT_PROMPT_OPTIONAL = (
+    'forward_pe', 'peg_ratio', 'enterprise_to_ebitda', 'gross_margins', 'short_percent_of_float',
+    'sma_20', 'sma_50', 'sma_200', 'ema_9', 'ema_21', 'ema_50', 'free_cash_flow', 'sector_avg_pe',
+)
 
-GROWTH & EARNINGS VELOCITY:
-• Revenue Growth: {live_data.get('revenue_growth', 'N/A')}%
-• EPS Growth (Forward vs TTM): {live_data.get('eps_growth_pct', 'N/A')}%
-• Earnings Growth: {live_data.get('earnings_growth', 'N/A')}%
-• Quarterly Earnings Growth (YoY): {live_data.get('earnings_quarterly_growth', 'N/A')}%
-• EPS (TTM): {live_data['eps_ttm']}
-• EPS (Forward): {live_data['eps_forward']}
-• Total Revenue: {live_data.get('total_revenue', 'N/A')}
+# Everything in the report prompt that is identical for every company — the standing rules and the
+# fully static section specs — lives here and is sent as a cacheable system block, so Anthropic prompt
+# caching serves this prefix at cached-token latency and price; _REPORT_PROMPT keeps only what varies.
+_REPORT_SYSTEM = """You write Celesys AI equity research reports. Each user message carries the live data, the pre-computed 20-factor verdict and the report skeleton for one company. The standing rules and section specs below apply to every report; "above" in them means the data in the user message.
+
+STANDING REPORT RULES:
+1. For Management Tone section, use analyst/earnings data if available, otherwise infer from P/E, margins, price position, beta, and dividend yield
+2. For QoQ and YoY analysis: if quarterly data is provided, calculate actual changes. If NOT provided, use available metrics to INFER trends (e.g., forward PE vs trailing PE shows earnings growth/decline, profit margins indicate operational trends, price vs 52W range shows momentum)
+3. Include specific growth predictions based on available data
+4. ALWAYS provide a 12-month price prediction with specific bull/base/bear numbers
+5. ABSOLUTE RULE — NEVER use these phrases in your report: "data corrupted", "HTML fragments", "insufficient data", "data limitation", "incomplete data", "cannot provide", "data unavailable", "technical website code", "UNKNOWN". Instead, ALWAYS analyze using whatever data IS available. Every metric (P/E, margins, price, 52W range) tells a story — use them.
+6. If quarterly earnings numbers are missing, calculate implied growth from: (a) Forward PE vs Trailing PE gap = earnings growth expectation, (b) Price position in 52W range = momentum, (c) Profit margin level = operational health, (d) Dividend yield = cash flow confidence. Present these as "Implied QoQ/YoY Trends" with specific inferences.
+7. The user is paying for a COMPLETE analysis. Every section must have substantive content with specific numbers and actionable insights. No empty sections, no disclaimers about missing data.
+8. CRITICAL — LAYMAN INFERENCE: At the END of EVERY section, add a "💡 What This Means For You" box in plain, jargon-free language. Imagine explaining to a friend who knows nothing about stocks. Use analogies, comparisons to everyday things, and clear "should I worry?" / "is this good?" verdicts. This is the MOST important part of each section — make it crystal clear.
+9. FACTOR COVERAGE: Your analysis must reflect every factor in the user message's factor list. Reference those factor numbers when discussing metrics, and never cite or describe a factor number that is not in that list. Each section should explicitly mention which listed factors drive its conclusion.
+10. INFERENCE QUALITY: Every number you cite must have an inference. Don't just say "P/E is 25x" — say "P/E is 25x which means investors are paying ₹25 for every ₹1 of profit — that's a premium price, justified only if growth is strong."
+
+SECTION SPECS (the skeleton points to these by heading):
 
-TECHNICAL INDICATORS:
-• SMA 20-Day: {live_data.get('sma_20', 'N/A')}
-• SMA 50-Day: {live_data.get('sma_50', 'N/A')}
-• SMA 200-Day: {live_data.get('sma_200', 'N/A')}
-• EMA 9-Day: {live_data.get('ema_9', 'N/A')}
-• EMA 21-Day: {live_data.get('ema_21', 'N/A')}
-• EMA 50-Day: {live_data.get('ema_50', 'N/A')}
-• Price vs SMA20: {'Above' if live_data.get('sma_20') and live_data['current_price'] > live_data['sma_20'] else 'Below' if live_data.get('sma_20') else 'N/A'}
-• Price vs SMA200: {'Above (uptrend)' if live_data.get('sma_200') and live_data['current_price'] > live_data['sma_200'] else 'Below (downtrend)' if live_data.get('sma_200') else 'N/A'}
-• EMA Signals: {', '.join(live_data.get('ema_signals', [])) if live_data.get('ema_signals') else 'N/A'}
+## 🎙️ MANAGEMENT TONE & OUTLOOK
 
-RISK & SENTIMENT:
-• Beta: {live_data['beta']}
-• Short Ratio: {live_data.get('short_ratio', 'N/A')}
+IMPORTANT: If analyst/earnings data is provided above, use it with real numbers. If NOT available, infer management confidence from: P/E ratio trends (forward vs trailing), price position vs 52-week range, profit margin levels, dividend yield, and beta. NEVER say "data corrupted" or "HTML fragments" — always provide substantive analysis.
 
-COMPANY INFORMATION:
-• Sector: {live_data['sector']}
-• Industry: {live_data['industry']}
+**CEO/CFO Confidence Level:** [🟢 Bullish / 🟡 Cautious / 🔴 Defensive — based on earnings surprises, guidance direction, and insider activity from the data above]
 
-═══════════════════════════════════════════════════════════════
-"""
+**Earnings Performance:** [Use the actual earnings surprise history — did they beat or miss? By how much? Is the trend improving or deteriorating?]
 
-        # FETCH REAL MANAGEMENT/EARNINGS DATA
-        mgmt_context = ""
-        fund_holdings = {"institutions": [], "funds": [], "summary": {}}
-        try:
-            mgmt_context, fund_holdings = fetch_management_context(live_data['ticker'], live_data.get('company_name', company))
-            if mgmt_context:
-                # Final safety: reject if it's mostly HTML
-                import re as re_safety
-                html_tag_count = len(re_safety.findall(r'<[a-zA-Z/]', mgmt_context))
-                if html_tag_count > 5:
-                    print(f"⚠️ Management context contains {html_tag_count} HTML tags — DISCARDING")
-                    mgmt_context = ""
-                else:
-                    print(f"📊 Got {len(mgmt_context)} chars of clean management/earnings data")
-        except Exception as e:
-            print(f"⚠️ Management context fetch failed: {e}")
-        
-        # BUILD COMPUTED FINANCIAL CONTEXT (always available from live_data)
-        # This ensures the AI ALWAYS has numbers to work with, even if Yahoo APIs fail
-        computed_context = f"""
-=== COMPUTED FINANCIAL METRICS (from live market data) ===
-Current Price: {_f_price}
-Price Change Today: {_f_chg_pct}
-P/E Ratio: {live_data['pe_ratio']}
-Forward P/E: {live_data.get('forward_pe', 'N/A')}
-P/B Ratio: {live_data['pb_ratio']}
-Market Cap: {_f_mcap}
-Dividend Yield: {live_data['dividend_yield']}%
-Beta: {live_data['beta']}
-52-Week High: {_f_w52h}
-52-Week Low: {_f_w52l}
-Price vs 52W High: {_fv(_safe_div(live_data.get('current_price',0), live_data.get('week52_high',1)) * 100, '.1f', '', '%')}
-Price vs 52W Low: {_fv(_safe_div(live_data.get('current_price',0), live_data.get('week52_low',1)) * 100, '.1f', '', '%')}
-Profit Margin: {live_data['profit_margin']}%
-Operating Margin: {live_data['operating_margin']}%
-ROE: {live_data['roe']}%
-Debt/Equity: {live_data['debt_to_equity']}
-Current Ratio: {live_data['current_ratio']}
-EPS (TTM): {live_data['eps_ttm']}
-EPS (Forward): {live_data['eps_forward']}
-Book Value/Share: {live_data['book_value']}
-Free Cash Flow: {live_data.get('free_cash_flow', 'N/A')}
-Operating Cash Flow: {live_data.get('operating_cash_flow', 'N/A')}
-Revenue Growth: {live_data.get('revenue_growth', 'N/A')}%
-Sector: {live_data['sector']}
-Industry: {live_data['industry']}
-"""
-        # Combine: real earnings data (if available) + computed metrics (always)
-        full_context = ""
-        if mgmt_context:
-            full_context = mgmt_context + "\n\n" + computed_context
-        else:
-            full_context = computed_context + "\nNOTE: Detailed quarterly earnings data was not available from Yahoo Finance. Use the financial metrics above to infer trends. Compute approximate QoQ/YoY analysis from profit margins, P/E trends, and price position vs 52-week range."
+**Analyst Consensus:** [What do analysts actually think? Use real price targets and recommendation data. How does current price compare to mean/high/low targets?]
 
-        # ═══ DETERMINISTIC STOCK VERDICT ENGINE (server-side) ═══
-        # This ensures AI always uses the same verdict for same data
-        def _n(v):
-            try:
-                f = float(v)
-                return f if v != 'N/A' else 0
-            except:
-                return 0
-        
-        v_score = 0
-        v_reasons = []
-        v_pe = _n(live_data['pe_ratio'])
-        v_fpe = _n(live_data.get('forward_pe', 0))
-        v_pb = _n(live_data['pb_ratio'])
-        v_dy = _n(live_data['dividend_yield'])
-        v_pm = _n(live_data['profit_margin'])
-        v_om = _n(live_data['operating_margin'])
-        v_roe = _n(live_data['roe'])
-        v_de = _n(live_data['debt_to_equity'])
-        v_cr = _n(live_data['current_ratio'])
-        v_beta = _n(live_data['beta'])
-        v_price = _n(live_data.get('current_price', 0))
-        v_hi = _n(live_data.get('week52_high', 0))
-        v_lo = _n(live_data.get('week52_low', 0))
-        v_w52 = (v_price - v_lo) / (v_hi - v_lo) if v_hi > v_lo else 0.5
-        
-        # F1: VALUATION (±20)
-        if v_pe > 0:
-            if v_pe < 10: v_score += 18; v_reasons.append(f"Deep value P/E {v_pe:.1f}x [+18]")
-            elif v_pe < 15: v_score += 12; v_reasons.append(f"Value P/E {v_pe:.1f}x [+12]")
-            elif v_pe < 22: v_score += 4; v_reasons.append(f"Fair P/E {v_pe:.1f}x [+4]")
-            elif v_pe < 35: v_score -= 6; v_reasons.append(f"Expensive P/E {v_pe:.1f}x [-6]")
-            else: v_score -= 14; v_reasons.append(f"Very expensive P/E {v_pe:.1f}x [-14]")
-        if v_fpe > 0 and v_pe > 0 and v_fpe < v_pe * 0.85:
-            v_score += 5; v_reasons.append("Forward P/E discount — earnings growth [+5]")
-        elif v_fpe > 0 and v_pe > 0 and v_fpe > v_pe * 1.1:
-            v_score -= 3; v_reasons.append("Forward P/E premium — earnings may decline [-3]")
-        
-        # F2: PROFITABILITY (±15)
-        if v_pm > 20: v_score += 12; v_reasons.append(f"Excellent margins {v_pm:.1f}% [+12]")
-        elif v_pm > 10: v_score += 6; v_reasons.append(f"Solid margins {v_pm:.1f}% [+6]")
-        elif v_pm > 0: v_score += 2; v_reasons.append(f"Thin margins {v_pm:.1f}% [+2]")
-        elif v_pm < 0: v_score -= 10; v_reasons.append(f"Unprofitable {v_pm:.1f}% [-10]")
-        
-        if v_roe > 20: v_score += 8; v_reasons.append(f"Strong ROE {v_roe:.1f}% [+8]")
-        elif v_roe > 12: v_score += 4; v_reasons.append(f"Decent ROE {v_roe:.1f}% [+4]")
-        elif 0 < v_roe < 5: v_score -= 3; v_reasons.append(f"Weak ROE {v_roe:.1f}% [-3]")
-        
-        # F3: FINANCIAL HEALTH (±12)
-        if v_de > 0:
-            if v_de < 30: v_score += 10; v_reasons.append(f"Low debt D/E {v_de:.0f} [+10]")
-            elif v_de < 80: v_score += 5; v_reasons.append(f"Moderate debt D/E {v_de:.0f} [+5]")
-            elif v_de < 150: v_score -= 3; v_reasons.append(f"Elevated debt D/E {v_de:.0f} [-3]")
-            else: v_score -= 10; v_reasons.append(f"High leverage D/E {v_de:.0f} [-10]")
-        if v_cr > 2: v_score += 4; v_reasons.append(f"Strong liquidity CR {v_cr:.1f} [+4]")
-        elif 0 < v_cr < 1: v_score -= 6; v_reasons.append(f"Liquidity risk CR {v_cr:.1f} [-6]")
-        
-        # F4: 52-WEEK POSITION (±10)
-        if v_w52 < 0.2: v_score += 8; v_reasons.append(f"Near 52W low ({v_w52*100:.0f}% of range) [+8]")
-        elif v_w52 < 0.35: v_score += 4; v_reasons.append("Lower half of 52W range [+4]")
-        elif v_w52 > 0.9: v_score -= 4; v_reasons.append(f"Near 52W high ({v_w52*100:.0f}%) [-4]")
-        elif v_w52 > 0.75: v_score += 2; v_reasons.append("Upper range, momentum intact [+2]")
-        
-        # F5: P/B (±8)
-        if v_pb > 0:
-            if v_pb < 1: v_score += 8; v_reasons.append(f"Below book P/B {v_pb:.1f} [+8]")
-            elif v_pb < 2.5: v_score += 3; v_reasons.append(f"Reasonable P/B {v_pb:.1f} [+3]")
-            elif v_pb > 8: v_score -= 5; v_reasons.append(f"Extreme P/B {v_pb:.1f} [-5]")
-        
-        # F6: DIVIDEND (±5)
-        if v_dy > 4: v_score += 5; v_reasons.append(f"High yield {v_dy:.1f}% [+5]")
-        elif v_dy > 2: v_score += 3; v_reasons.append(f"Decent yield {v_dy:.1f}% [+3]")
-        
-        # F7: BETA/RISK (±5)
-        if v_beta > 2: v_score -= 5; v_reasons.append(f"High volatility Beta {v_beta:.2f} [-5]")
-        elif v_beta > 1.5: v_score -= 2; v_reasons.append(f"Above-avg vol Beta {v_beta:.2f} [-2]")
-        elif 0 < v_beta < 0.7: v_score += 3; v_reasons.append(f"Defensive Beta {v_beta:.2f} [+3]")
-        
-        # F8: OPERATING EFFICIENCY (±5)
-        if v_om > 20: v_score += 5; v_reasons.append("High operating efficiency [+5]")
-        elif 0 < v_om < 5: v_score -= 3; v_reasons.append("Weak operating margins [-3]")
-        
-        # ═══ NEW FACTORS F9-F20 — Deep multi-factor analysis ═══
-        v_revG = _n(live_data.get('revenue_growth', 0))
-        v_epsG = _n(live_data.get('eps_growth_pct', 0))
-        v_earnG = _n(live_data.get('earnings_growth', 0))
-        v_sectorPE = _n(live_data.get('sector_avg_pe', 0)) or 20
-        v_sma20 = _n(live_data.get('sma_20', 0))
-        v_sma50 = _n(live_data.get('sma_50', 0))
-        v_sma200 = _n(live_data.get('sma_200', 0))
-        v_peg = _n(live_data.get('peg_ratio', 0))
-        v_evEbitda = _n(live_data.get('enterprise_to_ebitda', 0))
-        v_fcf = _n(live_data.get('free_cash_flow', 0))
-        v_ocf = _n(live_data.get('operating_cash_flow', 0))
-        v_totalCash = _n(live_data.get('total_cash', 0))
-        v_totalDebt = _n(live_data.get('total_debt', 0))
-        v_totalRev = _n(live_data.get('total_revenue', 0))
-        v_qr = _n(live_data.get('quick_ratio', 0))
-        v_gm = _n(live_data.get('gross_margins', 0))
-        v_ebitdaM = _n(live_data.get('ebitda_margins', 0))
-        v_eqg = _n(live_data.get('earnings_quarterly_growth', 0))
-        v_shortR = _n(live_data.get('short_ratio', 0))
-        v_payout = _n(live_data.get('payout_ratio', 0))
-        v_mcap = _n(live_data.get('market_cap', 0))
-        
-        # F9: EARNINGS VELOCITY — EPS + Revenue CAGR (±15)
-        v_bestEG = v_epsG or v_earnG
-        v_combG = (v_bestEG * 0.6 + v_revG * 0.4) if (v_bestEG and v_revG) else (v_bestEG or v_revG)
-        if v_combG:
-            if v_combG > 30: v_score += 12; v_reasons.append(f"Hypergrowth earnings velocity {v_combG:.0f}% CAGR [+12]")
-            elif v_combG > 15: v_score += 7; v_reasons.append(f"Strong growth trajectory {v_combG:.0f}% [+7]")
-            elif v_combG > 5: v_score += 3; v_reasons.append(f"Moderate growth {v_combG:.0f}% [+3]")
-            elif v_combG <= -15: v_score -= 8; v_reasons.append(f"Severe earnings decline {v_combG:.0f}% [-8]")
-            elif v_combG <= -5: v_score -= 4; v_reasons.append(f"Earnings contracting {v_combG:.0f}% [-4]")
-        if v_bestEG > 10 and v_revG > 10:
-            v_score += 3; v_reasons.append("Revenue + EPS both growing — quality momentum [+3]")
-        elif v_bestEG < -5 and v_revG < -5:
-            v_score -= 3; v_reasons.append("Revenue + EPS both declining — deterioration [-3]")
-        
-        # F10: RELATIVE VALUATION — P/E vs Sector (±10)
-        if v_pe > 0 and v_sectorPE > 0:
-            peR = v_pe / v_sectorPE
-            disc = abs((v_sectorPE - v_pe) / v_sectorPE * 100)
-            if peR < 0.6: v_score += 8; v_reasons.append(f"P/E {disc:.0f}% below sector avg ({v_sectorPE:.0f}x) [+8]")
-            elif peR < 0.85: v_score += 4; v_reasons.append(f"P/E {disc:.0f}% below sector — undervalued [+4]")
-            elif peR > 1.5: v_score -= 6; v_reasons.append(f"P/E {disc:.0f}% above sector — expensive vs peers [-6]")
-            elif peR > 1.2: v_score -= 2; v_reasons.append("P/E premium over sector [-2]")
-        
-        # F11: TECHNICAL MOMENTUM — SMA crossovers (±12)
-        tS = 0; tD = []
-        if v_sma20 > 0:
-            if v_price > v_sma20: tS += 2; tD.append("Above SMA20")
-            else: tS -= 2; tD.append("Below SMA20")
-        if v_sma200 > 0:
-            if v_price > v_sma200: tS += 3; tD.append("Above SMA200 uptrend")
-            else: tS -= 3; tD.append("Below SMA200 downtrend")
-        if v_sma20 > 0 and v_sma200 > 0:
-            if v_sma20 > v_sma200: tS += 2; tD.append("Golden Cross")
-            elif v_sma20 < v_sma200 * 0.95: tS -= 2; tD.append("Death Cross")
-        if v_sma50 > 0 and v_sma200 > 0 and v_price > v_sma50 and v_price > v_sma200:
-            tS += 2; tD.append("All MAs bullish")
-        # EMA crossover analysis
-        v_ema9 = _n(live_data.get('ema_9', 0))
-        v_ema21 = _n(live_data.get('ema_21', 0))
-        v_ema50 = _n(live_data.get('ema_50', 0))
-        if v_ema9 > 0 and v_ema21 > 0:
-            if v_ema9 > v_ema21: tS += 1; tD.append("EMA9>21 bullish")
-            else: tS -= 1; tD.append("EMA9<21 bearish")
-        if v_ema21 > 0 and v_ema50 > 0:
-            if v_ema21 > v_ema50: tS += 1; tD.append("EMA21>50 uptrend")
-            else: tS -= 1; tD.append("EMA21<50 downtrend")
-        tS = max(-8, min(8, tS))
-        if tD: v_score += tS; v_reasons.append(f"Technical: {', '.join(tD[:3])} [{'+' if tS >= 0 else ''}{tS}]")
-        
-        # F12: PEG RATIO — Growth at Reasonable Price (±8)
-        if v_peg > 0:
-            if v_peg < 0.8: v_score += 7; v_reasons.append(f"PEG bargain ({v_peg:.1f}) — growth underpriced [+7]")
-            elif v_peg < 1.2: v_score += 3; v_reasons.append(f"PEG fair ({v_peg:.1f}) [+3]")
-            elif v_peg > 2.5: v_score -= 5; v_reasons.append(f"PEG stretched ({v_peg:.1f}) — overpaying for growth [-5]")
-            elif v_peg > 1.8: v_score -= 2; v_reasons.append(f"PEG slightly high ({v_peg:.1f}) [-2]")
-        
-        # F13: CASH FLOW QUALITY — FCF health (±10)
-        if v_fcf > 0 and v_totalRev > 0:
-            fcfM = (v_fcf / v_totalRev) * 100
-            if fcfM > 15: v_score += 7; v_reasons.append(f"Excellent FCF margin {fcfM:.1f}% — cash machine [+7]")
-            elif fcfM > 5: v_score += 4; v_reasons.append(f"Healthy FCF {fcfM:.1f}% of revenue [+4]")
-        elif v_fcf < 0 and v_ocf > 0:
-            v_score -= 2; v_reasons.append("Negative FCF despite positive OCF — heavy capex [-2]")
-        elif v_fcf < 0 and v_ocf <= 0:
-            v_score -= 7; v_reasons.append("Negative cash flows — burning cash [-7]")
-        if v_ocf > 0 and v_totalDebt > 0:
-            dc = v_ocf / v_totalDebt
-            if dc > 0.5: v_score += 2; v_reasons.append(f"OCF covers {dc*100:.0f}% of debt [+2]")
-            elif dc < 0.1: v_score -= 2; v_reasons.append("Cash barely covers debt [-2]")
-        
-        # F14: BALANCE SHEET VERIFICATION — Cash vs Debt (±10)
-        if v_totalCash > 0 and v_totalDebt > 0:
-            cdr = v_totalCash / v_totalDebt
-            if cdr > 1.5: v_score += 6; v_reasons.append(f"Net cash — cash exceeds debt by {(cdr-1)*100:.0f}% [+6]")
-            elif cdr > 0.7: v_score += 3; v_reasons.append(f"Adequate cash — {cdr*100:.0f}% of debt covered [+3]")
-            elif cdr < 0.15: v_score -= 5; v_reasons.append(f"Cash crunch — only {cdr*100:.0f}% of debt covered [-5]")
-        elif v_totalCash > 0 and v_totalDebt == 0:
-            v_score += 4; v_reasons.append("Debt-free with cash on books [+4]")
-        if v_qr > 0:
-            if v_qr > 1.5: v_score += 2; v_reasons.append(f"Strong quick ratio {v_qr:.1f} — meets short-term obligations [+2]")
-            elif v_qr < 0.5: v_score -= 3; v_reasons.append(f"Weak quick ratio {v_qr:.1f} — solvency risk [-3]")
-        
-        # F15: EV/EBITDA — Enterprise valuation (±8)
-        if v_evEbitda > 0:
-            if v_evEbitda < 6: v_score += 7; v_reasons.append(f"Cheap EV/EBITDA {v_evEbitda:.1f}x — potential takeover value [+7]")
-            elif v_evEbitda < 10: v_score += 4; v_reasons.append(f"Reasonable EV/EBITDA {v_evEbitda:.1f}x [+4]")
-            elif v_evEbitda < 16: v_score += 1; v_reasons.append(f"Fair EV/EBITDA {v_evEbitda:.1f}x [+1]")
-            elif v_evEbitda > 25: v_score -= 5; v_reasons.append(f"Very expensive EV/EBITDA {v_evEbitda:.1f}x [-5]")
-            elif v_evEbitda > 18: v_score -= 2; v_reasons.append(f"Elevated EV/EBITDA {v_evEbitda:.1f}x [-2]")
-        
-        # F16: GROSS MARGIN POWER — Pricing power & moat (±7)
-        if v_gm > 0:
-            if v_gm > 60: v_score += 6; v_reasons.append(f"Elite gross margins {v_gm:.0f}% — strong moat [+6]")
-            elif v_gm > 40: v_score += 3; v_reasons.append(f"Healthy gross margins {v_gm:.0f}% [+3]")
-            elif v_gm < 20: v_score -= 4; v_reasons.append(f"Low gross margins {v_gm:.0f}% — weak pricing power [-4]")
-        
-        # F17: QUARTERLY EARNINGS MOMENTUM (±8)
-        if v_eqg:
-            if v_eqg > 30: v_score += 7; v_reasons.append(f"Quarterly earnings surging +{v_eqg:.0f}% YoY [+7]")
-            elif v_eqg > 15: v_score += 4; v_reasons.append(f"Strong quarterly growth +{v_eqg:.0f}% [+4]")
-            elif v_eqg > 5: v_score += 2; v_reasons.append(f"Moderate quarterly growth +{v_eqg:.0f}% [+2]")
-            elif v_eqg < -20: v_score -= 6; v_reasons.append(f"Quarterly earnings plunging {v_eqg:.0f}% [-6]")
-            elif v_eqg < -5: v_score -= 3; v_reasons.append(f"Quarterly decline {v_eqg:.0f}% [-3]")
-        
-        # F18: EBITDA MARGIN QUALITY (±5)
-        if v_ebitdaM > 0:
-            if v_ebitdaM > 30: v_score += 4; v_reasons.append(f"Strong EBITDA margins {v_ebitdaM:.0f}% — operational excellence [+4]")
-            elif v_ebitdaM > 15: v_score += 2; v_reasons.append(f"Healthy EBITDA margins {v_ebitdaM:.0f}% [+2]")
-            elif v_ebitdaM < 5: v_score -= 3; v_reasons.append(f"Thin EBITDA margins {v_ebitdaM:.0f}% [-3]")
-        
-        # F19: SHORT INTEREST SIGNAL (±5)
-        if v_shortR > 0:
-            if v_shortR > 10: v_score -= 4; v_reasons.append(f"Very high short interest ({v_shortR:.1f} days) — bearish sentiment [-4]")
-            elif v_shortR > 5: v_score -= 2; v_reasons.append(f"Elevated short interest ({v_shortR:.1f} days) [-2]")
-            elif v_shortR < 1.5: v_score += 2; v_reasons.append(f"Low short interest ({v_shortR:.1f} days) — bullish sentiment [+2]")
-        
-        # F20: DIVIDEND SUSTAINABILITY (±5)
-        if v_dy > 0 and v_payout > 0:
-            if v_payout < 40 and v_dy > 2: v_score += 4; v_reasons.append(f"Sustainable dividend — low payout {v_payout:.0f}% with {v_dy:.1f}% yield [+4]")
-            elif v_payout > 90: v_score -= 3; v_reasons.append(f"Unsustainable payout ratio {v_payout:.0f}% — dividend at risk [-3]")
-            elif v_payout > 70: v_score -= 1; v_reasons.append(f"High payout ratio {v_payout:.0f}% — limited dividend growth [-1]")
-        
-        # QUALITY COMBO BONUSES (±8)
-        if v_combG and v_combG > 15 and v_pm > 15:
-            v_score += 3; v_reasons.append("Growth + profitability combo — rare quality [+3]")
-        if v_combG and v_combG < 0 and v_pm < 5:
-            v_score -= 3; v_reasons.append("Declining growth + weak margins — avoid [-3]")
-        # VALUE TRAP: cheap but deteriorating
-        if v_pe > 0 and v_pe < 15 and v_combG and v_combG < -5 and v_pm < 8:
-            v_score -= 6; v_reasons.append("VALUE TRAP: cheap P/E but shrinking earnings + thin margins [-6]")
-        # GROWTH TRAP: expensive + growth stalling
-        if v_pe > 30 and v_combG and v_combG < 5 and v_fpe > 0 and v_fpe > v_pe * 0.9:
-            v_score -= 5; v_reasons.append("GROWTH TRAP: premium valuation but growth stalling [-5]")
-        # TRIPLE STRENGTH
-        if v_pe > 0 and v_pe < 20 and v_pm > 15 and v_roe > 15:
-            v_score += 4; v_reasons.append("Triple Strength: fair value + profitable + strong ROE [+4]")
-        # TRIPLE WEAKNESS
-        if v_pe > 35 and v_pm < 5:
-            v_score -= 4; v_reasons.append("Triple Weakness: overvalued + weak margins [-4]")
-        
-        # COMPUTE VERDICT — Tightened thresholds with quality gates
-        v_bullish = len([r for r in v_reasons if '[+' in r])
-        v_bearish = len([r for r in v_reasons if '[-' in r])
-        v_total = len(v_reasons) if v_reasons else 1
-        v_net_ratio = (v_bullish - v_bearish) / v_total
-        
-        if v_score >= 55 and v_bullish >= 8 and v_net_ratio > 0.4: v_verdict = "STRONG BUY"; v_emoji = "🟢"
-        elif v_score >= 35 and v_bullish >= 6 and v_net_ratio > 0.25: v_verdict = "BUY"; v_emoji = "🟢"
-        elif v_score >= 18 and v_bullish >= 4: v_verdict = "ACCUMULATE"; v_emoji = "🟢"
-        elif v_score >= -18: v_verdict = "HOLD"; v_emoji = "🟡"
-        elif v_score >= -35: v_verdict = "SELL"; v_emoji = "🔴"
-        elif v_bearish >= 5: v_verdict = "STRONG SELL"; v_emoji = "🔴"
-        else: v_verdict = "SELL"; v_emoji = "🔴"
-        
-        v_conviction = "Very High" if abs(v_score) > 50 else "High" if abs(v_score) > 30 else "Medium" if abs(v_score) > 15 else "Low"
-        
-        verdict_card = f"""
-═══ PRE-COMPUTED STOCK VERDICT (deterministic — USE THIS) ═══
-VERDICT: {v_verdict} {v_emoji}
-Score: {v_score:+d} | Conviction: {v_conviction}
-Factor breakdown:
-  """ + "\n  ".join(v_reasons) + f"""
+**Forward Growth Outlook:** [Use forward EPS estimates and revenue growth data to project 12-month outlook. Be specific with numbers.]
 
-IMPORTANT: Your recommendation in the report MUST match this verdict ({v_verdict}).
-Do NOT override or contradict this score-based verdict.
-Your job is to EXPLAIN why this verdict makes sense using the data, not to change it.
-═══ END VERDICT ═══"""
-        
-        # Add intrinsic value data to prompt
-        iv = live_data.get('intrinsic')
-        intrinsic_section = ""
-        if iv:
-            intrinsic_section = "\n═══ INTRINSIC VALUE ESTIMATES (pre-computed) ═══\n"
-            if iv.get('graham'): intrinsic_section += f"Graham Number: {currency_symbol}{iv['graham']:,.2f} ({iv['graham_upside']:+.1f}% vs current price)\n"
-            if iv.get('dcf_simple'): intrinsic_section += f"DCF (Graham Growth): {currency_symbol}{iv['dcf_simple']:,.2f} ({iv['dcf_upside']:+.1f}% vs current price)\n"
-            if iv.get('lynch'): intrinsic_section += f"Lynch Fair Value (PEG=1): {currency_symbol}{iv['lynch']:,.2f}\n"
-            if iv.get('earnings_yield'): intrinsic_section += f"Earnings Yield: {iv['earnings_yield']}% (premium vs 10Y bond: {iv['earnings_yield_premium']:+.2f}%)\n"
-            if iv.get('book_value'): intrinsic_section += f"Book Value/Share: {currency_symbol}{iv['book_value']:,.2f}\n"
-            intrinsic_section += "USE these intrinsic values in your Valuation Analysis section.\n═══ END INTRINSIC ═══"
-        
-        print(f"📊 Stock Verdict: {v_verdict} (score: {v_score:+d}, conviction: {v_conviction})")
-        print(f"   Factors: {len(v_reasons)}")
+**Insider & Institutional Signal:** [Use actual insider ownership %, institutional %, and short interest data. Are insiders buying or selling? Is short interest rising?]
+
+**Red Flags:** [Based on real data — declining earnings surprises, lowered guidance, increasing short interest, insider selling, etc.]
+
+**Green Flags:** [Based on real data — consecutive beats, raised targets, insider buying, institutional accumulation, etc.]
+
+**What Management Isn't Telling You:** [Read between the numbers — what do the data patterns suggest that management wouldn't say directly?]
+
+**Management Tone → Future Stock Impact:** 
+[Based on everything above — how will management's current stance likely impact the stock price in the next 3-6-12 months? Be specific:
+- If BULLISH: "Management confidence + rising estimates suggest X% upside to $XXX by [date]"
+- If CAUTIOUS: "Mixed signals suggest sideways trading in $XXX-$XXX range until [catalyst]"  
+- If DEFENSIVE: "Declining metrics + hedged language suggests X% downside risk to $XXX"
+Include specific price targets tied to management tone.]
+
+**12-Month Price Prediction:** [Based on forward EPS × historical PE range, analyst targets, and growth trajectory — give a specific price range with bull/base/bear cases]
+
+**Investment Inference from Management Behavior:**
+[Based on tone, body language of guidance, insider transactions, and communication patterns — is this management team building value or managing decline? Should investors trust the forward narrative? Concrete recommendation tied to management credibility.]
+
+**💡 What This Means For You:** [Simple answer: "Can you trust these people with your money? Are they acting like owners or corporate politicians? What would their behavior tell a friend deciding whether to invest?"]
+
+## 🏦 TOP FUND & INSTITUTIONAL HOLDINGS
+
+**Smart Money Snapshot:** [If fund/institutional data is provided above, list the top 5 holders with % ownership. Comment on: Are big funds accumulating or reducing? Is institutional ownership high (>60%) = strong backing, or low = under the radar?]
+
+**Top Holders:** [List top 5 institutional/mutual fund holders from the data. Format: "1. Vanguard (8.2%) 2. BlackRock (6.1%) etc." If data not available, note that institutional data was not available and skip this.]
+
+**What Smart Money Tells Us:** [High institutional ownership = validation by professional analysts. Rising institutional % = accumulation phase. Declining = distribution/exit. Low institutional = either undiscovered gem or avoided for reasons.]
+
+**💡 What This Means For You:** [Simple: "Are the big professional investors buying this stock or avoiding it? Think of it like a restaurant — if top food critics eat there, it's probably good. If they avoid it, there might be something wrong you can't see yet."]
+
+## 🔮 WHAT'S NEXT — Catalysts & Timeline
+
+**vs Peers / Competitors:** [Compare this stock's valuation (P/E), growth, and margins vs its industry peers listed above. Is it cheaper or more expensive than competitors? Is the premium/discount justified by superior growth, margins, or market position? Which competitor is the biggest threat and why?]
+
+**Upcoming Sector Events (Next 3-6 Months):** [List 3-5 specific upcoming events for THIS sector that could move the stock — include approximate dates where possible. Examples: earnings season, regulatory decisions, commodity price drivers, policy changes, tech launches, industry conferences, seasonal demand shifts. Be specific to the sector, not generic.]
+
+**Next 30 Days:** [What specific events/catalysts are coming? Earnings date, ex-dividend date, product launches, regulatory decisions, macro events]
+
+**Next 90 Days:** [Medium-term catalysts — seasonal trends, industry events, guidance updates, competitive dynamics that will impact price]
+
+**Next 12 Months:** [Big picture — growth trajectory, expansion plans, sector tailwinds/headwinds, regulatory changes, M&A potential]
+
+**Key Trigger to Watch:** [The single most important catalyst that will determine if this stock goes up or down. Be specific — "Q3 earnings on [date]" or "Fed rate decision" or "New product launch in [month]"]
 
-        # CREATE CLAUDE PROMPT
-        prompt = f"""Analyze {company} using the VERIFIED LIVE DATA below.
+**Bull Case Scenario:** [If everything goes right — specific price target with reasoning]
+**Bear Case Scenario:** [If things go wrong — specific downside target with reasoning]
+**Most Likely Scenario:** [Your base case with probability assessment]
+
+**💡 What This Means For You:** [Simple summary: "Over the next year, this stock is most likely to [go up/stay flat/go down] because [one clear reason]. The single thing to watch is [specific trigger]." Do NOT give explicit buy/hold/sell advice — only explain the outlook and key risks. End with: "This is for educational analysis only, not investment advice."]
+"""
+_REPORT_SYSTEM_BLOCKS = [{"type": "text", "text": _REPORT_SYSTEM, "cache_control": {"type": "ephemeral"}}]
+
+_REPORT_PROMPT = """Analyze {company} using the VERIFIED LIVE DATA below.
 
 {live_data_section}
 
-{"=" * 60}
+============================================================
 REAL ANALYST & EARNINGS DATA (use this for management tone analysis):
-{"=" * 60}
+============================================================
 {full_context}
-{"=" * 60}
+============================================================
 
 {verdict_card}
 
 {intrinsic_section}
 
-═══ THE 20 QUANTITATIVE FACTORS DRIVING THIS VERDICT ═══
-The verdict above ({v_verdict}, score: {v_score:+d}) was computed from these 20 factors.
-Your report MUST analyze and reference ALL of them:
-
-VALUATION FACTORS:
-  F1: P/E Ratio Valuation (±20) — cheap vs expensive vs sector avg
-  F2: P/B Ratio (±8) — book value premium/discount
-  F5: Forward PE vs Trailing PE (±5) — earnings trajectory signal
-  F10: Relative Valuation vs Sector P/E (±10) — peer comparison
-  F12: PEG Ratio (±8) — growth at reasonable price
-  F15: EV/EBITDA (±8) — enterprise value vs cash generation
-
-PROFITABILITY FACTORS:
-  F3: Profit Margin Quality (±15) — net margin strength
-  F8: Operating Efficiency (±5) — ROE & operating margin
-  F16: Gross Margin Power (±7) — pricing power & moat
-  F18: EBITDA Margin Quality (±5) — operational cash generation
-
-FINANCIAL HEALTH FACTORS:
-  F4: Financial Health/Debt (±12) — debt-to-equity & current ratio
-  F13: Free Cash Flow Quality (±10) — FCF yield & health
-  F14: Balance Sheet Verification (±10) — cash vs debt coverage
-  F20: Dividend Sustainability (±5) — payout ratio safety
-
-MOMENTUM & POSITION FACTORS:
-  F6: 52-Week Position (±10) — price range positioning
-  F7: Beta/Risk (±5) — volatility assessment
-  F9: Earnings Velocity (±15) — EPS & revenue CAGR
-  F11: Technical Momentum (±12) — SMA/EMA crossovers
-  F17: Quarterly Earnings Momentum (±8) — surprise & beat trends
-  F19: Short Interest Signal (±5) — bearish bet indicator
-
-You MUST touch on ALL 20 factors across your analysis sections. Group them naturally but ensure EVERY factor gets mentioned.
+═══ THE QUANTITATIVE FACTORS DRIVING THIS VERDICT ═══
+The verdict above ({v_verdict}, score: {v_score:+d}) was computed from 20 factors; these are the ones that fired for {company}.
+Your report MUST analyze and reference ALL of them — and only these; do not cite factor numbers that are not listed:
+
+{factor_block}
+You MUST touch on ALL of these factors across your analysis sections. Group them naturally but ensure EVERY factor gets mentioned.
 ═══ END FACTOR LIST ═══
 
 CRITICAL INSTRUCTIONS:
 1. Use ONLY the real-time data provided above
-2. Current price is {_f_price} - use THIS number
+2. Current price is {price} - use THIS number
 3. Base all analysis on current market conditions
 4. Provide actionable, professional insights
 5. Your Recommendation MUST be: {v_verdict} {v_emoji} — this is pre-computed from 20 quantitative factors and is NON-NEGOTIABLE
-6. For Management Tone section, use analyst/earnings data if available, otherwise infer from P/E, margins, price position, beta, and dividend yield
-7. For QoQ and YoY analysis: if quarterly data is provided, calculate actual changes. If NOT provided, use available metrics to INFER trends (e.g., forward PE vs trailing PE shows earnings growth/decline, profit margins indicate operational trends, price vs 52W range shows momentum)
-7. Include specific growth predictions based on available data
-8. ALWAYS provide a 12-month price prediction with specific bull/base/bear numbers
-9. ABSOLUTE RULE — NEVER use these phrases in your report: "data corrupted", "HTML fragments", "insufficient data", "data limitation", "incomplete data", "cannot provide", "data unavailable", "technical website code", "UNKNOWN". Instead, ALWAYS analyze using whatever data IS available. Every metric (P/E, margins, price, 52W range) tells a story — use them.
-10. If quarterly earnings numbers are missing, calculate implied growth from: (a) Forward PE vs Trailing PE gap = earnings growth expectation, (b) Price position in 52W range = momentum, (c) Profit margin level = operational health, (d) Dividend yield = cash flow confidence. Present these as "Implied QoQ/YoY Trends" with specific inferences.
-11. The user is paying for a COMPLETE analysis. Every section must have substantive content with specific numbers and actionable insights. No empty sections, no disclaimers about missing data.
-12. CRITICAL — LAYMAN INFERENCE: At the END of EVERY section, add a "💡 What This Means For You" box in plain, jargon-free language. Imagine explaining to a friend who knows nothing about stocks. Use analogies, comparisons to everyday things, and clear "should I worry?" / "is this good?" verdicts. This is the MOST important part of each section — make it crystal clear.
-13. FACTOR COVERAGE: Your analysis must reflect ALL 20 quantitative factors listed above. Reference specific factor numbers (F1, F2, etc.) when discussing metrics. Each section should explicitly mention which factors drive its conclusion.
-14. INFERENCE QUALITY: Every number you cite must have an inference. Don't just say "P/E is 25x" — say "P/E is 25x which means investors are paying ₹25 for every ₹1 of profit — that's a premium price, justified only if growth is strong."
+6. Apply EVERY standing report rule from the system prompt
 
 ═══════════════════════════════════════════════════════════════
-📊 COMPREHENSIVE INVESTMENT ANALYSIS: {company.upper()}
+📊 COMPREHENSIVE INVESTMENT ANALYSIS: {company_upper}
 ═══════════════════════════════════════════════════════════════
-**Report Date:** {datetime.now().strftime("%B %d, %Y at %I:%M %p UTC")}
+**Report Date:** {report_time}
 **Data Source:** Real-Time Market Data + AI Analysis
 **Platform:** Celesys AI
 
@@ -10476,18 +11391,18 @@ CRITICAL INSTRUCTIONS:
 
 ## 🎯 INVESTMENT THESIS
 
-**Current Price:** {_f_price} {live_data['currency']}  
+**Current Price:** {price} {currency}  
 **Recommendation:** {v_verdict} {v_emoji} (Score: {v_score:+d})  
 **Conviction:** {v_conviction}  
 **Time Horizon:** [Short/Long-term based on the data]
 
-Explain WHY this {v_verdict} verdict makes sense by referencing ALL 20 factors grouped into 4 pillars:
-- **Valuation** (F1, F2, F5, F10, F12, F15): Is price justified?
-- **Profitability** (F3, F8, F16, F18): Is the business healthy?
-- **Financial Strength** (F4, F13, F14, F20): Can it survive stress?
-- **Momentum** (F6, F7, F9, F11, F17, F19): Where is it headed?
+Explain WHY this {v_verdict} verdict makes sense by referencing the factors in the list above, grouped into 4 pillars that follow its groups:
+- **Valuation** (listed valuation factors): Is price justified?
+- **Profitability** (listed profitability factors): Is the business healthy?
+- **Financial Strength** (listed financial health factors): Can it survive stress?
+- **Momentum** (listed momentum & position factors): Where is it headed?
 
-Give a clear 2-3 sentence verdict for each pillar, then an overall synthesis. Do NOT contradict the verdict.
+Give a clear 2-3 sentence verdict for each pillar, then an overall synthesis. If no listed factor falls in a pillar, judge it from the live metrics without citing factor numbers. Do NOT contradict the verdict.
 
 ---
 
@@ -10497,22 +11412,22 @@ Give a clear 2-3 sentence verdict for each pillar, then an overall synthesis. Do
 ┌──────────────────────────────────────────────────────┐
 │ METRIC               LIVE VALUE     ASSESSMENT       │
 ├──────────────────────────────────────────────────────┤
-│ Current Price        {currency_symbol}{live_data['current_price']:<10,.2f}  [Today's price] │
-│ P/E Ratio (F1)       {str(live_data['pe_ratio']):<13}  [vs industry]  │
-│ P/B Ratio (F2)       {str(live_data['pb_ratio']):<13}  [vs industry]  │
-│ Forward PE (F5)      {str(live_data.get('forward_pe','N/A')):<13}  [Growth signal] │
-│ PEG Ratio (F12)      {str(live_data.get('peg_ratio','N/A')):<13}  [Value vs growth]│
-│ EV/EBITDA (F15)      {str(live_data.get('enterprise_to_ebitda','N/A')):<13}  [Enterprise val] │
-│ Profit Margin (F3)   {str(live_data['profit_margin'])+"%":<13}  [Profitability]  │
-│ Oper Margin (F8)     {str(live_data['operating_margin'])+"%":<13}  [Efficiency]     │
-│ Gross Margin (F16)   {str(live_data.get('gross_margins','N/A')):<13}  [Pricing power]  │
-│ FCF Yield (F13)      [Calculate]       [Cash quality]  │
-│ Debt/Equity (F4)     {str(live_data['debt_to_equity']):<13}  [Leverage]       │
-│ ROE (F8)             {str(live_data['roe'])+"%":<13}  [Returns]        │
-│ Beta (F7)            {str(live_data['beta']):<13}  [Volatility]     │
-│ Price vs 52W (F6)    [Calculate %]     [Position]     │
-│ Div Yield (F20)      {str(live_data['dividend_yield'])+"%":<13}  [Income]         │
-│ Short Interest (F19) {str(live_data.get('short_percent_of_float','N/A')):<13}  [Bear bets]      │
+│ Current Price        {currency_symbol}{current_price:<10,.2f}  [Today's price] │
+│ P/E Ratio            {pe_ratio!s:<13}  [vs industry]  │
+│ P/B Ratio            {pb_ratio!s:<13}  [vs industry]  │
+│ Forward PE           {forward_pe!s:<13}  [Growth signal] │
+│ PEG Ratio            {peg_ratio!s:<13}  [Value vs growth]│
+│ EV/EBITDA            {enterprise_to_ebitda!s:<13}  [Enterprise val] │
+│ Profit Margin        {profit_margin_pct:<13}  [Profitability]  │
+│ Oper Margin          {operating_margin_pct:<13}  [Efficiency]     │
+│ Gross Margin         {gross_margins!s:<13}  [Pricing power]  │
+│ FCF Yield            [Calculate]       [Cash quality]  │
+│ Debt/Equity          {debt_to_equity!s:<13}  [Leverage]       │
+│ ROE                  {roe_pct:<13}  [Returns]        │
+│ Beta                 {beta!s:<13}  [Volatility]     │
+│ Price vs 52W         [Calculate %]     [Position]     │
+│ Div Yield            {dividend_yield_pct:<13}  [Income]         │
+│ Short Interest       {short_percent_of_float!s:<13}  [Bear bets]      │
 └──────────────────────────────────────────────────────┘
 ```
 
@@ -10524,15 +11439,15 @@ For EACH metric above, provide a 1-sentence layman interpretation. Example: "P/E
 
 ## ⚠️ RISK ASSESSMENT (Cover ALL risk-related factors)
 
-Analyze these 8 risk dimensions using the 20-factor data:
+Analyze these 8 risk dimensions using the live data and the listed factors (cite a factor number only if it appears in the factor list above):
 
-1. **Valuation Risk** — Is the stock overpriced? (F1: P/E, F2: P/B, F10: vs sector, F12: PEG, F15: EV/EBITDA)
-2. **Financial Risk** — Can the company survive a downturn? (F4: debt/equity, F13: FCF, F14: cash vs debt, F20: dividend safety)
-3. **Profitability Risk** — Are margins sustainable? (F3: net margin, F8: operating efficiency, F16: gross margin, F18: EBITDA margin)
-4. **Momentum Risk** — Is the stock losing steam? (F6: 52W position, F9: earnings velocity, F11: SMA/EMA, F17: quarterly beats)
-5. **Volatility Risk** — How wild are the price swings? (F7: beta)
-6. **Short Seller Risk** — Are bears betting against this? (F19: short interest)
-7. **Growth Risk** — Can growth sustain the valuation? (F5: forward vs trailing PE, F9: EPS CAGR)
+1. **Valuation Risk** — Is the stock overpriced? (P/E, P/B, P/E vs sector, PEG, EV/EBITDA)
+2. **Financial Risk** — Can the company survive a downturn? (debt/equity, free cash flow, cash vs debt, dividend safety)
+3. **Profitability Risk** — Are margins sustainable? (net margin, operating efficiency, gross margin, EBITDA margin)
+4. **Momentum Risk** — Is the stock losing steam? (52W position, earnings velocity, SMA/EMA trend, quarterly beats)
+5. **Volatility Risk** — How wild are the price swings? (beta)
+6. **Short Seller Risk** — Are bears betting against this? (short interest)
+7. **Growth Risk** — Can growth sustain the valuation? (forward vs trailing PE, EPS CAGR)
 8. **Sector & Macro Risk** — External headwinds from regulation, competition, economy
 
 For each risk, rate as: 🟢 LOW / 🟡 MODERATE / 🔴 HIGH with specific numbers.
@@ -10552,16 +11467,16 @@ IMPORTANT: If quarterly revenue/earnings data is provided above, use REAL number
 **QoQ Momentum (Quarter-over-Quarter):**
 [If quarterly data available: calculate exact revenue/earnings % changes between quarters]
 [If NOT available, use these PROXY INDICATORS — always provide analysis:]
-- Forward PE vs Trailing PE: {live_data.get('forward_pe', 'N/A')} vs {live_data['pe_ratio']} → [If forward < trailing = earnings expected to GROW, if forward > trailing = earnings expected to SHRINK]
-- Profit Margin at {live_data['profit_margin']}%: [Above 15% = strong, 8-15% = moderate, below 8% = tight]
-- Price at {((live_data['current_price']/live_data['week52_high'])*100) if live_data['week52_high'] > 0 else 0:.0f}% of 52-week high → [Above 80% = upward momentum, 40-80% = neutral, below 40% = decline]
+- Forward PE vs Trailing PE: {forward_pe} vs {pe_ratio} → [If forward < trailing = earnings expected to GROW, if forward > trailing = earnings expected to SHRINK]
+- Profit Margin at {profit_margin}%: [Above 15% = strong, 8-15% = moderate, below 8% = tight]
+- Price at {pct_of_52w_high:.0f}% of 52-week high → [Above 80% = upward momentum, 40-80% = neutral, below 40% = decline]
 - Verdict: [ACCELERATING 🟢 / STABLE 🟡 / DECELERATING 🔴]
 
 **YoY Structural Growth (Year-over-Year):**
 [If quarterly data available: calculate exact YoY revenue/earnings growth]
 [If NOT available, infer from:]
-- PE ratio {live_data['pe_ratio']} vs sector average → [Market pricing in growth or decline?]
-- Operating margin {live_data['operating_margin']}% → [Improving efficiency or compression?]
+- PE ratio {pe_ratio} vs sector average → [Market pricing in growth or decline?]
+- Operating margin {operating_margin}% → [Improving efficiency or compression?]
 - 52-week price range position → [Stock appreciation = market sees growth]
 - Verdict: [STRENGTHENING 🟢 / STABLE 🟡 / WEAKENING 🔴]
 
@@ -10581,133 +11496,370 @@ Provide specific projections using available data:
 
 ## 🎙️ MANAGEMENT TONE & OUTLOOK
 
-IMPORTANT: If analyst/earnings data is provided above, use it with real numbers. If NOT available, infer management confidence from: P/E ratio trends (forward vs trailing), price position vs 52-week range, profit margin levels, dividend yield, and beta. NEVER say "data corrupted" or "HTML fragments" — always provide substantive analysis.
-
-**CEO/CFO Confidence Level:** [🟢 Bullish / 🟡 Cautious / 🔴 Defensive — based on earnings surprises, guidance direction, and insider activity from the data above]
-
-**Earnings Performance:** [Use the actual earnings surprise history — did they beat or miss? By how much? Is the trend improving or deteriorating?]
+[Write this section to the 🎙️ MANAGEMENT TONE & OUTLOOK spec in the system prompt]
 
-**Analyst Consensus:** [What do analysts actually think? Use real price targets and recommendation data. How does current price compare to mean/high/low targets?]
-
-**Forward Growth Outlook:** [Use forward EPS estimates and revenue growth data to project 12-month outlook. Be specific with numbers.]
-
-**Insider & Institutional Signal:** [Use actual insider ownership %, institutional %, and short interest data. Are insiders buying or selling? Is short interest rising?]
-
-**Red Flags:** [Based on real data — declining earnings surprises, lowered guidance, increasing short interest, insider selling, etc.]
-
-**Green Flags:** [Based on real data — consecutive beats, raised targets, insider buying, institutional accumulation, etc.]
+---
 
-**What Management Isn't Telling You:** [Read between the numbers — what do the data patterns suggest that management wouldn't say directly?]
+## 🏦 TOP FUND & INSTITUTIONAL HOLDINGS
 
-**Management Tone → Future Stock Impact:** 
-[Based on everything above — how will management's current stance likely impact the stock price in the next 3-6-12 months? Be specific:
-- If BULLISH: "Management confidence + rising estimates suggest X% upside to $XXX by [date]"
-- If CAUTIOUS: "Mixed signals suggest sideways trading in $XXX-$XXX range until [catalyst]"  
-- If DEFENSIVE: "Declining metrics + hedged language suggests X% downside risk to $XXX"
-Include specific price targets tied to management tone.]
+[Write this section to the 🏦 TOP FUND & INSTITUTIONAL HOLDINGS spec in the system prompt]
 
-**12-Month Price Prediction:** [Based on forward EPS × historical PE range, analyst targets, and growth trajectory — give a specific price range with bull/base/bear cases]
+---
 
-**Investment Inference from Management Behavior:**
-[Based on tone, body language of guidance, insider transactions, and communication patterns — is this management team building value or managing decline? Should investors trust the forward narrative? Concrete recommendation tied to management credibility.]
+## 🔮 WHAT'S NEXT — Catalysts & Timeline
 
-**💡 What This Means For You:** [Simple answer: "Can you trust these people with your money? Are they acting like owners or corporate politicians? What would their behavior tell a friend deciding whether to invest?"]
+[Write this section to the 🔮 WHAT'S NEXT — Catalysts & Timeline spec in the system prompt]
 
 ---
 
-## 🏦 TOP FUND & INSTITUTIONAL HOLDINGS
+## 🎯 ENTRY & EXIT STRATEGY (Multi-Factor Driven)
 
-**Smart Money Snapshot:** [If fund/institutional data is provided above, list the top 5 holders with % ownership. Comment on: Are big funds accumulating or reducing? Is institutional ownership high (>60%) = strong backing, or low = under the radar?]
+**Based on LIVE Price: {price}**
 
-**Top Holders:** [List top 5 institutional/mutual fund holders from the data. Format: "1. Vanguard (8.2%) 2. BlackRock (6.1%) etc." If data not available, note that institutional data was not available and skip this.]
+CALCULATE ENTRY/EXIT using ALL these factors:
+1. SMA Support: 20-day ({sma_20}), 50-day ({sma_50}), 200-day ({sma_200}) — Buy near SMA support, sell near SMA resistance
+   EMA Signals: 9-day ({ema_9}), 21-day ({ema_21}), 50-day ({ema_50}) — {ema_signals}
+2. 52-Week Range: High {w52_high}, Low {w52_low} — Use for range-based targets
+3. Book Value Floor: {book_value} — absolute downside anchor
+4. Intrinsic Value: Use Graham/DCF/Lynch values above as fair value targets
+5. EV/EBITDA Implied: If EV/EBITDA is cheap (<10x), wider upside target; if expensive (>20x), tighter stop loss
+6. FCF Yield: FCF {free_cash_flow} vs market cap — determines margin of safety
+7. Sector P/E: Current P/E vs sector avg {sector_avg_pe}x — if below, target can be sector-mean reversion price
+8. Beta-Adjusted Risk: Beta {beta} — higher beta = wider stop loss, lower beta = tighter
 
-**What Smart Money Tells Us:** [High institutional ownership = validation by professional analysts. Rising institutional % = accumulation phase. Declining = distribution/exit. Low institutional = either undiscovered gem or avoided for reasons.]
+```
+Aggressive Buy:   {currency_symbol}XXX  [SMA200 or 52W range support — for swing traders]
+Accumulate Zone:  {currency_symbol}XXX  [SMA50 support or -5% from CMP — for investors]
+Current Price:    {price}  ◄── LIVE PRICE
+Target 1 (3M):   {currency_symbol}XXX  [Nearest SMA resistance or +10% move]
+Target 2 (12M):  {currency_symbol}XXX  [Intrinsic value / sector P/E convergence price]
+Stop Loss:       {currency_symbol}XXX  [Below SMA200 or key support — max loss defined by beta]
+```
 
-**💡 What This Means For You:** [Simple: "Are the big professional investors buying this stock or avoiding it? Think of it like a restaurant — if top food critics eat there, it's probably good. If they avoid it, there might be something wrong you can't see yet."]
+Explain the LOGIC behind each level — which factor(s) drive it.
 
 ---
 
-## 🔮 WHAT'S NEXT — Catalysts & Timeline
-
-**vs Peers / Competitors:** [Compare this stock's valuation (P/E), growth, and margins vs its industry peers listed above. Is it cheaper or more expensive than competitors? Is the premium/discount justified by superior growth, margins, or market position? Which competitor is the biggest threat and why?]
+## 🌟 10-YEAR SMALL-CAP RECOMMENDATIONS
 
-**Upcoming Sector Events (Next 3-6 Months):** [List 3-5 specific upcoming events for THIS sector that could move the stock — include approximate dates where possible. Examples: earnings season, regulatory decisions, commodity price drivers, policy changes, tech launches, industry conferences, seasonal demand shifts. Be specific to the sector, not generic.]
+[Include small-cap recommendations as before]
 
-**Next 30 Days:** [What specific events/catalysts are coming? Earnings date, ex-dividend date, product launches, regulatory decisions, macro events]
+---
 
-**Next 90 Days:** [Medium-term catalysts — seasonal trends, industry events, guidance updates, competitive dynamics that will impact price]
+## 💡 BOTTOM LINE
 
-**Next 12 Months:** [Big picture — growth trajectory, expansion plans, sector tailwinds/headwinds, regulatory changes, M&A potential]
+**Current Assessment ({data_timestamp}):**
 
-**Key Trigger to Watch:** [The single most important catalyst that will determine if this stock goes up or down. Be specific — "Q3 earnings on [date]" or "Fed rate decision" or "New product launch in [month]"]
+**Verdict: {v_verdict} {v_emoji}** (Conviction: {v_conviction}, Score: {v_score:+d})
 
-**Bull Case Scenario:** [If everything goes right — specific price target with reasoning]
-**Bear Case Scenario:** [If things go wrong — specific downside target with reasoning]
-**Most Likely Scenario:** [Your base case with probability assessment]
+Based on real-time price of {price}:
+[Summarize your analysis. Must align with the {v_verdict} verdict. Give specific entry/exit levels if applicable.]
 
-**💡 What This Means For You:** [Simple summary: "Over the next year, this stock is most likely to [go up/stay flat/go down] because [one clear reason]. The single thing to watch is [specific trigger]." Do NOT give explicit buy/hold/sell advice — only explain the outlook and key risks. End with: "This is for educational analysis only, not investment advice."]
+═══════════════════════════════════════════════════════════════
+⚠️ IMPORTANT DISCLAIMERS:
 
----
+📊 DATA FRESHNESS:
+   Report generated: {report_time}
+   Market data: Real-time from multiple financial sources
+   
+⚠️ NOT FINANCIAL ADVICE:
+   This is educational research only
+   Consult Certified Financial Advisor before investing
+   
+🔬 RESEARCH PLATFORM:
+   Non-commercial educational tool
+   For learning and analysis purposes only
+═══════════════════════════════════════════════════════════════
+"""
 
-## 🎯 ENTRY & EXIT STRATEGY (Multi-Factor Driven)
 
-**Based on LIVE Price: {_f_price}**
+# ═══ FULL REPORT WITH AI ═══
+@app.post("/api/generate-report")
+async def generate_report(request: Request):
+    import time as _time
+    _t0 = _time.time()
+    company = ""
+    _rl_hold = None
+    try:
+        data = orjson.loads(await request.body())
+        company = data.get("company_name", "").strip()
+        email = data.get("email", "").strip()
+        _stream = bool(data.get("stream"))  # opt-in SSE: data card → AI tokens → final response
+        
+        if not company or not email:
+            raise HTTPException(400, "company_name and email required")
+        
+        # CHECK + RESERVE RATE LIMIT — one atomic step off the event loop; given back below if the report fails
+        rate_check = await asyncio.get_event_loop().run_in_executor(_thread_pool, acquire_rate_limit, email)
+        if not rate_check["allowed"]:
+            return JSONResponse(
+                status_code=429,
+                content=rate_check
+            )
+        _rl_hold = rate_check.pop("reservation")
+        
+        # ═══ REPORT DATA CACHE — same company within 5 min skips Yahoo + scoring ═══
+        # Keyed on the resolved ticker so "Reliance", "RELIANCE.NS" and "reliance industries" share one entry
+        _ticker = resolve_ticker(company)
+        _rd_key = _report_data_key(_ticker)
+        _rd = await _get_report_data(_rd_key)
+        if _rd is None and REPORT_DATA_CACHE == "replay":
+            raise HTTPException(503, f"No cached market data for {company} (replay mode)")
+        
+        # GET LIVE DATA — run in thread pool so other users aren't blocked
+        _t1 = _time.time()
+        loop = asyncio.get_event_loop()
+        _mgmt_future = None
+        if _rd is not None:
+            live_data = _rd["live_data"]
+            print(f"⚡ REPORT DATA HIT: {company} (skipped live data, mgmt context, verdict)")
+        else:
+            # Management context only needs the ticker — resolve it locally and fetch both
+            # in parallel (unless a cached AI report will short-circuit the mgmt data anyway)
+            if _get_cached_report(_ticker) is None:
+                _mgmt_future = loop.run_in_executor(_thread_pool, fetch_management_context_safe, _ticker, company)
+            live_data = await loop.run_in_executor(_thread_pool, get_live_stock_data, company)
+        _t2 = _time.time()
+        print(f"⏱️ get_live_stock_data: {_t2-_t1:.1f}s")
+        
+        # Check if there was an error
+        if "error" in live_data or not live_data.get("success"):
+            error_msg = live_data.get("error", "Could not fetch market data for this ticker")
+            raise HTTPException(400, error_msg)
+        
+        # ═══ CHECK AI REPORT CACHE — instant for 10K users hitting same stock ═══
+        _cache_key = live_data.get('ticker', company).upper()
+        cached = _get_cached_report(_cache_key)
+        if cached:
+            _elapsed = round(_time.time() - _t0, 1)
+            print(f"⚡ CACHE HIT: {_cache_key} → {_elapsed}s (saved ~30s AI call)")
+            # Still counts toward the rate limit (reserved at admission)
+            remaining = rate_check["requests_remaining"]
+            # Return cached report with fresh rate limit info
+            cached_resp = dict(cached)  # copy
+            cached_resp["rate_limit"] = {"remaining": max(0, remaining)}
+            cached_resp["cached"] = True
+            cached_resp["elapsed"] = _elapsed
+            report_counter["count"] += 1
+            _persist_dirty.add("counter")
+            cached_resp["report_number"] = report_counter["count"]
+            if _stream:
+                return StreamingResponse(iter([
+                    _sse("data", {"live_data": cached_resp.get("live_data"), "fund_holdings": cached_resp.get("fund_holdings")}),
+                    _sse("token", {"text": cached_resp.get("report", "")}),
+                    _sse("done", cached_resp),
+                ]), media_type="text/event-stream", headers=_SSE_HEADERS)
+            # Returned as a Response so FastAPI skips jsonable_encoder's pure-Python walk of the report
+            return FastJSONResponse(cached_resp)
+        
+        # Format live data section — shared fields formatted once for every section below
+        (currency_symbol, price_arrow, _f_price, _f_chg, _f_chg_pct,
+         _f_w52h, _f_w52l, _f_mcap, _ema_sig) = _report_format_ctx(live_data)
+        
+        if _rd is not None:
+            # Prices in a cached snapshot can be up to _REPORT_DATA_TTL old — say so in the prompt
+            live_data_section = (f"\n⚠️ CACHED SNAPSHOT — market data below was captured at {_rd.get('snapshot_at', 'N/A')} "
+                                 f"(up to {_REPORT_DATA_TTL // 60} min old); treat prices as of that time."
+                                 + _rd["live_data_section"])
+        else:
+            # Resolve the conditional fields up front so the template below is plain substitution
+            _peers_txt = ', '.join([p['ticker']+' (PE:'+str(p['pe'])+'x)' for p in live_data.get('peers', [])[:5]]) or 'N/A'
+            _sma20, _sma200 = live_data.get('sma_20'), live_data.get('sma_200')
+            _vs_sma20 = ('Above' if live_data['current_price'] > _sma20 else 'Below') if _sma20 else 'N/A'
+            _vs_sma200 = ('Above (uptrend)' if live_data['current_price'] > _sma200 else 'Below (downtrend)') if _sma200 else 'N/A'
+            live_data_section = f"""
+╔═══════════════════════════════════════════════════════════════╗
+║  🔴 REAL-TIME MARKET DATA                                     ║
+║  Data as of: {live_data['data_timestamp']}       ║
+╚═══════════════════════════════════════════════════════════════╝
 
-CALCULATE ENTRY/EXIT using ALL these factors:
-1. SMA Support: 20-day ({live_data.get('sma_20','N/A')}), 50-day ({live_data.get('sma_50','N/A')}), 200-day ({live_data.get('sma_200','N/A')}) — Buy near SMA support, sell near SMA resistance
-   EMA Signals: 9-day ({live_data.get('ema_9','N/A')}), 21-day ({live_data.get('ema_21','N/A')}), 50-day ({live_data.get('ema_50','N/A')}) — {', '.join(live_data.get('ema_signals',[])) if live_data.get('ema_signals') else 'N/A'}
-2. 52-Week Range: High {_f_w52h}, Low {_f_w52l} — Use for range-based targets
-3. Book Value Floor: {live_data['book_value']} — absolute downside anchor
-4. Intrinsic Value: Use Graham/DCF/Lynch values above as fair value targets
-5. EV/EBITDA Implied: If EV/EBITDA is cheap (<10x), wider upside target; if expensive (>20x), tighter stop loss
-6. FCF Yield: FCF {live_data.get('free_cash_flow','N/A')} vs market cap — determines margin of safety
-7. Sector P/E: Current P/E vs sector avg {live_data.get('sector_avg_pe','N/A')}x — if below, target can be sector-mean reversion price
-8. Beta-Adjusted Risk: Beta {live_data['beta']} — higher beta = wider stop loss, lower beta = tighter
+CURRENT MARKET SNAPSHOT:
+• Ticker: {live_data['ticker']}
+• Company: {live_data['company_name']}
+• Current Price: {_f_price}
+• Change Today: {price_arrow} {_f_chg} ({_f_chg_pct})
 
-```
-Aggressive Buy:   {currency_symbol}XXX  [SMA200 or 52W range support — for swing traders]
-Accumulate Zone:  {currency_symbol}XXX  [SMA50 support or -5% from CMP — for investors]
-Current Price:    {_f_price}  ◄── LIVE PRICE
-Target 1 (3M):   {currency_symbol}XXX  [Nearest SMA resistance or +10% move]
-Target 2 (12M):  {currency_symbol}XXX  [Intrinsic value / sector P/E convergence price]
-Stop Loss:       {currency_symbol}XXX  [Below SMA200 or key support — max loss defined by beta]
-```
+VALUATION METRICS (CURRENT):
+• P/E Ratio (Trailing): {live_data['pe_ratio']}
+• P/E Ratio (Forward): {live_data.get('forward_pe', 'N/A')}
+• P/B Ratio: {live_data['pb_ratio']}
+• PEG Ratio: {live_data.get('peg_ratio', 'N/A')}
+• EV/EBITDA: {live_data.get('enterprise_to_ebitda', 'N/A')}
+• Dividend Yield: {live_data['dividend_yield']}%
+• Payout Ratio: {live_data.get('payout_ratio', 'N/A')}%
+• Sector Avg P/E: {live_data.get('sector_avg_pe', 'N/A')}x
+• Peer Avg P/E: {live_data.get('peer_avg_pe', 'N/A')}x
+• Peers Analyzed: {_peers_txt}
+• 52-Week High: {_f_w52h}
+• 52-Week Low: {_f_w52l}
+• Market Cap: {_f_mcap}
 
-Explain the LOGIC behind each level — which factor(s) drive it.
+PROFITABILITY & EFFICIENCY:
+• Gross Margins: {live_data.get('gross_margins', 'N/A')}%
+• Operating Margin: {live_data['operating_margin']}%
+• Profit Margin: {live_data['profit_margin']}%
+• EBITDA Margins: {live_data.get('ebitda_margins', 'N/A')}%
+• ROE: {live_data['roe']}%
+• Revenue Per Share: {live_data.get('revenue_per_share', 'N/A')}
 
----
+BALANCE SHEET & CASH POSITION:
+• Total Cash: {live_data.get('total_cash', 'N/A')}
+• Total Debt: {live_data.get('total_debt', 'N/A')}
+• Debt/Equity: {live_data['debt_to_equity']}
+• Current Ratio: {live_data['current_ratio']}
+• Quick Ratio: {live_data.get('quick_ratio', 'N/A')}
+• Book Value/Share: {live_data['book_value']}
+• Free Cash Flow: {live_data.get('free_cash_flow', 'N/A')}
+• Operating Cash Flow: {live_data.get('operating_cash_flow', 'N/A')}
+• EBITDA: {live_data.get('ebitda', 'N/A')}
 
-## 🌟 10-YEAR SMALL-CAP RECOMMENDATIONS
+GROWTH & EARNINGS VELOCITY:
+• Revenue Growth: {live_data.get('revenue_growth', 'N/A')}%
+• EPS Growth (Forward vs TTM): {live_data.get('eps_growth_pct', 'N/A')}%
+• Earnings Growth: {live_data.get('earnings_growth', 'N/A')}%
+• Quarterly Earnings Growth (YoY): {live_data.get('earnings_quarterly_growth', 'N/A')}%
+• EPS (TTM): {live_data['eps_ttm']}
+• EPS (Forward): {live_data['eps_forward']}
+• Total Revenue: {live_data.get('total_revenue', 'N/A')}
 
-[Include small-cap recommendations as before]
+TECHNICAL INDICATORS:
+• SMA 20-Day: {live_data.get('sma_20', 'N/A')}
+• SMA 50-Day: {live_data.get('sma_50', 'N/A')}
+• SMA 200-Day: {live_data.get('sma_200', 'N/A')}
+• EMA 9-Day: {live_data.get('ema_9', 'N/A')}
+• EMA 21-Day: {live_data.get('ema_21', 'N/A')}
+• EMA 50-Day: {live_data.get('ema_50', 'N/A')}
+• Price vs SMA20: {_vs_sma20}
+• Price vs SMA200: {_vs_sma200}
+• EMA Signals: {_ema_sig}
 
----
+RISK & SENTIMENT:
+• Beta: {live_data['beta']}
+• Short Ratio: {live_data.get('short_ratio', 'N/A')}
 
-## 💡 BOTTOM LINE
+COMPANY INFORMATION:
+• Sector: {live_data['sector']}
+• Industry: {live_data['industry']}
 
-**Current Assessment ({live_data['data_timestamp']}):**
+═══════════════════════════════════════════════════════════════
+"""
 
-**Verdict: {v_verdict} {v_emoji}** (Conviction: {v_conviction}, Score: {v_score:+d})
+        # REAL MANAGEMENT/EARNINGS DATA — fetched alongside live data above
+        if _rd is not None:
+            mgmt_context, fund_holdings = _rd["mgmt_context"], _rd["fund_holdings"]
+        elif _mgmt_future is not None:
+            mgmt_context, fund_holdings = await _mgmt_future
+        else:
+            mgmt_context, fund_holdings = await loop.run_in_executor(
+                _thread_pool, fetch_management_context_safe, live_data['ticker'], live_data.get('company_name', company))
+        
+        # BUILD COMPUTED FINANCIAL CONTEXT (always available from live_data)
+        # This ensures the AI ALWAYS has numbers to work with, even if Yahoo APIs fail
+        if _rd is not None:
+            full_context = _rd["full_context"]
+        else:
+            computed_context = f"""
+=== COMPUTED FINANCIAL METRICS (from live market data) ===
+Current Price: {_f_price}
+Price Change Today: {_f_chg_pct}
+P/E Ratio: {live_data['pe_ratio']}
+Forward P/E: {live_data.get('forward_pe', 'N/A')}
+P/B Ratio: {live_data['pb_ratio']}
+Market Cap: {_f_mcap}
+Dividend Yield: {live_data['dividend_yield']}%
+Beta: {live_data['beta']}
+52-Week High: {_f_w52h}
+52-Week Low: {_f_w52l}
+Price vs 52W High: {_fv(_safe_div(live_data.get('current_price',0), live_data.get('week52_high',1)) * 100, '.1f', '', '%')}
+Price vs 52W Low: {_fv(_safe_div(live_data.get('current_price',0), live_data.get('week52_low',1)) * 100, '.1f', '', '%')}
+Profit Margin: {live_data['profit_margin']}%
+Operating Margin: {live_data['operating_margin']}%
+ROE: {live_data['roe']}%
+Debt/Equity: {live_data['debt_to_equity']}
+Current Ratio: {live_data['current_ratio']}
+EPS (TTM): {live_data['eps_ttm']}
+EPS (Forward): {live_data['eps_forward']}
+Book Value/Share: {live_data['book_value']}
+Free Cash Flow: {live_data.get('free_cash_flow', 'N/A')}
+Operating Cash Flow: {live_data.get('operating_cash_flow', 'N/A')}
+Revenue Growth: {live_data.get('revenue_growth', 'N/A')}%
+Sector: {live_data['sector']}
+Industry: {live_data['industry']}
+"""
+            # Combine: real earnings data (if available) + computed metrics (always)
+            full_context = ""
+            if mgmt_context:
+                full_context = mgmt_context + "\n\n" + computed_context
+            else:
+                full_context = computed_context + "\nNOTE: Detailed quarterly earnings data was not available from Yahoo Finance. Use the financial metrics above to infer trends. Compute approximate QoQ/YoY analysis from profit margins, P/E trends, and price position vs 52-week range."
 
-Based on real-time price of {_f_price}:
-[Summarize your analysis. Must align with the {v_verdict} verdict. Give specific entry/exit levels if applicable.]
+        # ═══ DETERMINISTIC STOCK VERDICT ENGINE (server-side) ═══
+        # This ensures AI always uses the same verdict for same data
+        if _rd is not None:
+            v_score, v_reasons, v_verdict, v_emoji, v_conviction, v_factors = _rd["verdict"]
+            verdict_card = _rd["verdict_card"]
+        else:
+            # Scoring runs on the worker pool so the event loop keeps serving other requests
+            v_score, v_reasons, v_verdict, v_emoji, v_conviction, v_factors = await loop.run_in_executor(
+                _thread_pool, _stock_verdict, live_data, _verdict_cache_key(live_data.get('ticker', company)))
+            _reasons_txt = "\n  ".join(v_reasons)
+            verdict_card = f"""
+═══ PRE-COMPUTED STOCK VERDICT (deterministic — USE THIS) ═══
+VERDICT: {v_verdict} {v_emoji}
+Score: {v_score:+d} | Conviction: {v_conviction}
+Factor breakdown:
+  {_reasons_txt}
 
-═══════════════════════════════════════════════════════════════
-⚠️ IMPORTANT DISCLAIMERS:
+IMPORTANT: Your recommendation in the report MUST match this verdict ({v_verdict}).
+Do NOT override or contradict this score-based verdict.
+Your job is to EXPLAIN why this verdict makes sense using the data, not to change it.
+═══ END VERDICT ═══"""
+        
+        if _rd is None:
+            await _set_report_data(_rd_key, {
+                "live_data": live_data, "live_data_section": live_data_section,
+                "mgmt_context": mgmt_context, "fund_holdings": fund_holdings, "full_context": full_context,
+                "verdict": [v_score, v_reasons, v_verdict, v_emoji, v_conviction, v_factors],
+                "verdict_card": verdict_card,
+                "snapshot_at": datetime.utcnow().strftime("%I:%M:%S %p UTC"),
+            })
+        
+        # Add intrinsic value data to prompt
+        iv = live_data.get('intrinsic')
+        intrinsic_section = ""
+        if iv:
+            iv_parts = ["\n═══ INTRINSIC VALUE ESTIMATES (pre-computed) ═══\n"]
+            add_iv = iv_parts.append
+            if iv.get('graham'): add_iv(f"Graham Number: {currency_symbol}{iv['graham']:,.2f} ({iv['graham_upside']:+.1f}% vs current price)\n")
+            if iv.get('dcf_simple'): add_iv(f"DCF (Graham Growth): {currency_symbol}{iv['dcf_simple']:,.2f} ({iv['dcf_upside']:+.1f}% vs current price)\n")
+            if iv.get('lynch'): add_iv(f"Lynch Fair Value (PEG=1): {currency_symbol}{iv['lynch']:,.2f}\n")
+            if iv.get('earnings_yield'): add_iv(f"Earnings Yield: {iv['earnings_yield']}% (premium vs 10Y bond: {iv['earnings_yield_premium']:+.2f}%)\n")
+            if iv.get('book_value'): add_iv(f"Book Value/Share: {currency_symbol}{iv['book_value']:,.2f}\n")
+            add_iv("USE these intrinsic values in your Valuation Analysis section.\n═══ END INTRINSIC ═══")
+            intrinsic_section = "".join(iv_parts)
+        
+        print(f"📊 Stock Verdict: {v_verdict} (score: {v_score:+d}, conviction: {v_conviction})")
+        print(f"   Factors: {len(v_reasons)}")
 
-📊 DATA FRESHNESS:
-   Report generated: {datetime.now().strftime("%B %d, %Y at %I:%M %p UTC")}
-   Market data: Real-time from multiple financial sources
-   
-⚠️ NOT FINANCIAL ADVICE:
-   This is educational research only
-   Consult Certified Financial Advisor before investing
-   
-🔬 RESEARCH PLATFORM:
-   Non-commercial educational tool
-   For learning and analysis purposes only
-═══════════════════════════════════════════════════════════════
-"""
+        # CREATE CLAUDE PROMPT — fill the module-level template from one context dict
+        _prompt_ctx = {k: live_data[k] for k in _REPORT_PROMPT_FIELDS}
+        _prompt_ctx.update((k, live_data.get(k, 'N/A')) for k in _REPORT_PROMPT_OPTIONAL)
+        _prompt_ctx.update(
+            company=company, company_upper=company.upper(),
+            live_data_section=live_data_section, full_context=full_context,
+            verdict_card=verdict_card, intrinsic_section=intrinsic_section,
+            v_verdict=v_verdict, v_emoji=v_emoji, v_conviction=v_conviction, v_score=v_score,
+            factor_block=_verdict_factor_block(v_factors),
+            currency_symbol=currency_symbol, price=_f_price, w52_high=_f_w52h, w52_low=_f_w52l,
+            ema_signals=_ema_sig,
+            profit_margin_pct=str(live_data['profit_margin']) + '%',
+            operating_margin_pct=str(live_data['operating_margin']) + '%',
+            roe_pct=str(live_data['roe']) + '%',
+            dividend_yield_pct=str(live_data['dividend_yield']) + '%',
+            pct_of_52w_high=(live_data['current_price'] / live_data['week52_high'] * 100) if live_data['week52_high'] > 0 else 0,
+            report_time=datetime.now().strftime("%B %d, %Y at %I:%M %p UTC"),
+        )
+        prompt = _REPORT_PROMPT.format_map(_prompt_ctx)
 
         # ═══ INTELLIGENT AI FALLBACK CHAIN ═══
         # Model 1: Claude Sonnet (best quality, 60s)
@@ -10724,20 +11876,14 @@ Based on real-time price of {_f_price}:
             """Run AI models in sequence. Returns (report_text, model_label)."""
             if not api_key:
                 return None, "none"
-            _headers = {
-                "x-api-key": api_key,
-                "anthropic-version": "2023-06-01",
-                "content-type": "application/json"
-            }
             for model_name, max_tok, timeout_s, label in models_list:
                 try:
                     print(f"🤖 AI attempt: {label} (timeout={timeout_s}s)...")
-                    resp = _http_pool.post(
-                        "https://api.anthropic.com/v1/messages",
-                        headers=_headers,
-                        json={"model": model_name, "max_tokens": max_tok,
-                              "messages": [{"role": "user", "content": prompt_text}]},
-                        timeout=timeout_s
+                    resp = _anthropic_post(
+                        {"model": model_name, "max_tokens": max_tok,
+                         "system": _REPORT_SYSTEM_BLOCKS,
+                         "messages": [{"role": "user", "content": prompt_text}]},
+                        timeout_s
                     )
                     if resp.status_code == 200:
                         text = resp.json()["content"][0]["text"]
@@ -10760,20 +11906,64 @@ Based on real-time price of {_f_price}:
                     continue
             return None, "none"
         
+        def _stream_ai_call(prompt_text, api_key, models_list, emit, cancelled):
+            """Stream AI models in sequence, emit(text) per token. Returns (report_text, model_label).
+            Falls back to the next model only if nothing was emitted yet; stops as soon as
+            `cancelled` (threading.Event) is set, closing the upstream stream."""
+            if not api_key:
+                return None, "none"
+            for model_name, max_tok, timeout_s, label in models_list:
+                if cancelled.is_set():
+                    break
+                parts = []
+                try:
+                    print(f"🤖 AI stream: {label} (timeout={timeout_s}s)...")
+                    with _anthropic_post(
+                        {"model": model_name, "max_tokens": max_tok, "stream": True,
+                         "system": _REPORT_SYSTEM_BLOCKS,
+                         "messages": [{"role": "user", "content": prompt_text}]},
+                        timeout_s, stream=True
+                    ) as resp:
+                        if resp.status_code == 401:
+                            print(f"❌ API key invalid")
+                            break
+                        if resp.status_code != 200:
+                            print(f"⚠️ {label} error {resp.status_code}, trying next...")
+                            continue
+                        for line in resp.iter_lines():
+                            if cancelled.is_set():
+                                print(f"🛑 Client disconnected — aborting {label} stream ({len(parts)} chunks)")
+                                return None, "none"
+                            if not line.startswith(b"data:"):
+                                continue
+                            evt = orjson.loads(line[5:])
+                            if evt.get("type") == "content_block_delta":
+                                text = evt.get("delta", {}).get("text", "")
+                                if text:
+                                    parts.append(text)
+                                    emit(text)
+                            elif evt.get("type") == "error":
+                                print(f"⚠️ {label} stream error: {evt.get('error')}")
+                                break
+                except requests.exceptions.Timeout:
+                    print(f"⏰ {label} timed out after {timeout_s}s")
+                except Exception as e:
+                    print(f"⚠️ {label} error: {e}")
+                if parts:
+                    # Tokens already reached the client — keep what we have rather than restart
+                    text = "".join(parts)
+                    print(f"✅ AI stream done: {label} ({len(text)} chars)")
+                    return text, label
+            return None, "none"
+        
         _ai_models = [
             ("claude-sonnet-4-20250514", 4096, 35, "sonnet"),
             ("claude-haiku-4-5-20251001", 4096, 25, "haiku"),
         ]
         
-        # Run AI in thread pool — doesn't block event loop while waiting 5-45s
-        report, ai_model_used = await loop.run_in_executor(
-            _thread_pool, _run_ai_call, prompt, ANTHROPIC_API_KEY, _ai_models
-        )
-        
         # ═══ FALLBACK 3: Template report (no AI) — ALWAYS succeeds ═══
-        if not report:
+        def _template_report():
             print("📝 All AI models failed — generating template report...")
-            ai_model_used = "template"
             
             # Safe float helper — handles 'N/A', None, empty strings
             def _sf(v, default=0):
@@ -10784,7 +11974,7 @@ Based on real-time price of {_f_price}:
                 except:
                     return default
             
-            _curr = '₹' if live_data['currency'] == 'INR' else '$'
+            _curr = currency_symbol
             _p = _sf(live_data.get('current_price', 0))
             _pe = live_data.get('pe_ratio', 'N/A')
             _pm = live_data.get('profit_margin', 'N/A')
@@ -10921,97 +12111,209 @@ The stock is {_mom_txt}, sitting at {_w52pct}% of its 52-week range ({_curr}{_w5
 This is for educational analysis only, not investment advice. The 20-factor quantitative verdict, entry/exit levels, risk scores, and peer comparison above provide comprehensive analysis based on live market data. Always consult a financial advisor before making investment decisions.
 """
             print(f"📝 Template report generated ({len(report)} chars)")
+            return report
         
-        report_counter["count"] += 1
-        save_counter()
-        report_id = hashlib.md5(f"{company}{datetime.now()}".encode()).hexdigest()[:8]
+        def _finish_report(report, ai_model_used):
+            """Count, rate-limit, assemble and cache the final response."""
+            report_counter["count"] += 1
+            _persist_dirty.add("counter")
+            # One clock read for both the id and the timestamp; blake2b keyed on it skips the f-string
+            now = datetime.now()
+            report_id = hashlib.blake2b(company.encode(), digest_size=4, key=now.isoformat().encode()).hexdigest()
         
-        # Record this request for rate limiting
-        record_request(email)
-        remaining = RATE_LIMIT_MAX_REQUESTS - len([
-            t for t in email_rate_limiter.get(email.lower().strip(), [])
-            if t > datetime.now() - timedelta(minutes=RATE_LIMIT_WINDOW_MINUTES)
-        ])
+            # Counted toward the rate limit at admission
+            remaining = rate_check["requests_remaining"]
         
-        _t4 = _time.time()
-        print(f"⏱️ TOTAL: {_t4-_t0:.1f}s (data={_t2-_t1:.1f}s + prompt={_t3-_t2:.1f}s + AI={_t4-_t3:.1f}s) model={ai_model_used}")
+            _t4 = _time.time()
+            print(f"⏱️ TOTAL: {_t4-_t0:.1f}s (data={_t2-_t1:.1f}s + prompt={_t3-_t2:.1f}s + AI={_t4-_t3:.1f}s) model={ai_model_used}")
         
-        response = {
-            "success": True,
-            "report": report,
-            "ai_model": ai_model_used,
-            "company_name": company,
-            "live_data": live_data,
-            "fund_holdings": fund_holdings,
-            "timestamp": datetime.now().isoformat(),
-            "report_id": report_id.upper(),
-            "report_number": report_counter["count"],
-            "rate_limit": {
-                "remaining": max(0, remaining),
-                "limit": RATE_LIMIT_MAX_REQUESTS,
-                "window_minutes": RATE_LIMIT_WINDOW_MINUTES
+            response = {
+                "success": True,
+                "report": report,
+                "ai_model": ai_model_used,
+                "company_name": company,
+                "live_data": live_data,
+                "fund_holdings": fund_holdings,
+                "timestamp": now.isoformat(),
+                "report_id": report_id.upper(),
+                "report_number": report_counter["count"],
+                "rate_limit": {
+                    "remaining": max(0, remaining),
+                    "limit": RATE_LIMIT_MAX_REQUESTS,
+                    "window_minutes": RATE_LIMIT_WINDOW_MINUTES
+                }
             }
-        }
         
-        # ═══ CACHE the report — next user searching same stock gets instant response ═══
-        _set_cached_report(_cache_key, response)
-        print(f"💾 Cached report for {_cache_key} (30min TTL, {len(_ai_report_cache)} reports cached)")
+            # ═══ CACHE the report — next user searching same stock gets instant response ═══
+            _set_cached_report(_cache_key, response)
+            print(f"💾 Cached report for {_cache_key} (30min TTL, {len(_ai_report_cache)} reports cached)")
+        
+            return response
+        
+        if _stream:
+            async def _stream_report():
+                yield _sse("data", {"live_data": live_data, "fund_holdings": fund_holdings,
+                                    "live_data_section": live_data_section})
+                queue = asyncio.Queue()
+                cancelled = threading.Event()
+                def _emit(text):
+                    loop.call_soon_threadsafe(queue.put_nowait, text)
+                ai_future = loop.run_in_executor(
+                    _thread_pool, _stream_ai_call, prompt, ANTHROPIC_API_KEY, _ai_models, _emit, cancelled
+                )
+                # Sentinel lands after every token — the worker's emits were queued before it returned
+                ai_future.add_done_callback(lambda _f: queue.put_nowait(None))
+                try:
+                    while (text := await queue.get()) is not None:
+                        yield _sse("token", {"text": text})
+                finally:
+                    # Client disconnected mid-stream (generator cancelled/closed) — stop paying for tokens
+                    if not ai_future.done():
+                        cancelled.set()
+                try:
+                    report, ai_model_used = ai_future.result()
+                except Exception:
+                    report, ai_model_used = None, "none"
+                if not report:
+                    ai_model_used = "template"
+                    report = _template_report()
+                    yield _sse("token", {"text": report})
+                yield _sse("done", _finish_report(report, ai_model_used))
+            return StreamingResponse(_stream_report(), media_type="text/event-stream", headers=_SSE_HEADERS)
         
-        return response
+        # Run AI in thread pool — doesn't block event loop while waiting 5-45s
+        report, ai_model_used = await loop.run_in_executor(
+            _thread_pool, _run_ai_call, prompt, ANTHROPIC_API_KEY, _ai_models
+        )
+        if not report:
+            ai_model_used = "template"
+            report = _template_report()
+        return FastJSONResponse(_finish_report(report, ai_model_used))
         
     except HTTPException:
+        await asyncio.get_event_loop().run_in_executor(_thread_pool, release_rate_limit, _rl_hold)
         raise
     except Exception as e:
-        import traceback
-        print(f"❌ Report generation error: {traceback.format_exc()}")
-        raise HTTPException(500, f"Report generation failed: {str(e)}")
+        await asyncio.get_event_loop().run_in_executor(_thread_pool, release_rate_limit, _rl_hold)
+        # print_exc streams the frames to stderr instead of building the whole traceback string first;
+        # the client gets a fixed message, not exception internals
+        print(f"❌ Report generation error for {company}: {type(e).__name__}")
+        import traceback; traceback.print_exc()
+        raise HTTPException(500, "Report generation failed; please retry.")
 
 
 # ═══ TRADE VALIDATION — Backtest suggested trades against actual market data ═══
-@app.get("/api/validate-trades")
-async def validate_trades(request: Request):
-    """Validate past trade suggestions against actual closing prices"""
-    email = request.query_params.get("email", "").strip().lower()
-    if email not in TRADES_ALLOWED_EMAILS:
-        return {"success": False, "error": "Access restricted"}
-    
-    history = _load_trade_history()
-    if not history:
-        return {"success": True, "message": "No trade history yet. Generate trades first — they'll be saved automatically.", "results": [], "summary": {}}
-    
-    # Index ticker mapping
-    index_tickers = {
-        "NIFTY 50": "^NSEI", "NIFTY": "^NSEI",
-        "BANK NIFTY": "^NSEBANK", "BANKNIFTY": "^NSEBANK",
-        "SENSEX": "^BSESN", "BSE SENSEX": "^BSESN",
-        "NIFTY IT": "^CNXIT", "NIFTY NEXT 50": "^NSMIDCP50",
-        "FINNIFTY": "NIFTY_FIN_SERVICE.NS", "MIDCAP NIFTY": "^NSMIDCP50",
-    }
-    
-    results = []
-    from datetime import timedelta
-    ist_now = datetime.utcnow() + timedelta(hours=5, minutes=30)
-    today_str = ist_now.strftime('%Y-%m-%d')
+def _trade_day_ohlc(ticker, date_str):
+    """[open, high, low, close] for one trade day: 1h bars → daily bars over 3 days → Yahoo v8 chart.
+    None when no source has data."""
+    t = yf.Ticker(ticker)
+    trade_date = datetime.strptime(date_str, '%Y-%m-%d')
+    next_day = trade_date + timedelta(days=1)
+    hist = t.history(start=date_str, end=next_day.strftime('%Y-%m-%d'), interval="1h")
+
+    if hist.empty:
+        hist = t.history(start=date_str, end=(trade_date + timedelta(days=3)).strftime('%Y-%m-%d'))
+
+    # Fallback: Yahoo v8 chart API
+    if hist.empty:
+        try:
+            _h = {'User-Agent': f'Mozilla/5.0 Chrome/{random.randint(118,126)}.0.0.0', 'Accept': 'application/json'}
+            ts1 = int(trade_date.timestamp())
+            ts2 = int((trade_date + timedelta(days=2)).timestamp())
+            r = _http_pool.get(f"https://query1.finance.yahoo.com/v8/finance/chart/{ticker}?period1={ts1}&period2={ts2}&interval=1d", timeout=4)
+            if r.status_code == 200:
+                res = r.json().get('chart', {}).get('result', [{}])[0]
+                q = res.get('indicators', {}).get('quote', [{}])[0]
+                import pandas as pd
+                if q.get('close'):
+                    hist = pd.DataFrame({'Close': q['close'], 'High': q['high'], 'Low': q['low'], 'Open': q['open']}).dropna()
+        except:
+            pass
+    if hist.empty:
+        return None
+    return [float(hist['Open'].iloc[0]), float(hist['High'].max()), float(hist['Low'].min()), float(hist['Close'].iloc[-1])]
+
+def _trade_day_ohlc_batch(tickers, date_str):
+    """{ticker: [open, high, low, close]} for one trade day from a single threaded yf.download of 1h bars.
+    Tickers the batch comes back empty for are omitted — callers fall back to _trade_day_ohlc."""
+    import pandas as pd
+    out = {}
+    try:
+        next_day = datetime.strptime(date_str, '%Y-%m-%d') + timedelta(days=1)
+        df = yf.download(" ".join(tickers), start=date_str, end=next_day.strftime('%Y-%m-%d'), interval="1h",
+                         group_by="ticker", auto_adjust=True, threads=True, progress=False)
+        if df is None or df.empty:
+            return out
+        for tk in tickers:
+            try:
+                sub = df[tk] if isinstance(df.columns, pd.MultiIndex) else df
+                sub = sub.dropna(subset=['Close'])
+                if not sub.empty:
+                    out[tk] = [float(sub['Open'].iloc[0]), float(sub['High'].max()),
+                               float(sub['Low'].min()), float(sub['Close'].iloc[-1])]
+            except Exception:
+                pass
+    except Exception as e:
+        print(f"  ⚠️ Trade-day batch failed for {date_str} ({len(tickers)} symbols): {e}")
+    return out
+
+# Index name (as the trades prompt writes it) → Yahoo ticker
+INDEX_TICKERS = {
+    "NIFTY 50": "^NSEI", "NIFTY": "^NSEI",
+    "BANK NIFTY": "^NSEBANK", "BANKNIFTY": "^NSEBANK",
+    "SENSEX": "^BSESN", "BSE SENSEX": "^BSESN",
+    "NIFTY IT": "^CNXIT", "NIFTY NEXT 50": "^NSMIDCP50",
+    "FINNIFTY": "NIFTY_FIN_SERVICE.NS", "MIDCAP NIFTY": "^NSMIDCP50",
+}
+
+@lru_cache(maxsize=256)
+def resolve_index(name: str):
+    """Upper-cased index name → Yahoo ticker: exact match, else first partial match (either way round)."""
+    ticker = INDEX_TICKERS.get(name)
+    if ticker:
+        return ticker
+    for k, v in INDEX_TICKERS.items():
+        if k in name or name in k:
+            return v
+    return None
+
+_LEVEL_STRIP_RE = re.compile(r"[₹$,]")
+
+def _parse_level(v):
+    """Trade level → float ("₹24,150" → 24150.0); 0 for blank, '-' or unparseable. float() trims whitespace."""
+    if not v or v == '-':
+        return 0
+    try:
+        return float(_LEVEL_STRIP_RE.sub("", str(v)))
+    except:
+        return 0
+
+# (outcome, score) by scoring branch: target only, stop only, both, positive close, otherwise
+_TRADE_OUTCOMES = (("TARGET HIT", 1), ("STOP HIT", -1), ("VOLATILE", 0), ("PARTIAL WIN", 0.5), ("PARTIAL LOSS", -0.5))
+
+def _run_trade_validation(history, dates, max_days=0):
+    """Score saved trades (except today's) against each day's actual range → endpoint response.
+    dates: history keys newest-first; max_days > 0 stops after that many trading days."""
+    now_utc = datetime.utcnow()
+    today_str = (now_utc + IST_OFFSET).strftime('%Y-%m-%d')
     
-    for date_str, day_data in sorted(history.items(), reverse=True):
+    # Pass 1: resolve every trade to (ticker, levels) — no network
+    days = []
+    for date_str in dates:
         # Skip today (market may still be open)
         if date_str == today_str:
             continue
+        if max_days and len(days) >= max_days:
+            break
+        day_data = history[date_str]
         
-        day_results = {"date": date_str, "trades": [], "is_expiry": day_data.get("is_expiry_day", False)}
-        
+        legs = []
         for trade in day_data.get("trades", []):
             try:
                 # Resolve ticker
                 if trade["type"] == "INDEX":
                     name = (trade.get("index") or "").upper().strip()
-                    ticker = index_tickers.get(name)
-                    if not ticker:
-                        # Try partial match
-                        for k, v in index_tickers.items():
-                            if k in name or name in k:
-                                ticker = v
-                                break
+                    ticker = resolve_index(name)
                     label = name
                 elif trade["type"] == "STOCK":
                     stock_name = trade.get("stock", "")
@@ -11023,113 +12325,126 @@ async def validate_trades(request: Request):
                 if not ticker:
                     continue
                 
-                # Parse levels (remove ₹, $, commas)
-                def parse_level(v):
-                    if not v or v == '-':
-                        return 0
-                    s = str(v).replace('₹', '').replace('$', '').replace(',', '').strip()
-                    try:
-                        return float(s)
-                    except:
-                        return 0
-                
-                entry = parse_level(trade.get("entry_level"))
-                target = parse_level(trade.get("target_level"))
-                stop = parse_level(trade.get("stop_level"))
+                entry = _parse_level(trade.get("entry_level"))
+                target = _parse_level(trade.get("target_level"))
+                stop = _parse_level(trade.get("stop_level"))
                 
                 if not entry:
                     continue
-                
-                # Fetch actual intraday data for that date
-                t = yf.Ticker(ticker)
-                trade_date = datetime.strptime(date_str, '%Y-%m-%d')
-                next_day = trade_date + timedelta(days=1)
-                hist = t.history(start=date_str, end=next_day.strftime('%Y-%m-%d'), interval="1h")
-                
-                if hist.empty:
-                    hist = t.history(start=date_str, end=(trade_date + timedelta(days=3)).strftime('%Y-%m-%d'))
-                
-                # Fallback: Yahoo v8 chart API
-                if hist.empty:
-                    try:
-                        _h = {'User-Agent': f'Mozilla/5.0 Chrome/{random.randint(118,126)}.0.0.0', 'Accept': 'application/json'}
-                        ts1 = int(trade_date.timestamp())
-                        ts2 = int((trade_date + timedelta(days=2)).timestamp())
-                        r = _http_pool.get(f"https://query1.finance.yahoo.com/v8/finance/chart/{ticker}?period1={ts1}&period2={ts2}&interval=1d", timeout=4)
-                        if r.status_code == 200:
-                            res = r.json().get('chart', {}).get('result', [{}])[0]
-                            q = res.get('indicators', {}).get('quote', [{}])[0]
-                            import pandas as pd
-                            if q.get('close'):
-                                hist = pd.DataFrame({'Close': q['close'], 'High': q['high'], 'Low': q['low'], 'Open': q['open']}).dropna()
-                    except:
-                        pass
-                
-                if hist.empty:
+                legs.append((trade, ticker, label, entry, target, stop))
+            except Exception as te:
+                print(f"  Trade validation error for {trade}: {te}")
+                continue
+        days.append((date_str, day_data, legs))
+    
+    # Pass 2: one threaded yf.download per day for that day's uncached tickers, all days in parallel;
+    # only tickers a batch missed go through the per-ticker fallback chain.
+    # Closed sessions never change, so ranges already in the disk cache skip Yahoo entirely.
+    prices = _load_trade_prices()
+    missing = {}  # date → [tickers]
+    for date_str, _, legs in days:
+        for _, ticker, *_ in legs:
+            key = f"{ticker}|{date_str}"
+            if key not in prices and ticker not in missing.setdefault(date_str, []):
+                missing[date_str].append(ticker)
+    missing = {d: tks for d, tks in missing.items() if tks}
+    if missing:
+        # Bounded waits on both passes — a batch or ticker that times out is a miss for this run
+        batch_futs = {_yf_pool.submit(_trade_day_ohlc_batch, tks, d): d for d, tks in missing.items()}
+        got_by_day = {}
+        try:
+            for fut in as_completed(batch_futs, timeout=8):
+                try:
+                    got_by_day[batch_futs[fut]] = fut.result(timeout=3)
+                except Exception:
+                    pass
+        except Exception as e:
+            print(f"  Trade batch fetch timed out: {e}")
+        hist_futs = {}
+        for date_str, tks in missing.items():
+            got = got_by_day.get(date_str) or {}
+            for ticker in tks:
+                key = f"{ticker}|{date_str}"
+                if ticker in got:
+                    prices[key] = got[ticker]
+                else:
+                    hist_futs[_yf_pool.submit(_trade_day_ohlc, ticker, date_str)] = key
+        try:
+            for fut in as_completed(hist_futs, timeout=8):
+                key = hist_futs[fut]
+                try:
+                    ohlc = fut.result(timeout=3)
+                except Exception as e:
+                    print(f"  Trade history fetch failed for {key}: {e}")
                     continue
-                
-                day_high = float(hist['High'].max())
-                day_low = float(hist['Low'].min())
-                day_open = float(hist['Open'].iloc[0])
-                day_close = float(hist['Close'].iloc[-1])
-                
+                if ohlc:
+                    prices[key] = ohlc
+        except Exception as e:
+            print(f"  Trade history fetch timed out: {e}")
+        # Persist only closed sessions for days still in the history file (30 days) — a US trade filed
+        # under the IST date can still be trading just after IST midnight; its partial range is used
+        # for this run but refetched next time
+        keep = {}
+        for k, v in prices.items():
+            ticker, date_str = k.rsplit("|", 1)
+            if date_str in history and _trade_day_closed(ticker, date_str, now_utc):
+                keep[k] = v
+        _save_trade_prices(keep)
+    
+    # Pass 3: collect every trade that has a day range, then score them all in one vectorized pass
+    scored = []  # (day index, trade, label, is_bullish, entry, target, stop, [open, high, low, close])
+    for di, (date_str, day_data, legs) in enumerate(days):
+        for trade, ticker, label, entry, target, stop in legs:
+            ohlc = prices.get(f"{ticker}|{date_str}")
+            if not ohlc:
+                continue
+            try:
                 direction = (trade.get("direction") or "").upper()
                 is_bullish = "BULL" in direction or "BUY CE" in (trade.get("bias") or "").upper()
-                
-                # Score the trade
-                if is_bullish:
-                    # Bullish: target hit if high >= target, stop hit if low <= stop
-                    target_hit = target > 0 and day_high >= target
-                    stop_hit = stop > 0 and day_low <= stop
-                    actual_move_pct = round(((day_close - entry) / entry) * 100, 2) if entry else 0
-                    best_move_pct = round(((day_high - entry) / entry) * 100, 2) if entry else 0
-                else:
-                    # Bearish: target hit if low <= target, stop hit if high >= stop
-                    target_hit = target > 0 and day_low <= target
-                    stop_hit = stop > 0 and day_high >= stop
-                    actual_move_pct = round(((entry - day_close) / entry) * 100, 2) if entry else 0
-                    best_move_pct = round(((entry - day_low) / entry) * 100, 2) if entry else 0
-                
-                # Determine outcome
-                if target_hit and not stop_hit:
-                    outcome = "TARGET HIT"
-                    outcome_score = 1
-                elif stop_hit and not target_hit:
-                    outcome = "STOP HIT"
-                    outcome_score = -1
-                elif target_hit and stop_hit:
-                    outcome = "VOLATILE"  # Both hit — depends on which first (hard to tell from daily)
-                    outcome_score = 0
-                elif actual_move_pct > 0:
-                    outcome = "PARTIAL WIN"
-                    outcome_score = 0.5
-                else:
-                    outcome = "PARTIAL LOSS"
-                    outcome_score = -0.5
-                
-                day_results["trades"].append({
-                    "label": label,
-                    "type": trade["type"],
-                    "direction": "BULL" if is_bullish else "BEAR",
-                    "entry": entry,
-                    "target": target,
-                    "stop": stop,
-                    "probability": trade.get("probability", ""),
-                    "day_open": round(day_open, 2),
-                    "day_high": round(day_high, 2),
-                    "day_low": round(day_low, 2),
-                    "day_close": round(day_close, 2),
-                    "actual_move_pct": actual_move_pct,
-                    "best_move_pct": best_move_pct,
-                    "outcome": outcome,
-                    "score": outcome_score,
-                })
             except Exception as te:
                 print(f"  Trade validation error for {trade}: {te}")
                 continue
-        
-        if day_results["trades"]:
-            results.append(day_results)
+            scored.append((di, trade, label, is_bullish, entry, target, stop, ohlc))
+    
+    day_trades = [[] for _ in days]
+    if scored:
+        bull = np.array([r[3] for r in scored])
+        entry, target, stop = (np.array([r[i] for r in scored], dtype=np.float64) for i in (4, 5, 6))
+        day_open, day_high, day_low, day_close = np.array([r[7] for r in scored], dtype=np.float64).T
+        # Bullish: target hit if high >= target, stop hit if low <= stop — bearish is the mirror image
+        target_hit = (target > 0) & np.where(bull, day_high >= target, day_low <= target)
+        stop_hit = (stop > 0) & np.where(bull, day_low <= stop, day_high >= stop)
+        actual_move = np.where(bull, (day_close - entry) / entry, (entry - day_close) / entry) * 100
+        best_move = np.where(bull, (day_high - entry) / entry, (entry - day_low) / entry) * 100
+        # Python round() (not np.round) so the 2-dp values and the > 0 test match the reported numbers
+        actual_pct = [round(float(x), 2) for x in actual_move]
+        best_pct = [round(float(x), 2) for x in best_move]
+        # Index into _TRADE_OUTCOMES; VOLATILE = both hit, order unknowable from daily bars
+        kind = np.select(
+            [target_hit & ~stop_hit, stop_hit & ~target_hit, target_hit & stop_hit, np.array(actual_pct) > 0],
+            [0, 1, 2, 3], default=4)
+        for i, (di, trade, label, is_bullish, e, t, st, (o, h, l, c)) in enumerate(scored):
+            outcome, outcome_score = _TRADE_OUTCOMES[kind[i]]
+            day_trades[di].append({
+                "label": label,
+                "type": trade["type"],
+                "direction": "BULL" if is_bullish else "BEAR",
+                "entry": e,
+                "target": t,
+                "stop": st,
+                "probability": trade.get("probability", ""),
+                "day_open": round(o, 2),
+                "day_high": round(h, 2),
+                "day_low": round(l, 2),
+                "day_close": round(c, 2),
+                "actual_move_pct": actual_pct[i],
+                "best_move_pct": best_pct[i],
+                "outcome": outcome,
+                "score": outcome_score,
+            })
+    
+    results = [{"date": date_str, "trades": trades, "is_expiry": day_data.get("is_expiry_day", False)}
+               for (date_str, day_data, _), trades in zip(days, day_trades) if trades]
     
     # Compute summary
     all_trades = [t for r in results for t in r["trades"]]
@@ -11155,24 +12470,53 @@ async def validate_trades(request: Request):
     
     return {"success": True, "results": results, "summary": summary}
 
+def _validate_trades_sync(max_days=0):
+    """Load the (cached) trade history and validate it → endpoint response. Runs on _thread_pool."""
+    history, dates = _trade_history_by_date()
+    if not history:
+        return {"success": True, "message": "No trade history yet. Generate trades first — they'll be saved automatically.", "results": [], "summary": {}}
+    return _run_trade_validation(history, dates, max_days)
+
+
+@app.get("/api/validate-trades")
+async def validate_trades(request: Request):
+    """Validate past trade suggestions against actual closing prices"""
+    email = request.query_params.get("email", "").strip().lower()
+    if email not in TRADES_ALLOWED_EMAILS:
+        return {"success": False, "error": "Access restricted"}
+    
+    # Optional ?days=N — only the N most recent trading days
+    try:
+        max_days = max(0, int(request.query_params.get("days", 0)))
+    except ValueError:
+        max_days = 0
+    
+    # History load, Yahoo fetches and scoring all block — keep the whole thing off the event loop
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(_thread_pool, _validate_trades_sync, max_days)
+
 
 @app.post("/api/vote")
 async def cast_vote(request: Request):
     """Record a feature vote."""
     try:
-        data = await request.json()
+        data = orjson.loads(await request.body())
         feature = data.get("feature", "")
         direction = data.get("direction", 0)
         
         if feature not in feature_votes:
             raise HTTPException(400, "Invalid feature")
         
+        global _total_votes, _votes_body
         if direction > 0:
             feature_votes[feature]["up"] += 1
         elif direction < 0:
             feature_votes[feature]["dn"] += 1
+        if direction:
+            _total_votes += 1
+            _votes_body = None
         
-        save_votes()
+        _persist_dirty.add("votes")
         return {"success": True, "votes": feature_votes[feature]}
     except HTTPException:
         raise
@@ -11183,22 +12527,28 @@ async def cast_vote(request: Request):
 @app.get("/api/votes")
 async def get_votes():
     """Get current vote tallies for all features."""
-    total = sum(v["up"] + v["dn"] for v in feature_votes.values())
-    return {
-        "votes": feature_votes,
-        "total_votes": total
-    }
+    global _votes_body
+    if _votes_body is None:
+        _votes_body = orjson.dumps({"votes": feature_votes, "total_votes": _total_votes})
+    return Response(content=_votes_body, media_type="application/json")
+
 
+# /api/stats body only changes with the report count — re-rendered when that moves
+_stats_body = (None, b"")
 
 @app.get("/api/stats")
 async def stats():
-    return {
-        "total_reports": report_counter["count"],
-        "platform": "Celesys AI",
-        "version": "1.0-VERIFIED",
-        "data_source": "Yahoo Finance (Real-Time)",
-        "vs_chatgpt": "Live data vs ChatGPT's Jan 2025 cutoff"
-    }
+    global _stats_body
+    count = report_counter["count"]
+    if _stats_body[0] != count:
+        _stats_body = (count, orjson.dumps({
+            "total_reports": count,
+            "platform": "Celesys AI",
+            "version": "1.0-VERIFIED",
+            "data_source": "Yahoo Finance (Real-Time)",
+            "vs_chatgpt": "Live data vs ChatGPT's Jan 2025 cutoff"
+        }))
+    return Response(content=_stats_body[1], media_type="application/json")
 
 
 # ═══════════════════════════════════════════════
@@ -11211,7 +12561,6 @@ _market_daily_ts = None
 async def market_daily():
     """Comprehensive daily analysis for Nifty, Bank Nifty, Sensex with technicals + options."""
     import yfinance as yf
-    from datetime import datetime, timedelta
     from concurrent.futures import ThreadPoolExecutor, as_completed
     import numpy as np
     
@@ -11220,8 +12569,7 @@ async def market_daily():
     if _market_daily_cache and _market_daily_ts and (now - _market_daily_ts).total_seconds() < 180:
         return _market_daily_cache
     
-    IST = timedelta(hours=5, minutes=30)
-    now_ist = now + IST
+    now_ist = now + IST_OFFSET
     today_str = now_ist.strftime("%A, %d %B %Y")
     time_str = now_ist.strftime("%I:%M %p IST")
     
@@ -11535,7 +12883,7 @@ def _save_journal(trades):
 @app.post("/api/journal")
 async def journal_add(request: Request):
     """Add a trade to journal."""
-    data = await request.json()
+    data = orjson.loads(await request.body())
     trades = _load_journal()
     trade = {
         "id": f"T{len(trades)+1:04d}",
@@ -11607,7 +12955,7 @@ async def journal_list():
 @app.put("/api/journal/{trade_id}")
 async def journal_update(trade_id: str, request: Request):
     """Close a trade — set exit premium and compute P&L."""
-    data = await request.json()
+    data = orjson.loads(await request.body())
     trades = _load_journal()
     for t in trades:
         if t["id"] == trade_id:
@@ -12465,7 +13813,7 @@ async def journal_review():
 @app.post("/api/ai-assist")
 async def ai_assist(request: Request):
     """AI assistant that answers trading questions using live data."""
-    data = await request.json()
+    data = orjson.loads(await request.body())
     question = (data.get("question", "")).strip().lower()
     symbol = data.get("symbol", "NIFTY")
     
@@ -12650,7 +13998,6 @@ Think of it as buying insurance — small cost, big payout if things drop."""
     else:
         # ═══ SMART INFERENCE — handle ANY text ═══
         # Try to extract a stock ticker from the question
-        import re
         known_stocks = ["NIFTY","BANKNIFTY","SENSEX","RELIANCE","TCS","HDFCBANK","INFY","ICICIBANK","SBIN","ITC","LT","TATAMOTORS","BAJFINANCE","BHARTIARTL","MARUTI",
                        "SPY","QQQ","IWM","AAPL","MSFT","NVDA","TSLA","AMZN","GOOGL","META","AMD","JPM","AVGO","NFLX"]
         mentioned = [s for s in known_stocks if s.lower() in question]
@@ -12900,7 +14247,7 @@ async def _run_stock_intel(symbol, region, cache_key):
             if len(hist) == 0:
                 try:
                     url = f"https://query1.finance.yahoo.com/v8/finance/chart/{yf_sym}?range=1y&interval=1d"
-                    r = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=5)
+                    r = _http_pool.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=5)
                     data = r.json().get("chart", {}).get("result", [{}])[0]
                     ts = data.get("timestamp", [])
                     quotes = data.get("indicators", {}).get("quote", [{}])[0]
@@ -12973,7 +14320,7 @@ async def _run_stock_intel(symbol, region, cache_key):
             if len(hist) == 0:
                 try:
                     url = f"https://query1.finance.yahoo.com/v8/finance/chart/{yf_sym}?range=1y&interval=1d"
-                    r = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=5)
+                    r = _http_pool.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=5)
                     data = r.json().get("chart", {}).get("result", [{}])[0]
                     ts = data.get("timestamp", [])
                     quotes = data.get("indicators", {}).get("quote", [{}])[0]